@@ -0,0 +1,114 @@
+# backend/bench/llm_extract.py
+"""
+Entity extraction benchmark: token usage, parse-failure rate and latency of the free-text
+("prose") prompt vs JSON-schema structured output ("schema"), on the user turns recorded in
+data/sessions.json. "schema+context" replays each conversation turn by turn with a growing
+session (messages + extracted metadata), as converse does, to show what the budgeted context
+adds to input tokens and how much of it the prompt cache absorbs.
+
+Runs against the OpenAI key in data/openai.json, or with --stub against the local stub server
+(token counts there are only a length-based estimate, and it never returns malformed JSON).
+
+    python -m bench.llm_extract --modes prose,schema,schema+context --limit 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from bench.replay import BACKEND_DIR, RESULTS_DIR, _git, load_conversations, percentile
+from bench.stubs import StubServers
+
+
+def run_mode(mode: str, conversations: List[List[str]]) -> Dict[str, Any]:
+    from services.llm_service import cached_ratio, extract_entities_via_llm, usage_cost_usd
+    base_mode, _, variant = mode.partition("+")
+    latencies, failures, errors, n = [], 0, 0, 0
+    tokens = {"input_tokens": 0, "cached_tokens": 0, "output_tokens": 0}
+    for turns in conversations:
+        session = {"metadata": {}, "messages": []} if variant == "context" else None
+        for text in turns:
+            if session is not None:
+                session["messages"].append({"role": "user", "text": text})
+            t0 = time.perf_counter()
+            r = extract_entities_via_llm(text, mode=base_mode, session=session)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            n += 1
+            for k, v in (r.get("usage") or {}).items():
+                tokens[k] += v
+            if not r.get("ok"):
+                if "parse" in (r.get("error") or ""):
+                    failures += 1
+                else:
+                    errors += 1
+            elif session is not None:
+                session["metadata"].update({k: v for k, v in r["entities"].items() if v and k != "intent"})
+    latencies.sort()
+    return {
+        "mode": mode,
+        "calls": n,
+        "avg_input_tokens": round(tokens["input_tokens"] / n, 1),
+        "avg_output_tokens": round(tokens["output_tokens"] / n, 1),
+        "cached_token_ratio": round(cached_ratio(tokens), 4),
+        "est_cost_usd_per_1k_calls": round(usage_cost_usd(tokens) / n * 1000, 4),
+        "parse_failures": failures,
+        "parse_failure_rate": round(failures / n, 4),
+        "other_errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+    }
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.llm_extract", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", default="prose,schema,schema+context")
+    parser.add_argument("--limit", type=int, default=100, help="user turns to extract from")
+    parser.add_argument("--sessions-file", help="defaults to data/sessions.json")
+    parser.add_argument("--stub", action="store_true", help="use the local OpenAI stub instead of the real API")
+    parser.add_argument("--out", help="results file (default bench/results/llm-extract-<sha>.json)")
+    args = parser.parse_args(argv)
+
+    sessions = Path(args.sessions_file) if args.sessions_file else BACKEND_DIR.parent / "data" / "sessions.json"
+    # whole conversations, trimmed so the total number of turns is `limit`
+    conversations, budget = [], args.limit
+    for conv in load_conversations(sessions, args.limit):
+        if budget <= 0:
+            break
+        conversations.append(conv[:budget])
+        budget -= len(conversations[-1])
+
+    import services.llm_service as llm
+    results = []
+    with StubServers(0, 0, 0) as stubs, tempfile.TemporaryDirectory(prefix="astra-llm-") as tmp:
+        if args.stub:
+            os.environ["OPENAI_BASE_URL"] = stubs.http_base + "/v1"
+            cfg = Path(tmp) / "openai.json"
+            cfg.write_text(json.dumps({"api_key": "sk-bench"}))
+            llm.OPENAI_CFG_FILE = cfg
+        elif not llm.openai_configured():
+            print("no OpenAI key in data/openai.json; use --stub")
+            return 1
+
+        print(f"{sum(len(c) for c in conversations)} utterances in {len(conversations)} conversations")
+        print(f"{'mode':<15} {'in tok':>7} {'cached':>7} {'out tok':>8} {'$/1k':>7} {'parse fail':>11} {'p50 ms':>8} {'p95 ms':>8}")
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            r = run_mode(mode, conversations)
+            results.append(r)
+            print(f"{mode:<15} {r['avg_input_tokens']:>7} {r['cached_token_ratio'] * 100:>6.1f}% {r['avg_output_tokens']:>8} "
+                  f"{r['est_cost_usd_per_1k_calls']:>7} {r['parse_failure_rate'] * 100:>10.1f}% {r['p50_ms']:>8} {r['p95_ms']:>8}")
+
+    sha = _git("rev-parse", "HEAD")
+    out = Path(args.out) if args.out else RESULTS_DIR / f"llm-extract-{(sha or 'unknown')[:12]}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"revision": sha, "stub": args.stub, "modes": results}, indent=2))
+    print(f"results: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
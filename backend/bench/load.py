@@ -0,0 +1,185 @@
+# backend/bench/load.py
+"""
+Multi-worker load test: how throughput scales with `uvicorn --workers N`.
+
+For each worker count a fresh sandbox (see bench.replay) is served by real uvicorn workers in
+multi-worker mode, and client processes drive a fixed request mix for a fixed time:
+
+  GET  /api/doctors/            cached catalog read
+  GET  /api/availability        bitmap search
+  GET  /api/auth/validate       token issued before the run, so most checks hit another worker
+  POST /api/voice/converse      session write + stubbed TTS
+  POST /api/bookings/create     locked read-modify-write of bookings.json + stubbed SMTP
+
+Scaling efficiency is rps(N) / (N * rps(1)). Session and booking writes serialize on their file
+locks, so write-heavy mixes scale sub-linearly by design; --mix lets you skew the mix.
+
+    python -m bench.load --workers 1,2,4 --duration 15 --clients 32
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from bench.replay import BACKEND_DIR, RESULTS_DIR, _git, percentile, prepare_sandbox
+from bench.stubs import StubServers
+
+DEFAULT_MIX = "doctors=4,availability=3,validate=3,converse=2,booking=1"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base: str, timeout: float = 30.0):
+    import requests
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(base + "/", timeout=1).ok:
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {base} did not become ready")
+
+
+def _client(args: Tuple[str, str, List[str], float, int]) -> Tuple[List[float], int]:
+    """One client process: sequential requests from the mix until the deadline."""
+    import requests
+    base, token, ops, duration, seed = args
+    rng = random.Random(seed)
+    http = requests.Session()
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    n = 0
+    while time.monotonic() < deadline:
+        op = rng.choice(ops)
+        n += 1
+        t0 = time.perf_counter()
+        try:
+            if op == "doctors":
+                r = http.get(base + "/api/doctors/")
+            elif op == "availability":
+                r = http.get(base + "/api/availability", params={"time_of_day": rng.choice(["morning", "afternoon"])})
+            elif op == "validate":
+                r = http.get(base + "/api/auth/validate", params={"token": token})
+            elif op == "converse":
+                r = http.post(base + "/api/voice/converse", json={"session_id": f"load-{seed}-{n % 20}", "text": "hello"})
+            else:
+                r = http.post(base + "/api/bookings/create", json={
+                    "doctor_id": 1 + n % 5, "patient_name": "Load Test",
+                    "patient_email": f"load{seed}@example.com", "requested_slot": f"Load {seed}-{n}-{uuid.uuid4().hex[:6]}",
+                })
+            ok = r.status_code < 400
+        except Exception:
+            ok = False
+        latencies.append(time.perf_counter() - t0)
+        errors += not ok
+    return latencies, errors
+
+
+def run_level(workers: int, args, stubs) -> Dict[str, Any]:
+    import requests
+    with tempfile.TemporaryDirectory(prefix="astra-load-") as tmp:
+        mapping = prepare_sandbox(BACKEND_DIR, stubs, Path(tmp))
+        port = _free_port()
+        base = f"http://127.0.0.1:{port}"
+        env = dict(os.environ,
+                   ASTRA_MULTI_WORKER="1",
+                   ASTRA_BENCH_APP_DIR=str(BACKEND_DIR),
+                   ASTRA_BENCH_SANDBOX=json.dumps({str(k): str(v) for k, v in mapping.items()}),
+                   OPENAI_BASE_URL=stubs.http_base + "/v1")
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "bench.sandbox_app:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR, env=env,
+        )
+        try:
+            _wait_ready(base)
+            users_file = mapping[BACKEND_DIR.parent / "data"] / "users.json"
+            users = json.loads(users_file.read_text()).get("users", []) if users_file.exists() else []
+            username = users[0]["username"] if users else "admin"
+            token = requests.post(base + "/api/auth/login",
+                                  json={"username": username, "password": args.password}).json().get("token", "")
+            if not token:
+                print("  warning: login failed; validate requests will count as errors")
+
+            ops = []
+            for part in args.mix.split(","):
+                name, _, weight = part.partition("=")
+                ops += [name.strip()] * int(weight or 1)
+
+            jobs = [(base, token, ops, args.duration, i) for i in range(args.clients)]
+            start = time.perf_counter()
+            with Pool(args.clients) as pool:
+                results = pool.map(_client, jobs)
+            wall = time.perf_counter() - start
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    latencies = sorted(x * 1000 for lat, _ in results for x in lat)
+    errors = sum(e for _, e in results)
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.load", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per level")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent client processes")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="op=weight,... (doctors, availability, validate, converse, booking)")
+    parser.add_argument("--password", default="admin123", help="admin password in the copied users.json")
+    parser.add_argument("--openai-latency-ms", type=float, default=0)
+    parser.add_argument("--eleven-latency-ms", type=float, default=0)
+    parser.add_argument("--smtp-latency-ms", type=float, default=0)
+    parser.add_argument("--out", help="results file (default bench/results/load-<sha>.json)")
+    args = parser.parse_args(argv)
+
+    levels = []
+    with StubServers(args.openai_latency_ms, args.eleven_latency_ms, args.smtp_latency_ms) as stubs:
+        for n in [int(x) for x in args.workers.split(",") if x.strip()]:
+            print(f"workers={n} ...")
+            level = run_level(n, args, stubs)
+            levels.append(level)
+            base_rps = levels[0]["rps"] / levels[0]["workers"] if levels[0]["rps"] else 0.0
+            level["efficiency"] = round(level["rps"] / (n * base_rps), 3) if base_rps else None
+            print(f"  {level['rps']} req/s  p50={level['p50_ms']}ms p95={level['p95_ms']}ms "
+                  f"errors={level['errors']}  efficiency={level['efficiency']}")
+
+    sha = _git("rev-parse", "HEAD")
+    out = Path(args.out) if args.out else RESULTS_DIR / f"load-{(sha or 'unknown')[:12]}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"revision": sha, "mix": args.mix, "clients": args.clients,
+                               "duration_s": args.duration, "levels": levels}, indent=2))
+    print(f"results: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
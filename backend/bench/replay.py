@@ -0,0 +1,399 @@
+# backend/bench/replay.py
+"""
+End-to-end benchmark: replays recorded conversations against the in-process app.
+
+Conversations are seeded from the user turns in data/sessions.json (falling back to a few
+scripted ones). Every external provider is replaced by a local stub with configurable
+latency (bench/stubs.py), and all data files are redirected to a throwaway sandbox, so the
+real data/ directory is only read, never written.
+
+Scenarios: converse (one request per user turn), transcribe, booking_create.
+Reported per scenario: p50/p95/p99/mean latency, throughput, error count and tracemalloc peak;
+plus process max RSS and, when the revision has services.metrics, per-stage timings.
+--turn-budget-ms sends that budget with every converse turn (X-Turn-Budget-Ms); with slow stubs
+it shows what the deadline saves and how often each stage degraded to get there.
+
+    python -m bench.replay run                        # writes bench/results/<sha>.json
+    python -m bench.replay run --rev HEAD~3           # same harness against an older revision
+    python -m bench.replay compare base.json head.json --threshold 0.10
+
+Run from backend/.
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+SCRIPTED_CONVERSATIONS = [
+    ["Hello", "I want to book an appointment", "I have a skin rash", "book", "My name is Rahul Verma",
+     "rahul@example.com", "yes", "no"],
+    ["Book with Dr. Meena Sharma on Thursday at 11", "My name is Priya", "priya@example.com", "yes", "none"],
+    ["hi", "I have back pain after running", "book it", "I am Arjun", "arjun@example.com", "confirm", "no notes"],
+]
+
+# lower is better for every reported metric
+COMPARED_METRICS = ("p50_ms", "p95_ms", "p99_ms", "tracemalloc_peak_kb")
+
+
+# ---------------- helpers ----------------
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = math.ceil(pct / 100.0 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, k))]
+
+
+def _git(*args: str, cwd: Path = BACKEND_DIR) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+def load_conversations(sessions_file: Path, limit: int) -> List[List[str]]:
+    """User turns of each recorded session, in order; cycled up to `limit` conversations."""
+    convs: List[List[str]] = []
+    try:
+        data = json.loads(sessions_file.read_text(encoding="utf-8"))
+        sessions = data.values() if isinstance(data, dict) else data
+        for s in sessions:
+            turns = [m.get("text") for m in (s.get("messages") or []) if m.get("role") == "user" and m.get("text")]
+            if turns:
+                convs.append(turns)
+    except Exception as e:
+        print(f"could not read {sessions_file}: {e}; using scripted conversations")
+    if not convs:
+        convs = [list(c) for c in SCRIPTED_CONVERSATIONS]
+    return [convs[i % len(convs)] for i in range(limit)]
+
+
+def _silence_wav(seconds: float = 1.0, rate: int = 16000) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buf.getvalue()
+
+
+# ---------------- sandbox ----------------
+def prepare_sandbox(app_dir: Path, stubs, root: Path) -> Dict[Path, Path]:
+    """Copy the doctor catalog into `root` and write provider configs pointing at the stubs."""
+    repo_data, backend_data = app_dir.parent / "data", app_dir / "data"
+    sb_repo, sb_backend = root / "data", root / "backend_data"
+    sb_repo.mkdir(parents=True)
+    sb_backend.mkdir(parents=True)
+    for name in ("doctors.json", "users.json"):
+        if (repo_data / name).exists():
+            shutil.copy(repo_data / name, sb_repo / name)
+    (sb_repo / "bookings.json").write_text("[]")
+    (sb_repo / "sessions.json").write_text("{}")
+    (sb_repo / "openai.json").write_text(json.dumps({"api_key": "bench"}))
+    (sb_repo / "elevenlabs.json").write_text(json.dumps(
+        {"api_key": "bench", "voice_id": "bench", "base_url": stubs.http_base}))
+    (sb_repo / "smtp.json").write_text(json.dumps(
+        {"host": "127.0.0.1", "port": stubs.smtp_port, "use_tls": False, "from_email": "bench@example.com"}))
+    return {repo_data: sb_repo, backend_data: sb_backend}
+
+
+def redirect_data_paths(mapping: Dict[Path, Path]):
+    """Rewrite module-level Path constants (and log writers' .path) under the data dirs to the sandbox."""
+
+    def remap(p: Path) -> Optional[Path]:
+        for src, dst in mapping.items():
+            try:
+                return dst / p.relative_to(src)
+            except ValueError:
+                continue
+        return None
+
+    for name, mod in list(sys.modules.items()):
+        if mod is None or not (name == "main" or name.startswith(("services.", "routes.", "utils."))):
+            continue
+        for attr, value in list(vars(mod).items()):
+            if isinstance(value, Path):
+                new = remap(value)
+                if new is not None:
+                    setattr(mod, attr, new)
+            elif isinstance(getattr(value, "path", None), Path):
+                new = remap(value.path)
+                if new is not None:
+                    value.path = new
+
+
+# ---------------- scenarios ----------------
+def run_scenario(name: str, jobs: List[Callable[[Any], List[float]]], make_client: Callable[[], Any],
+                 concurrency: int) -> Dict[str, Any]:
+    """Each job takes a client and returns the latencies (s) of the requests it made; errors are raised."""
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+    local = threading.local()
+
+    def worker(job):
+        nonlocal errors
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = make_client()
+        try:
+            lat = job(client)
+            with lock:
+                latencies.extend(lat)
+        except Exception as e:
+            with lock:
+                errors += 1
+            if errors <= 3:
+                print(f"  [{name}] error: {e}")
+
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, jobs))
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+
+    latencies.sort()
+    ms = [x * 1000 for x in latencies]
+    return {
+        "count": len(ms),
+        "errors": errors,
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "mean_ms": round(sum(ms) / len(ms), 2) if ms else 0.0,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(ms) / wall, 2) if wall else 0.0,
+        "tracemalloc_peak_kb": round(peak / 1024, 1),
+    }
+
+
+def _timed_call(fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    resp = fn(*args, **kwargs)
+    dt = time.perf_counter() - t0
+    if resp.status_code >= 500:
+        raise RuntimeError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+    return dt
+
+
+def converse_job(turns: List[str], budget_ms: Optional[float] = None):
+    headers = {"X-Turn-Budget-Ms": str(budget_ms)} if budget_ms else {}
+
+    def job(client) -> List[float]:
+        sid = f"bench-{uuid.uuid4()}"
+        return [_timed_call(client.post, "/api/voice/converse", json={"session_id": sid, "text": t}, headers=headers)
+                for t in turns]
+    return job
+
+
+def transcribe_job(audio: bytes):
+    def job(client) -> List[float]:
+        return [_timed_call(client.post, "/api/voice/transcribe", files={"file": ("bench.wav", audio, "audio/wav")})]
+    return job
+
+
+def booking_job(i: int, doctor_ids: List[int]):
+    def job(client) -> List[float]:
+        payload = {
+            "doctor_id": doctor_ids[i % len(doctor_ids)],
+            "patient_name": f"Bench Patient {i}",
+            "patient_email": f"bench{i}@example.com",
+            "requested_slot": f"Bench {i}",
+        }
+        return [_timed_call(client.post, "/api/bookings/create", json=payload)]
+    return job
+
+
+def _stage_summary() -> Dict[str, Any]:
+    try:
+        from services.metrics import STAGE_SECONDS
+    except Exception:
+        return {}
+    out = {}
+    for (stage, provider), series in sorted(STAGE_SECONDS.snapshot().items()):
+        count, total = series[-2], series[-1]
+        out[f"{stage}/{provider}"] = {"count": int(count), "mean_ms": round(total / count * 1000, 2) if count else 0.0}
+    return out
+
+
+def _degradation_summary() -> Dict[str, Any]:
+    try:
+        from services.deadline import DEGRADATIONS, TURN_COUNTS
+    except Exception:
+        return {}
+    return {"turns": dict(TURN_COUNTS),
+            "stages": {f"{stage}/{fallback}": n for (stage, fallback), n in sorted(DEGRADATIONS.items())}}
+
+
+def run(args) -> Dict[str, Any]:
+    from bench.stubs import StubServers
+
+    app_dir = Path(args.app_dir).resolve() if args.app_dir else BACKEND_DIR
+    conversations = load_conversations(Path(args.sessions_file) if args.sessions_file else app_dir.parent / "data" / "sessions.json",
+                                       args.conversations)
+
+    with StubServers(args.openai_latency_ms, args.eleven_latency_ms, args.smtp_latency_ms) as stubs, \
+            tempfile.TemporaryDirectory(prefix="astra-bench-") as tmp:
+        os.environ["OPENAI_BASE_URL"] = stubs.http_base + "/v1"
+        os.environ.setdefault("LLM_DEBUG_SAMPLE_RATE", "1.0")
+        mapping = prepare_sandbox(app_dir, stubs, Path(tmp))
+
+        sys.path.insert(0, str(app_dir))
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        import main  # noqa: E402  (imported from app_dir, after env is set)
+        import_s = time.perf_counter() - t0
+        redirect_data_paths(mapping)
+
+        from fastapi.testclient import TestClient
+
+        def make_client():
+            return TestClient(main.app)
+
+        doctors = json.loads((mapping[app_dir.parent / "data"] / "doctors.json").read_text()).get("doctors", [])
+        doctor_ids = [d["id"] for d in doctors if "id" in d] or [1]
+        audio = _silence_wav()
+
+        # warm-up: first-request costs (catalog load, client construction) shouldn't skew percentiles
+        warm = make_client()
+        warm.post("/api/voice/converse", json={"text": "hello"})
+        warm.get("/api/doctors/")
+
+        scenarios = {}
+        print(f"converse: {len(conversations)} conversations, {sum(map(len, conversations))} turns")
+        scenarios["converse"] = run_scenario("converse", [converse_job(c, args.turn_budget_ms) for c in conversations], make_client,
+                                             args.concurrency)
+        print(f"transcribe: {args.requests} requests")
+        scenarios["transcribe"] = run_scenario("transcribe", [transcribe_job(audio) for _ in range(args.requests)],
+                                               make_client, args.concurrency)
+        print(f"booking_create: {args.requests} requests")
+        scenarios["booking_create"] = run_scenario("booking_create",
+                                                   [booking_job(i, doctor_ids) for i in range(args.requests)],
+                                                   make_client, args.concurrency)
+        tracemalloc.stop()
+
+        return {
+            "revision": _git("rev-parse", "HEAD", cwd=app_dir),
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no", cwd=app_dir)),
+            "created_at": datetime.utcnow().isoformat(),
+            "config": {k: getattr(args, k) for k in ("conversations", "requests", "concurrency", "openai_latency_ms",
+                                                     "eleven_latency_ms", "smtp_latency_ms", "turn_budget_ms")},
+            "import_s": round(import_s, 3),
+            "rss_max_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "scenarios": scenarios,
+            "stages": _stage_summary(),
+            "degradations": _degradation_summary(),
+        }
+
+
+def run_at_revision(args) -> Path:
+    """Check `args.rev` out into a temporary worktree and run this harness against it in a subprocess."""
+    sha = _git("rev-parse", args.rev)
+    if not sha:
+        raise SystemExit(f"unknown revision: {args.rev}")
+    tmp = Path(tempfile.mkdtemp(prefix="astra-bench-rev-"))
+    worktree = tmp / "tree"
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{sha[:12]}.json"
+    try:
+        _git("worktree", "add", "--detach", str(worktree), sha)
+        cmd = [sys.executable, "-m", "bench.replay", "run", "--app-dir", str(worktree / "backend"), "--out", str(out)]
+        for k in ("conversations", "requests", "concurrency", "openai_latency_ms", "eleven_latency_ms", "smtp_latency_ms"):
+            cmd += [f"--{k.replace('_', '-')}", str(getattr(args, k))]
+        if args.sessions_file:
+            cmd += ["--sessions-file", args.sessions_file]
+        if args.turn_budget_ms:
+            cmd += ["--turn-budget-ms", str(args.turn_budget_ms)]
+        subprocess.run(cmd, cwd=BACKEND_DIR, check=True)
+    finally:
+        _git("worktree", "remove", "--force", str(worktree))
+        shutil.rmtree(tmp, ignore_errors=True)
+    return out
+
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float) -> int:
+    """Print per-metric deltas; returns the number of regressions beyond `threshold` (fractional)."""
+    print(f"base {base.get('revision', '?')[:12]}  ->  head {head.get('revision', '?')[:12]}")
+    print(f"{'scenario':<16}{'metric':<22}{'base':>12}{'head':>12}{'delta':>10}")
+    regressions = 0
+    for name, b in base.get("scenarios", {}).items():
+        h = head.get("scenarios", {}).get(name)
+        if not h:
+            continue
+        for metric in COMPARED_METRICS + ("throughput_rps",):
+            bv, hv = b.get(metric), h.get(metric)
+            if bv is None or hv is None:
+                continue
+            delta = (hv - bv) / bv if bv else 0.0
+            worse = delta < -threshold if metric == "throughput_rps" else delta > threshold
+            regressions += worse
+            flag = "  REGRESSION" if worse else ""
+            print(f"{name:<16}{metric:<22}{bv:>12}{hv:>12}{delta:>+9.1%}{flag}")
+    return regressions
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.replay", description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_run = sub.add_parser("run", help="run the benchmark and write a results JSON")
+    p_run.add_argument("--rev", help="git revision to benchmark (checked out into a temporary worktree)")
+    p_run.add_argument("--app-dir", help=argparse.SUPPRESS)
+    p_run.add_argument("--out", help="results file (default bench/results/<sha>.json)")
+    p_run.add_argument("--sessions-file", help="sessions.json to seed conversations from")
+    p_run.add_argument("--conversations", type=int, default=50)
+    p_run.add_argument("--requests", type=int, default=100, help="requests for transcribe / booking_create")
+    p_run.add_argument("--concurrency", type=int, default=8)
+    p_run.add_argument("--openai-latency-ms", type=float, default=300)
+    p_run.add_argument("--eleven-latency-ms", type=float, default=400)
+    p_run.add_argument("--smtp-latency-ms", type=float, default=100)
+    p_run.add_argument("--turn-budget-ms", type=float, help="per-turn budget sent with each converse request")
+
+    p_cmp = sub.add_parser("compare", help="compare two results files")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("head")
+    p_cmp.add_argument("--threshold", type=float, default=0.10, help="fractional change counted as a regression")
+
+    args = parser.parse_args(argv)
+    if args.cmd == "compare":
+        base = json.loads(Path(args.base).read_text())
+        head = json.loads(Path(args.head).read_text())
+        return 1 if compare(base, head, args.threshold) else 0
+
+    if args.rev:
+        print(f"results: {run_at_revision(args)}")
+        return 0
+
+    result = run(args)
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{(result['revision'] or 'unknown')[:12]}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2))
+    for name, s in result["scenarios"].items():
+        print(f"{name:<16} n={s['count']:<5} err={s['errors']:<3} p50={s['p50_ms']}ms p95={s['p95_ms']}ms "
+              f"p99={s['p99_ms']}ms {s['throughput_rps']} req/s peak={s['tracemalloc_peak_kb']}KB")
+    print(f"results: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,27 @@
+# backend/bench/sandbox_app.py
+"""
+ASGI entry point for benchmarks that run real uvicorn workers:
+
+    uvicorn bench.sandbox_app:app --workers 4
+
+Each worker imports the app from ASTRA_BENCH_APP_DIR and redirects its data files to the
+sandbox described by ASTRA_BENCH_SANDBOX (JSON {real_dir: sandbox_dir}), as bench.replay does
+in-process.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+from bench.replay import redirect_data_paths
+
+_app_dir = os.environ.get("ASTRA_BENCH_APP_DIR")
+if _app_dir:
+    sys.path.insert(0, _app_dir)
+
+import main  # noqa: E402
+
+redirect_data_paths({Path(k): Path(v) for k, v in json.loads(os.environ["ASTRA_BENCH_SANDBOX"]).items()})
+
+app = main.app
@@ -0,0 +1,171 @@
+# backend/bench/startup.py
+"""
+Startup benchmark: import cost, time to first healthy response, and first-request latency.
+
+  1. `python -X importtime -c "import main"`: slowest modules by cumulative import time.
+  2. For each ASTRA_PRELOAD mode: start uvicorn on a sandbox (see bench.replay), time how long
+     until GET /health answers, wait for the background preload, then time the first and
+     second call of each request kind.
+
+Exits non-zero when the last mode breaks --max-healthy-s or --max-first-ms, so the bounds can
+gate CI.
+
+    python -m bench.startup --modes none,auto
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from bench.load import _free_port
+from bench.replay import BACKEND_DIR, RESULTS_DIR, _git, _silence_wav, prepare_sandbox
+from bench.stubs import StubServers
+
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(.*)$")
+
+
+def import_profile(top: int) -> List[Dict[str, Any]]:
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                          cwd=BACKEND_DIR, capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if m:
+            rows.append({"module": m.group(3).strip(), "self_ms": int(m.group(1)) / 1000,
+                         "cumulative_ms": int(m.group(2)) / 1000})
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def _first_requests(base: str) -> Dict[str, Dict[str, float]]:
+    import requests
+    audio = _silence_wav()
+    calls = {
+        "doctors": lambda: requests.get(base + "/api/doctors/"),
+        "availability": lambda: requests.get(base + "/api/availability"),
+        "converse": lambda: requests.post(base + "/api/voice/converse", json={"text": "hello"}),
+        "transcribe": lambda: requests.post(base + "/api/voice/transcribe",
+                                            files={"file": ("a.wav", audio, "audio/wav")}),
+        "booking_create": lambda: requests.post(base + "/api/bookings/create", json={
+            "doctor_id": 1, "patient_name": "Startup Bench", "patient_email": "startup@example.com",
+            "requested_slot": f"Startup {time.time_ns()}"}),
+    }
+    out = {}
+    for name, call in calls.items():
+        timings = []
+        for _ in range(2):
+            t0 = time.perf_counter()
+            call()
+            timings.append(round((time.perf_counter() - t0) * 1000, 1))
+        out[name] = {"first_ms": timings[0], "second_ms": timings[1]}
+    return out
+
+
+def run_mode(mode: str, stubs, preload_timeout: float) -> Dict[str, Any]:
+    import requests
+    with tempfile.TemporaryDirectory(prefix="astra-startup-") as tmp:
+        mapping = prepare_sandbox(BACKEND_DIR, stubs, Path(tmp))
+        port = _free_port()
+        base = f"http://127.0.0.1:{port}"
+        env = dict(os.environ,
+                   ASTRA_PRELOAD=mode,
+                   ASTRA_BENCH_APP_DIR=str(BACKEND_DIR),
+                   ASTRA_BENCH_SANDBOX=json.dumps({str(k): str(v) for k, v in mapping.items()}),
+                   OPENAI_BASE_URL=stubs.http_base + "/v1")
+        t0 = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "bench.sandbox_app:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR, env=env,
+        )
+        try:
+            healthy = None
+            while time.perf_counter() - t0 < 60:
+                try:
+                    if requests.get(base + "/health", timeout=1).ok:
+                        healthy = time.perf_counter() - t0
+                        break
+                except Exception:
+                    pass
+                time.sleep(0.02)
+            if healthy is None:
+                raise RuntimeError("server never became healthy")
+
+            status = {}
+            while time.perf_counter() - t0 < healthy + preload_timeout:
+                status = requests.get(base + "/health").json()
+                if status.get("preload_complete"):
+                    break
+                time.sleep(0.05)
+            preload_s = time.perf_counter() - t0
+            return {
+                "mode": mode,
+                "time_to_healthy_s": round(healthy, 3),
+                "preload_done_s": round(preload_s, 3),
+                "preload": status.get("components", {}),
+                "requests": _first_requests(base),
+            }
+        finally:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.startup", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", default="none,auto", help="ASTRA_PRELOAD values to compare")
+    parser.add_argument("--top", type=int, default=15, help="modules to show from -X importtime")
+    parser.add_argument("--preload-timeout", type=float, default=120.0)
+    parser.add_argument("--max-healthy-s", type=float, default=5.0)
+    parser.add_argument("--max-first-ms", type=float, default=1500.0,
+                        help="bound on any first request (stub latency included) in the last mode")
+    parser.add_argument("--openai-latency-ms", type=float, default=0)
+    parser.add_argument("--eleven-latency-ms", type=float, default=0)
+    parser.add_argument("--smtp-latency-ms", type=float, default=0)
+    parser.add_argument("--out", help="results file (default bench/results/startup-<sha>.json)")
+    args = parser.parse_args(argv)
+
+    imports = import_profile(args.top)
+    print("slowest imports of main (cumulative):")
+    for row in imports:
+        print(f"  {row['cumulative_ms']:9.1f} ms  {row['module']}")
+
+    modes = []
+    with StubServers(args.openai_latency_ms, args.eleven_latency_ms, args.smtp_latency_ms) as stubs:
+        for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+            r = run_mode(mode, stubs, args.preload_timeout)
+            modes.append(r)
+            print(f"\nASTRA_PRELOAD={mode}: healthy after {r['time_to_healthy_s']}s, preload done after {r['preload_done_s']}s")
+            for name, t in r["requests"].items():
+                print(f"  {name:<15} first {t['first_ms']:>8} ms   second {t['second_ms']:>8} ms")
+
+    violations = []
+    if modes:
+        last = modes[-1]
+        if last["time_to_healthy_s"] > args.max_healthy_s:
+            violations.append(f"time to healthy {last['time_to_healthy_s']}s > {args.max_healthy_s}s")
+        for name, t in last["requests"].items():
+            if t["first_ms"] > args.max_first_ms:
+                violations.append(f"first {name} {t['first_ms']}ms > {args.max_first_ms}ms")
+
+    sha = _git("rev-parse", "HEAD")
+    out = Path(args.out) if args.out else RESULTS_DIR / f"startup-{(sha or 'unknown')[:12]}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"revision": sha, "imports": imports, "modes": modes, "violations": violations}, indent=2))
+    for v in violations:
+        print("BOUND EXCEEDED:", v)
+    print(f"results: {out}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,126 @@
+# backend/bench/stt_batching.py
+"""
+Micro-batching benchmark: throughput and per-request latency of local transcription at
+increasing concurrency, with the batcher (one row per --wait-ms value) and without it (each
+request calling model.transcribe on the shared model, as before batching).
+
+Utterances come from --audio-dir (or the synthetic recordings of bench.stt_preprocess) and are
+preprocessed once up front, so only inference is measured.
+
+    python -m bench.stt_batching --concurrency 1,2,4,8,16 --wait-ms 5,15,40 --batch-size 8
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from bench.replay import RESULTS_DIR, _git, percentile
+from bench.stt_preprocess import load_recordings, synthetic_recordings
+from services.audio_preprocess import TARGET_SR, preprocess
+
+
+def run_level(call: Callable[[Any], str], utterances: List[Any], concurrency: int, requests_per_client: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def client(offset: int):
+        for i in range(requests_per_client):
+            samples = utterances[(offset + i) % len(utterances)]
+            t0 = time.perf_counter()
+            try:
+                call(samples)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    latencies.sort()
+    ms = [v * 1000 for v in latencies]
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "p50_ms": round(percentile(ms, 50), 1) if ms else None,
+        "p95_ms": round(percentile(ms, 95), 1) if ms else None,
+    }
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.stt_batching", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--audio-dir", type=Path, help="directory of recordings (default: synthetic)")
+    parser.add_argument("--concurrency", default="1,2,4,8,16")
+    parser.add_argument("--wait-ms", default="5,15,40", help="batch collection windows to compare")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--beam-size", type=int, default=5)
+    parser.add_argument("--requests-per-client", type=int, default=4)
+    parser.add_argument("--out", help="results file (default bench/results/stt-batching-<sha>.json)")
+    args = parser.parse_args(argv)
+
+    recordings = load_recordings(args.audio_dir) if args.audio_dir else synthetic_recordings()
+    utterances = [p.samples for p in (preprocess(data) for _, data in recordings) if p is not None and p.processed_s > 0]
+    if not utterances:
+        print("no usable recordings (numpy/av missing or all silent)")
+        return 1
+
+    from services.transcribe_service import BATCH_MAX_AUDIO_S, WhisperBatcher, get_whisper_model
+    utterances = [u for u in utterances if u.size / TARGET_SR <= BATCH_MAX_AUDIO_S]
+    model = get_whisper_model()
+
+    def unbatched(samples):
+        segments, _ = model.transcribe(samples, beam_size=args.beam_size)
+        return " ".join(s.text for s in segments)
+
+    def batched(batcher):
+        def call(samples):
+            # clips that fail the quality checks are redone unbatched, as transcribe_samples does
+            text = batcher.submit(samples, beam_size=args.beam_size)
+            return unbatched(samples) if text is None else text
+        return call
+
+    modes: Dict[str, Callable[[Any], str]] = {"unbatched": unbatched}
+    for wait in [float(w) for w in args.wait_ms.split(",") if w.strip()]:
+        batcher = WhisperBatcher(args.batch_size, wait, model_getter=lambda size=None: model)
+        modes[f"batched wait={wait:g}ms"] = batched(batcher)
+
+    # warm both code paths so the first level does not pay for lazy initialisation
+    for call in modes.values():
+        call(utterances[0])
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    for name, call in modes.items():
+        print(f"\n{name}")
+        print(f"  {'conc':>4} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9}")
+        rows = results.setdefault(name, [])
+        for c in levels:
+            r = run_level(call, utterances, c, args.requests_per_client)
+            rows.append(r)
+            print(f"  {c:>4} {r['throughput_rps']:>8} {r['p50_ms']:>9} {r['p95_ms']:>9}"
+                  + (f"   {r['errors']} errors" if r["errors"] else ""))
+
+    sha = _git("rev-parse", "HEAD")
+    out = Path(args.out) if args.out else RESULTS_DIR / f"stt-batching-{(sha or 'unknown')[:12]}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"revision": sha, "batch_size": args.batch_size, "modes": results}, indent=2))
+    print(f"\nresults: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,158 @@
+# backend/bench/stt_preprocess.py
+"""
+STT preprocessing benchmark: local faster-whisper inference time on raw uploads vs the same
+audio after services.audio_preprocess (mono, 16 kHz, silence trimmed, normalized).
+
+Point --audio-dir at real clinic recordings (wav/webm/ogg/mp3/m4a, as the browser uploads
+them). Without it, a few synthetic recordings are generated: 48 kHz stereo with a noise floor
+and leading/trailing silence around tone bursts, which is enough to show the trimming effect
+but says nothing about transcript quality.
+
+    python -m bench.stt_preprocess --audio-dir ~/clinic-recordings --repeat 3
+"""
+
+import argparse
+import io
+import json
+import sys
+import time
+import wave
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from bench.replay import RESULTS_DIR, _git, percentile
+from services.audio_preprocess import preprocess
+
+AUDIO_SUFFIXES = {".wav", ".webm", ".ogg", ".mp3", ".m4a", ".flac"}
+
+
+def synthetic_recordings(count: int = 4) -> List[Tuple[str, bytes]]:
+    import numpy as np
+    rng = np.random.default_rng(0)
+    sr = 48000
+    out = []
+    for i in range(count):
+        lead, speech, tail = 1.0 + i * 0.5, 2.0 + i, 1.5 + i * 0.5
+        t = np.arange(int(speech * sr)) / sr
+        # syllable-rate amplitude modulation over a few harmonics, roughly voice-like energy
+        envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+        voiced = sum(np.sin(2 * np.pi * f * t) / k for k, f in enumerate((180, 360, 540, 720), 1))
+        signal = np.concatenate([np.zeros(int(lead * sr)), 0.2 * envelope * voiced, np.zeros(int(tail * sr))])
+        signal += rng.normal(0, 0.002, signal.size)  # room noise
+        stereo = np.stack([signal, 0.8 * signal], axis=1)
+        pcm = (np.clip(stereo, -1, 1) * 32767).astype("<i2")
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(2)
+            w.setsampwidth(2)
+            w.setframerate(sr)
+            w.writeframes(pcm.tobytes())
+        out.append((f"synthetic-{i}.wav", buf.getvalue()))
+    return out
+
+
+def load_recordings(audio_dir: Path) -> List[Tuple[str, bytes]]:
+    files = sorted(p for p in audio_dir.iterdir() if p.suffix.lower() in AUDIO_SUFFIXES)
+    return [(p.name, p.read_bytes()) for p in files]
+
+
+def _transcribe(model, source, beam_size: int) -> Tuple[float, str]:
+    t0 = time.perf_counter()
+    segments, _ = model.transcribe(source, beam_size=beam_size)
+    text = " ".join(s.text for s in segments).strip()
+    return time.perf_counter() - t0, text
+
+
+def bench_file(model, name: str, data: bytes, repeat: int, beam_size: int) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    prepared = preprocess(data)
+    preprocess_s = time.perf_counter() - t0
+    if prepared is None:
+        return {"file": name, "error": "preprocessing failed (numpy/av missing or undecodable audio)"}
+
+    raw_times, prepped_times = [], []
+    raw_text = prepped_text = ""
+    for _ in range(repeat):
+        # faster-whisper decodes a file-like object itself (PyAV), as it did before preprocessing
+        elapsed, raw_text = _transcribe(model, io.BytesIO(data), beam_size)
+        raw_times.append(elapsed)
+        if prepared.processed_s > 0:
+            elapsed, prepped_text = _transcribe(model, prepared.samples, beam_size)
+        else:
+            elapsed = 0.0
+        prepped_times.append(elapsed)
+
+    raw_s = min(raw_times)
+    prepped_s = min(prepped_times) + preprocess_s
+    return {
+        "file": name,
+        **prepared.report(),
+        "preprocess_ms": round(preprocess_s * 1000, 1),
+        "raw_inference_ms": round(raw_s * 1000, 1),
+        "preprocessed_total_ms": round(prepped_s * 1000, 1),
+        "reduction_pct": round(100 * (1 - prepped_s / raw_s), 1) if raw_s else None,
+        "text_raw": raw_text,
+        "text_preprocessed": prepped_text,
+        "text_match": raw_text.lower() == prepped_text.lower(),
+    }
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.stt_preprocess", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--audio-dir", type=Path, help="directory of recordings (default: synthetic)")
+    parser.add_argument("--model", default=None, help="faster-whisper model size (default: the app's)")
+    parser.add_argument("--beam-size", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=2, help="runs per file; the fastest is kept")
+    parser.add_argument("--out", help="results file (default bench/results/stt-preprocess-<sha>.json)")
+    args = parser.parse_args(argv)
+
+    recordings = load_recordings(args.audio_dir) if args.audio_dir else synthetic_recordings()
+    if not recordings:
+        print("no recordings found")
+        return 1
+
+    from faster_whisper import WhisperModel  # type: ignore
+    from services.transcribe_service import WHISPER_MODEL_SIZE
+    model = WhisperModel(args.model or WHISPER_MODEL_SIZE, device="cpu", compute_type="int8")
+
+    rows = []
+    for name, data in recordings:
+        row = bench_file(model, name, data, args.repeat, args.beam_size)
+        rows.append(row)
+        if "error" in row:
+            print(f"{name}: {row['error']}")
+            continue
+        print(f"{name:<28} {row['original_s']:6.2f}s -> {row['processed_s']:6.2f}s   "
+              f"raw {row['raw_inference_ms']:8.1f} ms   preprocessed {row['preprocessed_total_ms']:8.1f} ms   "
+              f"({row['reduction_pct']}%){'' if row['text_match'] else '   transcript differs'}")
+
+    ok = [r for r in rows if "error" not in r]
+    summary = {}
+    if ok:
+        raw_total = sum(r["raw_inference_ms"] for r in ok)
+        prepped_total = sum(r["preprocessed_total_ms"] for r in ok)
+        reductions = sorted(r["reduction_pct"] for r in ok if r["reduction_pct"] is not None)
+        summary = {
+            "files": len(ok),
+            "audio_s": round(sum(r["original_s"] for r in ok), 2),
+            "seconds_saved": round(sum(r["seconds_saved"] for r in ok), 2),
+            "raw_inference_ms": round(raw_total, 1),
+            "preprocessed_total_ms": round(prepped_total, 1),
+            "reduction_pct": round(100 * (1 - prepped_total / raw_total), 1) if raw_total else None,
+            "median_file_reduction_pct": percentile(reductions, 50) if reductions else None,
+            "transcripts_matching": sum(r["text_match"] for r in ok),
+        }
+        print(f"\n{summary['seconds_saved']}s of {summary['audio_s']}s trimmed; inference "
+              f"{summary['raw_inference_ms']} ms -> {summary['preprocessed_total_ms']} ms "
+              f"({summary['reduction_pct']}%), {summary['transcripts_matching']}/{len(ok)} transcripts identical")
+
+    sha = _git("rev-parse", "HEAD")
+    out = Path(args.out) if args.out else RESULTS_DIR / f"stt-preprocess-{(sha or 'unknown')[:12]}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"revision": sha, "summary": summary, "files": rows}, indent=2))
+    print(f"results: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,129 @@
+# backend/bench/stt_profiles.py
+"""
+Transcription profile benchmark: word error rate vs latency for each decoding profile
+(services.transcribe_service.PROFILES), on the local faster-whisper path the app uses.
+
+--audio-dir holds recordings plus a reference transcript next to each one (`confirm-01.webm`
++ `confirm-01.txt`). Recordings without a reference still get latency numbers. WER is the
+word-level edit distance summed over files, divided by the number of reference words, after
+lower-casing and stripping punctuation.
+
+    python -m bench.stt_profiles --audio-dir ~/clinic-recordings --profiles fast,balanced,accurate
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from bench.replay import RESULTS_DIR, _git, percentile
+from bench.stt_preprocess import AUDIO_SUFFIXES
+from services.audio_preprocess import preprocess
+
+WORD_RE = re.compile(r"[\w@.']+")
+
+
+def normalize_words(text: str) -> List[str]:
+    return [w.strip(".'") for w in WORD_RE.findall(text.lower()) if w.strip(".'")]
+
+
+def word_edits(ref: List[str], hyp: List[str]) -> int:
+    """Levenshtein distance over words (substitutions + insertions + deletions)."""
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1]
+
+
+def load_dataset(audio_dir: Path) -> List[Tuple[str, bytes, Optional[str]]]:
+    rows = []
+    for p in sorted(audio_dir.iterdir()):
+        if p.suffix.lower() not in AUDIO_SUFFIXES:
+            continue
+        ref = p.with_suffix(".txt")
+        rows.append((p.name, p.read_bytes(), ref.read_text().strip() if ref.exists() else None))
+    return rows
+
+
+def bench_profile(profile, clips: List[Tuple[str, Any, Optional[str]]], repeat: int) -> Dict[str, Any]:
+    from services.transcribe_service import transcribe_samples
+    transcribe_samples(clips[0][1], profile)  # loads the profile's model outside the timings
+    latencies, edits, ref_words, files = [], 0, 0, []
+    for name, samples, ref in clips:
+        best, text = None, ""
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            text = transcribe_samples(samples, profile)
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        latencies.append(best * 1000)
+        row = {"file": name, "ms": round(best * 1000, 1), "text": text}
+        if ref is not None:
+            ref_w = normalize_words(ref)
+            e = word_edits(ref_w, normalize_words(text))
+            edits += e
+            ref_words += len(ref_w)
+            row["wer"] = round(e / len(ref_w), 3) if ref_w else None
+        files.append(row)
+    latencies.sort()
+    return {
+        "profile": profile.name,
+        "model_size": profile.model_size,
+        "beam_size": profile.beam_size,
+        "language": profile.language,
+        "vad_filter": profile.vad_filter,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "wer": round(edits / ref_words, 4) if ref_words else None,
+        "files": files,
+    }
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.stt_profiles", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--audio-dir", type=Path, required=True, help="recordings with .txt references")
+    parser.add_argument("--profiles", default="fast,balanced,accurate")
+    parser.add_argument("--repeat", type=int, default=2, help="runs per file; the fastest is kept")
+    parser.add_argument("--out", help="results file (default bench/results/stt-profiles-<sha>.json)")
+    args = parser.parse_args(argv)
+
+    from services.transcribe_service import PROFILES
+    clips = []
+    for name, data, ref in load_dataset(args.audio_dir):
+        prepared = preprocess(data)
+        if prepared is None or prepared.processed_s == 0:
+            print(f"skipping {name}: could not preprocess or silent")
+            continue
+        clips.append((name, prepared.samples, ref))
+    if not clips:
+        print("no usable recordings")
+        return 1
+
+    results = []
+    print(f"{'profile':<10} {'model':<7} {'beam':>4} {'lang':>5} {'vad':>4} {'p50 ms':>9} {'p95 ms':>9} {'WER':>7}")
+    for name in [p.strip() for p in args.profiles.split(",") if p.strip()]:
+        if name not in PROFILES:
+            print(f"unknown profile {name!r}")
+            continue
+        r = bench_profile(PROFILES[name], clips, args.repeat)
+        results.append(r)
+        wer = f"{r['wer'] * 100:6.1f}%" if r["wer"] is not None else "    n/a"
+        print(f"{name:<10} {r['model_size']:<7} {r['beam_size']:>4} {r['language'] or 'auto':>5} "
+              f"{'on' if r['vad_filter'] else 'off':>4} {r['p50_ms']:>9} {r['p95_ms']:>9} {wer}")
+
+    sha = _git("rev-parse", "HEAD")
+    out = Path(args.out) if args.out else RESULTS_DIR / f"stt-profiles-{(sha or 'unknown')[:12]}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"revision": sha, "profiles": results}, indent=2))
+    print(f"results: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
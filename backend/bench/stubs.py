@@ -0,0 +1,197 @@
+# backend/bench/stubs.py
+"""
+Local stand-ins for the external providers, each with configurable latency:
+
+  OpenAI      POST /v1/responses, POST /v1/audio/transcriptions   (point OPENAI_BASE_URL here)
+  ElevenLabs  POST /v1/text-to-speech/{voice_id}                   (elevenlabs.json "base_url")
+  SMTP        plain (no TLS) EHLO/MAIL/RCPT/DATA/QUIT responder     (smtp.json host/port)
+"""
+
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_MP3 = b"ID3" + b"\x00" * 16 * 1024
+
+EXTRACTION_JSON = {
+    "intent": "book_appointment",
+    "doctor_name": None,
+    "patient_name": None,
+    "patient_email": None,
+    "requested_slot": None,
+    "candidate_slots": [],
+    "chief_complaint": None,
+}
+
+
+def _approx_tokens(value) -> int:
+    return max(1, len(json.dumps(value) if not isinstance(value, str) else value) // 4)
+
+
+def _schema_entities(schema: dict, user_text: str) -> dict:
+    """An object shaped like the requested JSON schema, complaint filled with the user's text."""
+    out = {}
+    for name, prop in (schema.get("properties") or {}).items():
+        types = prop.get("type")
+        if prop.get("enum"):
+            out[name] = prop["enum"][0]
+        elif types == "array" or (isinstance(types, list) and "array" in types):
+            out[name] = []
+        elif "complaint" in name:
+            out[name] = user_text
+        else:
+            out[name] = None
+    return out
+
+
+def _response_body(text: str, input_tokens: int = 200) -> dict:
+    return {
+        "id": "resp_bench",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": "gpt-4o-mini",
+        "status": "completed",
+        "output": [{
+            "type": "message",
+            "id": "msg_bench",
+            "status": "completed",
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {"input_tokens": input_tokens, "output_tokens": _approx_tokens(text),
+                  "total_tokens": input_tokens + _approx_tokens(text),
+                  "input_tokens_details": {"cached_tokens": 0}, "output_tokens_details": {"reasoning_tokens": 0}},
+    }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    latency_s = 0.0
+    transcript = "I would like to book an appointment"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        path = self.path.split("?", 1)[0]
+        if path.endswith("/responses"):
+            try:
+                req = json.loads(raw or b"{}")
+            except ValueError:
+                req = {}
+            try:
+                user_text = req["input"][-1]["content"][0]["text"]
+            except Exception:
+                user_text = ""
+            schema = ((req.get("text") or {}).get("format") or {}).get("schema")
+            if schema:
+                text = json.dumps(_schema_entities(schema, user_text))
+            elif "JSON" in str(req.get("instructions") or ""):
+                entities = dict(EXTRACTION_JSON)
+                entities["chief_complaint"] = user_text or None
+                text = json.dumps(entities)
+            else:
+                text = "Could you tell me which doctor you would like to see?"
+            input_tokens = _approx_tokens(req.get("instructions") or "") + _approx_tokens(req.get("input") or "") \
+                + (_approx_tokens(schema) if schema else 0)
+            self._send(200, json.dumps(_response_body(text, input_tokens)).encode(), "application/json")
+        elif path.endswith("/audio/transcriptions"):
+            self._send(200, json.dumps({"text": self.transcript}).encode(), "application/json")
+        elif "/text-to-speech/" in path:
+            self._send(200, FAKE_MP3, "audio/mpeg")
+        else:
+            self._send(404, b"{}", "application/json")
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    latency_s = 0.0
+
+    def _reply(self, line: str):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        self._reply("220 bench-smtp ready")
+        in_data = False
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if in_data:
+                if line in (b".\r\n", b".\n"):
+                    in_data = False
+                    if self.latency_s:
+                        time.sleep(self.latency_s)
+                    self._reply("250 OK queued")
+                continue
+            cmd = line.decode(errors="replace").strip().upper()
+            if cmd.startswith("EHLO"):
+                self.wfile.write(b"250-bench-smtp\r\n250 SIZE 10485760\r\n")
+            elif cmd.startswith("HELO"):
+                self._reply("250 bench-smtp")
+            elif cmd.startswith("DATA"):
+                in_data = True
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+            elif cmd.startswith("QUIT"):
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("250 OK")
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StubServers:
+    """Start HTTP (OpenAI + ElevenLabs) and SMTP stubs on free localhost ports."""
+
+    def __init__(self, openai_latency_ms: float = 300, eleven_latency_ms: float = 400, smtp_latency_ms: float = 100):
+        openai_s, eleven_s = openai_latency_ms / 1000.0, eleven_latency_ms / 1000.0
+
+        # one HTTP server for both providers; latency chosen per path
+        class Handler(_StubHandler):
+            def do_POST(self):
+                self.latency_s = eleven_s if "/text-to-speech/" in self.path else openai_s
+                super().do_POST()
+
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        smtp_handler = type("SmtpStub", (_SmtpHandler,), {"latency_s": smtp_latency_ms / 1000.0})
+        self.smtp = _ThreadingTCPServer(("127.0.0.1", 0), smtp_handler)
+        self._threads = []
+
+    @property
+    def http_base(self) -> str:
+        host, port = self.http.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def smtp_port(self) -> int:
+        return self.smtp.server_address[1]
+
+    def __enter__(self):
+        for srv in (self.http, self.smtp):
+            t = threading.Thread(target=srv.serve_forever, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def __exit__(self, *exc):
+        for srv in (self.http, self.smtp):
+            srv.shutdown()
+            srv.server_close()
@@ -0,0 +1,180 @@
+# backend/bench/tts_formats.py
+"""
+TTS output format benchmark: payload bytes per turn and time-to-playback on throttled links.
+
+For each reply phrase, the MP3 source comes from --mp3-dir (one file per phrase, e.g. saved
+provider output), from gTTS when it is installed and reachable, or from a synthetic tone of a
+speech-like duration. Each format's converse-style JSON payload ({"reply", "audio_base64", ...})
+is then served by a local HTTP server that paces its writes to the link's bandwidth after one
+RTT. Time-to-playback is request start -> body received -> JSON parsed -> base64 decoded,
+which is when the browser can start the data: URI.
+
+    python -m bench.tts_formats --links slow-3g,fast-3g,4g --formats mp3,opus,pcm
+"""
+
+import argparse
+import base64
+import io
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from bench.replay import RESULTS_DIR, _git, percentile
+from services.audio_formats import FORMATS, MIME, transcode
+
+# (downlink bits/s, RTT seconds); roughly the browser devtools throttling presets
+LINKS = {
+    "slow-3g": (400_000, 0.4),
+    "fast-3g": (1_600_000, 0.15),
+    "4g": (9_000_000, 0.06),
+}
+
+PHRASES = [
+    "Hello! I'm Astra, NovaCare's virtual receptionist. How can I help you today?",
+    "Please tell me a preferred slot/time (e.g., 'tomorrow 3pm' or 'Fri 16:00').",
+    "Shall I confirm the booking? Please say yes or no.",
+    "Could you please tell me your email address so I can send the confirmation?",
+    "Your appointment is booked. You'll receive a confirmation email shortly. Is there anything else?",
+]
+
+
+def _tone_mp3(seconds: float) -> bytes:
+    import av  # type: ignore
+    import numpy as np
+    rate = 24000
+    t = np.arange(int(rate * seconds)) / rate
+    x = (0.3 * np.sin(2 * np.pi * 200 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t))).astype(np.float32)
+    buf = io.BytesIO()
+    with av.open(buf, "w", format="mp3") as out:
+        stream = out.add_stream("libmp3lame", rate=rate, layout="mono")
+        stream.bit_rate = 32000  # what gTTS returns
+        for i in range(0, x.size, 1152):
+            frame = av.AudioFrame.from_ndarray(x[None, i:i + 1152], format="flt", layout="mono")
+            frame.sample_rate = rate
+            for packet in stream.encode(frame):
+                out.mux(packet)
+        for packet in stream.encode(None):
+            out.mux(packet)
+    return buf.getvalue()
+
+
+def source_audio(mp3_dir: Path = None) -> List[Tuple[str, bytes]]:
+    if mp3_dir:
+        return [(p.name, p.read_bytes()) for p in sorted(mp3_dir.glob("*.mp3"))]
+    try:
+        from gtts import gTTS  # type: ignore
+        out = []
+        for phrase in PHRASES:
+            buf = io.BytesIO()
+            gTTS(text=phrase, lang="en").write_to_fp(buf)
+            out.append((phrase, buf.getvalue()))
+        return out
+    except Exception:
+        # ~14 characters of speech per second
+        return [(phrase, _tone_mp3(len(phrase) / 14.0)) for phrase in PHRASES]
+
+
+class _ThrottledPayloads(BaseHTTPRequestHandler):
+    payloads: Dict[str, bytes] = {}
+    bandwidth_bps = 1_000_000
+    rtt_s = 0.1
+
+    def do_GET(self):
+        body = self.payloads.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        time.sleep(self.rtt_s)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        tick = 0.01
+        chunk = max(1, int(self.bandwidth_bps / 8 * tick))
+        start = time.perf_counter()
+        for sent in range(0, len(body), chunk):
+            self.wfile.write(body[sent:sent + chunk])
+            # pace against the schedule rather than sleeping a fixed tick, so write time is absorbed
+            due = start + (sent + chunk) * 8 / self.bandwidth_bps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def log_message(self, *args):
+        pass
+
+
+def time_to_playback(url: str) -> float:
+    import requests
+    t0 = time.perf_counter()
+    data = requests.get(url).json()
+    base64.b64decode(data["audio_base64"])
+    return time.perf_counter() - t0
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.tts_formats", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mp3-dir", type=Path, help="provider MP3s to use as sources")
+    parser.add_argument("--links", default="slow-3g,fast-3g,4g")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="results file (default bench/results/tts-formats-<sha>.json)")
+    args = parser.parse_args(argv)
+
+    sources = source_audio(args.mp3_dir)
+    if not sources:
+        print("no source audio")
+        return 1
+    formats = [f for f in args.formats.split(",") if f in FORMATS]
+
+    payloads: Dict[str, bytes] = {}
+    encode: Dict[str, Dict[str, Any]] = {}
+    for fmt in formats:
+        sizes, transcode_ms = [], []
+        for i, (phrase, mp3) in enumerate(sources):
+            t0 = time.perf_counter()
+            audio = transcode(mp3, fmt)
+            transcode_ms.append((time.perf_counter() - t0) * 1000)
+            body = json.dumps({"ok": True, "reply": phrase, "audio_base64": base64.b64encode(audio).decode(),
+                               "audio_format": fmt, "audio_mime": MIME[fmt]}).encode()
+            payloads[f"/{fmt}/{i}"] = body
+            sizes.append(len(body))
+        encode[fmt] = {"payload_kb_per_turn": round(sum(sizes) / len(sizes) / 1024, 1),
+                       "transcode_ms": round(sum(transcode_ms) / len(transcode_ms), 1)}
+
+    _ThrottledPayloads.payloads = payloads
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ThrottledPayloads)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for link in [l for l in args.links.split(",") if l in LINKS]:
+            _ThrottledPayloads.bandwidth_bps, _ThrottledPayloads.rtt_s = LINKS[link]
+            print(f"\n{link} ({LINKS[link][0] // 1000} kbit/s, {LINKS[link][1] * 1000:.0f} ms RTT)")
+            print(f"  {'format':<6} {'KB/turn':>8} {'transcode ms':>13} {'p50 ttp ms':>11} {'p95 ttp ms':>11}")
+            for fmt in formats:
+                ttp = sorted(time_to_playback(f"{base}/{fmt}/{i}") * 1000
+                             for _ in range(args.repeat) for i in range(len(sources)))
+                row = {**encode[fmt], "p50_ttp_ms": round(percentile(ttp, 50), 1),
+                       "p95_ttp_ms": round(percentile(ttp, 95), 1)}
+                results.setdefault(link, {})[fmt] = row
+                print(f"  {fmt:<6} {row['payload_kb_per_turn']:>8} {row['transcode_ms']:>13} "
+                      f"{row['p50_ttp_ms']:>11} {row['p95_ttp_ms']:>11}")
+    finally:
+        server.shutdown()
+
+    sha = _git("rev-parse", "HEAD")
+    out = Path(args.out) if args.out else RESULTS_DIR / f"tts-formats-{(sha or 'unknown')[:12]}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"revision": sha, "links": results}, indent=2))
+    print(f"\nresults: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -1,11 +1,31 @@
-from fastapi import FastAPI
+import time
+from services.startup import PROFILE_IMPORTS, enable_import_profile, import_profile_report, preload_status, start_preload
+if PROFILE_IMPORTS:
+    enable_import_profile()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from routes import auth, doctor, booking,  voice, session
 from routes import doctors_api, bookings_api
 from routes import session_api
-from routes import voice
+from routes import availability_api
+from routes import metrics
+from services.metrics import HTTP_SECONDS, begin_request_timings, end_request_timings, server_timing_header
+from services.tts_service import tts_provider_status
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if PROFILE_IMPORTS:
+        report = import_profile_report()
+        print("slowest imports (cumulative):")
+        for name, secs in report:
+            print(f"  {secs * 1000:8.1f} ms  {name}")
+    # heavy components warm up in the background; the server answers immediately
+    start_preload()
+    yield
 
-app = FastAPI(title="Speedchain Assignment - AI Receptionist Backend")
+app = FastAPI(title="Speedchain Assignment - AI Receptionist Backend", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,6 +35,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def stage_timing(request: Request, call_next):
+    timings, token = begin_request_timings()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        end_request_timings(token)
+    elapsed = time.perf_counter() - start
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    HTTP_SECONDS.observe((request.method, route, str(response.status_code)), elapsed)
+    if request.url.path.startswith("/api/voice/"):
+        response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    return response
+
 app.include_router(auth.router, prefix="/api/auth")
 app.include_router(doctor.router, prefix="/api/doctors")
 app.include_router(booking.router, prefix="/api/bookings")
@@ -23,8 +58,13 @@ app.include_router(session.router, prefix="/api/sessions")
 app.include_router(doctors_api.router)
 app.include_router(bookings_api.router)
 app.include_router(session_api.router)
-app.include_router(voice.router, prefix="/api/voice")
+app.include_router(availability_api.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 def root():
     return {"status": "ok", "message": "AI Receptionist backend is running"}
+
+@app.get("/health")
+def health():
+    return {"status": "ok", **preload_status(), "tts_providers": tts_provider_status()}
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from services.auth_service import authenticate_admin, create_session_token, validate_token
+from services.auth_service import authenticate_admin_async, create_session_token, validate_token
 
 router = APIRouter()
 
@@ -12,8 +12,8 @@ class TokenResponse(BaseModel):
     token: str
 
 @router.post("/login", response_model=TokenResponse)
-def login(req: LoginRequest):
-    ok = authenticate_admin(req.username, req.password)
+async def login(req: LoginRequest):
+    ok = await authenticate_admin_async(req.username, req.password)
     if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     token = create_session_token(req.username)
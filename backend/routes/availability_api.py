@@ -0,0 +1,67 @@
+# backend/routes/availability_api.py
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from datetime import date, datetime
+from services.availability_service import get_availability_index, parse_minute, TIME_OF_DAY
+from services.booking_service import load_bookings
+from services.slot_engine import get_engine
+from services.time_utils import IST
+
+router = APIRouter(prefix="/api")
+
+@router.get("/availability")
+def search_availability(
+    specialization: Optional[str] = Query(None, description="Case-insensitive specialization filter"),
+    date_from: Optional[date] = Query(None, description="First day (YYYY-MM-DD), default today (IST)"),
+    date_to: Optional[date] = Query(None, description="Last day (YYYY-MM-DD), default date_from + 6 days"),
+    time_of_day: Optional[str] = Query(None, description="morning | afternoon | evening"),
+    time_from: Optional[str] = Query(None, description="HH:MM, inclusive"),
+    time_to: Optional[str] = Query(None, description="HH:MM, exclusive"),
+    doctor_id: Optional[int] = Query(None),
+    limit_per_doctor: int = Query(20, ge=1, le=500),
+):
+    """
+    Free slots across doctors, answered from per-doctor free/busy bitmaps.
+    """
+    minute_from, minute_to = 0, 24 * 60
+    if time_of_day:
+        window = TIME_OF_DAY.get(time_of_day.strip().lower())
+        if not window:
+            raise HTTPException(status_code=400, detail="time_of_day must be one of: " + ", ".join(TIME_OF_DAY))
+        minute_from, minute_to = window
+    if time_from:
+        minute_from = parse_minute(time_from)
+    if time_to:
+        minute_to = parse_minute(time_to)
+    if minute_from is None or minute_to is None:
+        raise HTTPException(status_code=422, detail="time_from/time_to must be HH:MM between 00:00 and 23:59")
+    if date_from and date_to and date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+
+    results = get_availability_index().query(
+        specialization=specialization, date_from=date_from, date_to=date_to,
+        minute_from=minute_from, minute_to=minute_to, doctor_id=doctor_id,
+        limit_per_doctor=limit_per_doctor,
+    )
+    return {"ok": True, "count": sum(len(r["slots"]) for r in results), "results": results}
+
+
+@router.get("/availability/next")
+def next_free_slot(
+    specialization: Optional[str] = Query(None, description="Case-insensitive specialization, default any"),
+    after: Optional[datetime] = Query(None, description="ISO date-time, default now; naive values are IST"),
+    horizon_days: int = Query(28, ge=1, le=90),
+):
+    """
+    Earliest slot with capacity left across the specialization's doctors, from the engine's week-minute index.
+    """
+    if after is not None and after.tzinfo is None:
+        after = after.replace(tzinfo=IST)
+    engine = get_engine()
+    inst = engine.next_free_slot(specialization, after=after, bookings=load_bookings(), horizon_days=horizon_days)
+    if inst is None:
+        return {"ok": True, "slot": None}
+    doctor = engine.doctors_by_id.get(inst.doctor_id) or {}
+    slot = inst.to_dict()
+    slot["doctor"] = {"id": inst.doctor_id, "name": doctor.get("name"), "specialization": doctor.get("specialization")}
+    return {"ok": True, "slot": slot}
@@ -1,16 +1,22 @@
 # backend/routes/booking.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr
 from typing import Optional
+from datetime import date
 import json
 from pathlib import Path
 from services.email_service import send_confirmation_email
+from services.availability_service import notify_booking_created
+from services.doctor_catalog import get_catalog
+from services.slot_engine import get_engine
+from services.booking_service import get_booking_index, load_bookings, save_bookings, MAX_PAGE_SIZE
+from services.shared_state import file_lock
 
 router = APIRouter()
 
 DATA_DIR = Path(__file__).resolve().parents[2] / "data"
 BOOKINGS_FILE = DATA_DIR / "bookings.json"
-DOCTORS_FILE = DATA_DIR / "doctors.json"
 
 class BookingRequest(BaseModel):
     doctor_id: int
@@ -19,43 +25,35 @@ class BookingRequest(BaseModel):
     requested_slot: str  # must be one of doctor's available_slots ideally
     note: Optional[str] = None
 
-def _ensure_files():
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    if not BOOKINGS_FILE.exists():
-        BOOKINGS_FILE.write_text(json.dumps([], indent=2))
-    if not DOCTORS_FILE.exists():
-        DOCTORS_FILE.write_text(json.dumps({"doctors": []}, indent=2))
-
 @router.post("/create")
 def create_booking(req: BookingRequest):
-    _ensure_files()
-    bookings = json.loads(BOOKINGS_FILE.read_text()) if BOOKINGS_FILE.exists() else []
-    doctors = json.loads(DOCTORS_FILE.read_text()).get("doctors", []) if DOCTORS_FILE.exists() else []
-
-    doctor = next((d for d in doctors if d.get("id") == req.doctor_id), None)
+    doctor = get_catalog().by_id.get(req.doctor_id)
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor not found")
 
-    # Conflict check
-    for b in bookings:
-        if b.get("doctor_id") == req.doctor_id and b.get("requested_slot") == req.requested_slot:
+    with file_lock(BOOKINGS_FILE):
+        bookings = load_bookings()
+
+        # Conflict check: the slot is taken once its capacity is used up
+        if not get_engine().label_has_room(req.doctor_id, req.requested_slot, bookings):
             raise HTTPException(status_code=409, detail="Requested slot already booked for this doctor")
 
-    note = req.note or ""
-    if req.requested_slot not in doctor.get("available_slots", []):
-        note = note + " [requested slot not in doctor's listed slots]"
+        note = req.note or ""
+        if req.requested_slot not in doctor.get("available_slots", []):
+            note = note + " [requested slot not in doctor's listed slots]"
 
-    booking = {
-        "id": (bookings[-1]["id"] + 1) if bookings else 1,
-        "doctor_id": req.doctor_id,
-        "doctor_name": doctor.get("name"),
-        "patient_name": req.patient_name,
-        "patient_email": req.patient_email,
-        "requested_slot": req.requested_slot,
-        "note": note
-    }
-    bookings.append(booking)
-    BOOKINGS_FILE.write_text(json.dumps(bookings, indent=2))
+        booking = {
+            "id": (bookings[-1]["id"] + 1) if bookings else 1,
+            "doctor_id": req.doctor_id,
+            "doctor_name": doctor.get("name"),
+            "patient_name": req.patient_name,
+            "patient_email": req.patient_email,
+            "requested_slot": req.requested_slot,
+            "note": note
+        }
+        bookings.append(booking)
+        gen = save_bookings(bookings, changed=[booking])
+    notify_booking_created(booking, gen)
 
     subject = f"Appointment Confirmed — {doctor.get('name')}"
     body = f"Hello {req.patient_name},\n\nYour appointment with {doctor.get('name')} ({doctor.get('specialization')}) is confirmed for {req.requested_slot}.\n\nRegards,\nNovaCare Wellness Clinic"
@@ -65,24 +63,54 @@ def create_booking(req: BookingRequest):
     return {"ok": True, "booking": booking, "email_sent": booking["email_sent"]}
 
 @router.get("/list")
-def list_bookings():
-    _ensure_files()
+def list_bookings(
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    doctor_id: Optional[int] = Query(None),
+    patient_email: Optional[str] = Query(None),
+    date_from: Optional[date] = Query(None, description="Created on/after (YYYY-MM-DD, IST)"),
+    date_to: Optional[date] = Query(None, description="Created on/before (YYYY-MM-DD, IST)"),
+):
     try:
-        bookings = json.loads(BOOKINGS_FILE.read_text())
-        return {"ok": True, "bookings": bookings}
+        items, next_cursor = get_booking_index().page(
+            cursor=cursor, limit=limit, doctor_id=doctor_id, patient_email=patient_email,
+            date_from=date_from.isoformat() if date_from else None,
+            date_to=date_to.isoformat() if date_to else None,
+        )
+        return {"ok": True, "bookings": items, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/export")
+def export_bookings(
+    doctor_id: Optional[int] = Query(None),
+    patient_email: Optional[str] = Query(None),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+):
+    """
+    NDJSON stream (one booking per line) of all matching bookings.
+    Lines are produced lazily from a single index snapshot.
+    """
+    idx = get_booking_index()
+    positions = idx.iter_positions(
+        doctor_id=doctor_id, patient_email=patient_email,
+        date_from=date_from.isoformat() if date_from else None,
+        date_to=date_to.isoformat() if date_to else None,
+    )
+
+    def lines():
+        for pos in positions:
+            yield json.dumps(idx.bookings[pos], ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": "attachment; filename=bookings.ndjson"})
+
 @router.get("/{booking_id}")
 def get_booking(booking_id: int):
-    _ensure_files()
-    try:
-        bookings = json.loads(BOOKINGS_FILE.read_text())
-        b = next((x for x in bookings if x.get("id") == booking_id), None)
-        if not b:
-            raise HTTPException(status_code=404, detail="Booking not found")
-        return {"ok": True, "booking": b}
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    b = get_booking_index().get(booking_id)
+    if not b:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    return {"ok": True, "booking": b}
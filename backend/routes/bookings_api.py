@@ -1,8 +1,9 @@
 # backend/routes/bookings_api.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, EmailStr
 from typing import Optional
-from services.booking_service import create_booking, find_doctor_by_name_or_id, load_doctors
+from services.booking_service import create_booking, cancel_booking, find_doctor_by_name_or_id, load_doctors
+from services.auth_service import validate_token
 from services.time_utils import now_ist_iso
 
 router = APIRouter(prefix="/api")
@@ -37,3 +38,13 @@ def api_create_booking(payload: BookingCreate):
         return {"ok": True, "booking": booking}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/bookings/{booking_id}/cancel")
+def api_cancel_booking(booking_id: int, admin_token: str = Query(..., description="Admin session token")):
+    if not validate_token(admin_token):
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    try:
+        booking = cancel_booking(booking_id)
+        return {"ok": True, "booking": booking}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
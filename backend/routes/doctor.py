@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, Body, Query
+from fastapi import APIRouter, HTTPException, Body, Query, Request
 from typing import List, Optional
 from pydantic import BaseModel
-from services.doctor_service import get_all_doctors, update_doctor_by_id, get_doctor_by_id
+from services.doctor_service import update_doctor_by_id
+from services.doctor_catalog import get_catalog
+from utils.http_cache import serialize_json, cached_json_response
 
 router = APIRouter()
 
@@ -13,15 +15,21 @@ class DoctorModel(BaseModel):
     available_slots: Optional[List[str]] = []
 
 @router.get("/", response_model=List[DoctorModel])
-def list_doctors():
-    return get_all_doctors()
+def list_doctors(request: Request):
+    catalog = get_catalog()
+    body, etag = catalog.serialized(
+        ("doctor_list",), lambda: serialize_json([DoctorModel(**d).dict() for d in catalog.doctors])
+    )
+    return cached_json_response(request, body, etag)
 
 @router.get("/{doctor_id}", response_model=DoctorModel)
-def get_doctor(doctor_id: int):
-    doc = get_doctor_by_id(doctor_id)
+def get_doctor(doctor_id: int, request: Request):
+    catalog = get_catalog()
+    doc = catalog.by_id.get(doctor_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Doctor not found")
-    return doc
+    body, etag = catalog.serialized(("doctor", doctor_id), lambda: serialize_json(DoctorModel(**doc).dict()))
+    return cached_json_response(request, body, etag)
 
 @router.put("/{doctor_id}", response_model=DoctorModel)
 def update_doctor(doctor_id: int, payload: DoctorModel = Body(...), admin_token: str = Query(..., description="Admin session token")):
@@ -1,18 +1,25 @@
 # backend/routes/doctors_api.py
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request
 from typing import List, Optional
-from services.booking_service import load_doctors
-from fastapi.responses import JSONResponse
+from services.doctor_catalog import get_catalog
+from utils.http_cache import serialize_json, cached_json_response
 
 router = APIRouter(prefix="/api")
 
 @router.get("/doctors", response_model=List[dict])
-def get_doctors(specialization: Optional[str] = Query(None, description="Optional specialization filter")):
+def get_doctors(request: Request, specialization: Optional[str] = Query(None, description="Optional specialization filter")):
     """
     Returns the list of doctors. If 'specialization' query param provided, filters by that (case-insensitive).
+    Responses carry a strong ETag; a matching If-None-Match gets 304.
     """
-    docs = load_doctors()
-    if specialization:
-        s = specialization.strip().lower()
-        docs = [d for d in docs if d.get("specialization") and s in d.get("specialization").lower()]
-    return JSONResponse(content=docs)
+    catalog = get_catalog()
+    s = specialization.strip().lower() if specialization else ""
+
+    def build():
+        docs = catalog.doctors
+        if s:
+            docs = [d for d in docs if d.get("specialization") and s in d.get("specialization").lower()]
+        return serialize_json(docs)
+
+    body, etag = catalog.serialized(("doctors_api", s), build)
+    return cached_json_response(request, body, etag)
@@ -0,0 +1,11 @@
+# backend/routes/metrics.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from services.metrics import render_prometheus
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of per-stage and per-route latency histograms."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,6 +1,7 @@
 # backend/routes/session.py
-from fastapi import APIRouter, HTTPException
-from services.session_service import get_session, load_all_sessions
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from services.session_service import get_session, list_sessions_page, MAX_PAGE_SIZE
 
 router = APIRouter()
 
@@ -12,7 +13,17 @@ def get_session_route(session_id: str):
     return {"ok": True, "session": s}
 
 @router.get("/")
-def list_sessions():
+def list_sessions(
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated fields; default id,state,created_at,message_count,last_activity"),
+):
     # for debugging/demo only
-    sessions = load_all_sessions()
-    return {"ok": True, "sessions": sessions}
+    try:
+        items, next_cursor, total = list_sessions_page(
+            cursor=cursor, limit=limit,
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"ok": True, "sessions": items, "next_cursor": next_cursor, "total": total}
@@ -1,14 +1,23 @@
 # backend/routes/voice.py
-from fastapi import APIRouter, UploadFile, File
+from fastapi import APIRouter, UploadFile, File, Form, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import traceback, json, re, os
-from services.transcribe_service import transcribe_audio_bytes
-from services.llm_service import chat_with_llm, extract_entities_via_llm
-from services.tts_service import text_to_speech_base64
-from services.session_service import create_session, get_session, append_message, update_session
-from services.booking_service import create_booking, find_doctor_by_name_or_id, load_doctors, load_bookings, save_bookings
+from services.transcribe_service import select_profile, transcribe_audio_bytes
+from services.llm_service import cached_ratio, chat_with_llm, extract_entities_via_llm
+from services.tts_service import audio_format_scope, text_to_speech_base64
+from services.audio_formats import MIME, negotiate as negotiate_audio_format
+from services.deadline import BUDGET_HEADER, parse_budget_ms, turn_deadline
+from services.session_service import SESSIONS_FILE, create_session, get_session, append_message, update_session
+from services.booking_service import BOOKINGS_FILE, create_booking, find_doctor_by_name_or_id, load_doctors, load_bookings, save_bookings
+from services.shared_state import file_lock
 from services.time_utils import now_ist_iso
+from services.debug_log import llm_debug_log
+from services.entity_matcher import get_matcher
+from services.doctor_catalog import get_catalog
+from services.slot_engine import parse_slot_label, parse_time_of_day, resolve_relative_date
+from functools import lru_cache
 from datetime import datetime
 
 router = APIRouter()
@@ -38,24 +47,11 @@ SPECIALTY_PHRASE_MAP = {
     "general": "General Medicine"
 }
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
-LLM_DEBUG_PATH = os.path.join(DATA_DIR, "llm_debug.json")
-
 
 def _append_llm_debug(entry: dict):
+    # queued for the background JSONL writer; never blocks the turn
     try:
-        os.makedirs(DATA_DIR, exist_ok=True)
-        arr = []
-        if os.path.exists(LLM_DEBUG_PATH):
-            try:
-                with open(LLM_DEBUG_PATH, "r", encoding="utf-8") as f:
-                    arr = json.load(f) or []
-            except Exception:
-                arr = []
-        arr.append(entry)
-        arr = arr[-300:]
-        with open(LLM_DEBUG_PATH, "w", encoding="utf-8") as f:
-            json.dump(arr, f, ensure_ascii=False, indent=2)
+        llm_debug_log.write(entry)
     except Exception:
         pass
 
@@ -64,39 +60,13 @@ def _append_llm_debug(entry: dict):
 def detect_specialization_from_text(text: str) -> Optional[str]:
     if not text:
         return None
-    s = text.strip().lower()
-    PHRASE_MAP = {
-        "gp": "General Medicine",
-        "general physician": "General Medicine",
-        "general medicine": "General Medicine",
-        "dermatology": "Dermatology",
-        "cardiology": "Cardiology",
-        "ophthalmology": "Ophthalmology",
-        "dentistry": "Dentistry",
-        "skin": "Dermatology",
-        "tooth": "Dentistry",
-    }
-    for phrase, canon in PHRASE_MAP.items():
-        if s == phrase or re.search(r'\b' + re.escape(phrase) + r'\b', s):
-            return canon
-
-    SYMPTOM_MAP = {
-        "Dermatology": ["skin", "rash", "itch", "acne", "eczema", "psoriasis", "skin allergy", "rashes"],
-        "Cardiology": ["heart", "chest pain", "palpitation", "palpitations", "shortness of breath", "heart pain"],
-        "Ophthalmology": ["eye", "vision", "blurry", "red eye", "eye pain"],
-        "Dentistry": ["toothache", "tooth", "teeth", "dental", "cavity"],
-        "General Medicine": ["fever", "temperature", "cough", "cold", "headache", "body pain", "pain", "sore", "ill", "sick"]
-    }
-
-    for spec, terms in SYMPTOM_MAP.items():
-        for t in terms:
-            if re.search(r'\b' + re.escape(t) + r'\b', s):
-                return spec
-    for spec, terms in SYMPTOM_MAP.items():
-        for t in terms:
-            if t in s:
-                return spec
-    return None
+    matcher = get_matcher()
+    spec = matcher.scan(text.strip())["specialization"]
+    if spec:
+        return spec
+    # ASR-mangled specialization names ("dermatalogy"), only when the text has a specialty cue
+    cand = matcher.fuzzy.best_specialization(text)
+    return cand["specialization"] if cand else None
 
 
 def load_doctors_safe() -> List[Dict[str, Any]]:
@@ -114,29 +84,23 @@ def find_doctors_for_specialization(spec: str) -> List[Dict[str, Any]]:
     if not spec:
         return []
     spec_l = spec.lower().strip()
-    matched = [d for d in docs if d.get("specialization") and spec_l == d.get("specialization").lower()]
+    matched = get_catalog().by_specialization.get(spec_l)
     if matched:
-        return matched
+        return list(matched)
     matched = [d for d in docs if (d.get("specialization") and spec_l in d.get("specialization").lower()) or (d.get("name") and spec_l in d.get("name").lower())]
     return matched
 
 
 def detect_doctor_name_in_text(text: str) -> Optional[Dict[str, Any]]:
-    docs = load_doctors_safe()
     if not text:
         return None
-    t = text.lower()
-    for d in docs:
-        name = (d.get("name") or "").lower()
-        if name and name in t:
-            return d
-    for d in docs:
-        name = (d.get("name") or "").lower()
-        tokens = [tok for tok in re.split(r'\s+', name) if tok]
-        for tok in tokens:
-            if tok and re.search(r'\b' + re.escape(tok) + r'\b', t):
-                return d
-    return None
+    matcher = get_matcher()
+    doc = matcher.scan(text)["doctor"]
+    if doc:
+        return doc
+    # ASR-mangled names ("doctor gupter")
+    cand = matcher.fuzzy.best_doctor(text)
+    return cand["doctor"] if cand else None
 
 
 def extract_patient_name_from_text(text: str) -> Optional[str]:
@@ -185,6 +149,7 @@ TIME_RE = re.compile(r'(\d{1,2})(?::|[\s]?[\.]?[\s]?)(\d{1,2})?(?:[:\s]?(\d{1,2}
 DAY_RE = re.compile(r'\b(mon(?:day)?|tue(?:sday)?|wed(?:nesday)?|thu(?:rsday)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?)\b', re.I)
 
 
+@lru_cache(maxsize=2048)
 def normalize_slot_text(slot: str) -> str:
     s = (slot or "").strip()
     day_m = DAY_RE.search(s)
@@ -234,6 +199,16 @@ def match_slot_from_text(text: str, available_slots: List[str]) -> Optional[str]
     user_norm = normalize_slot_text(t).lower()
     if user_norm in norm_map:
         return norm_map[user_norm]
+    # relative day ("tomorrow 10am", "day after tomorrow") resolved on the IST clock
+    if not DAY_RE.search(t):
+        rel = resolve_relative_date(t)
+        if rel:
+            minute = parse_time_of_day(t)
+            for s in available_slots:
+                parsed = parse_slot_label(s)
+                if parsed and parsed[0] == rel.weekday() and (minute is None or parsed[1] == minute):
+                    return s
+            return None
     time_only = re.search(r'\b\d{1,2}(?::\d{2})?\s*(am|pm)?\b', t, re.I)
     if time_only:
         ut = time_only.group(0).strip().lower()
@@ -267,21 +242,64 @@ def match_slot_from_text(text: str, available_slots: List[str]) -> Optional[str]
 class ConverseRequest(BaseModel):
     session_id: Optional[str] = None
     text: str
+    audio_format: Optional[str] = None  # mp3 | opus | pcm; else from the Accept header
+
+
+def _transcribe_for_session(content: bytes, filename_hint: str, session_id: Optional[str], profile: Optional[str]):
+    # decoding effort follows what the conversation is waiting for (see EXPECT_PROFILES)
+    session = get_session(session_id) if session_id and not profile else None
+    chosen = select_profile(profile, (session or {}).get("expect"))
+    return transcribe_audio_bytes(content, filename_hint=filename_hint, profile=chosen)
 
 
 # ---------------- routes ----------------
 @router.post("/transcribe")
-async def transcribe(file: UploadFile = File(...)):
+async def transcribe(request: Request, file: UploadFile = File(...), session_id: Optional[str] = Form(None),
+                     profile: Optional[str] = Form(None)):
     try:
         content = await file.read()
-        result = transcribe_audio_bytes(content, filename_hint=file.filename or "audio.webm")
+        with turn_deadline(parse_budget_ms(request.headers.get(BUDGET_HEADER))) as deadline:
+            # off the event loop (session file read included), so concurrent uploads can share
+            # a batch in the transcriber
+            result = await run_in_threadpool(_transcribe_for_session, content, file.filename or "audio.webm",
+                                             session_id, profile)
+        if deadline.degraded:
+            result = {**result, "degraded": deadline.degraded}
         return result
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
 
+def _remember_expect(result: dict):
+    """Keep the latest `expect` on the session so the next upload can pick its STT profile."""
+    sid = result.get("session_id")
+    if not sid or not result.get("ok"):
+        return
+    with file_lock(SESSIONS_FILE):
+        s = get_session(sid)
+        if s is not None and s.get("expect") != result.get("expect"):
+            s["expect"] = result.get("expect")
+            update_session(sid, s)
+
+
 @router.post("/converse")
-def converse(req: ConverseRequest):
+def converse(req: ConverseRequest, request: Request):
+    fmt = negotiate_audio_format(req.audio_format, request.headers.get("accept"))
+    # LLM, TTS and the confirmation email share one budget and degrade when it runs short
+    with turn_deadline(parse_budget_ms(request.headers.get(BUDGET_HEADER))) as deadline, \
+            audio_format_scope(fmt) as audio:
+        result = _converse(req)
+    if deadline.degraded:
+        result["degraded"] = deadline.degraded
+    if result.get("audio_base64"):
+        delivered = audio["delivered"] or "mp3"
+        result["audio_format"] = delivered
+        result["audio_mime"] = MIME[delivered]
+    _remember_expect(result)
+    return result
+
+
+def _converse(req: ConverseRequest):
     try:
         text = (req.text or "").strip()
         if not text:
@@ -418,14 +436,16 @@ def converse(req: ConverseRequest):
             booking_id = session.get("pending_booking_id")
             user_txt = text.strip()
             if booking_id:
-                bookings = load_bookings()
-                b = next((x for x in bookings if x.get("id") == booking_id), None)
+                with file_lock(BOOKINGS_FILE):
+                    bookings = load_bookings()
+                    b = next((x for x in bookings if x.get("id") == booking_id), None)
+                    if b:
+                        if is_negative_answer(user_txt):
+                            b["note"] = "NA"
+                        else:
+                            b["note"] = user_txt
+                        save_bookings(bookings, changed=[b])
                 if b:
-                    if is_negative_answer(user_txt):
-                        b["note"] = "NA"
-                    else:
-                        b["note"] = user_txt
-                    save_bookings(bookings)
                     reply = f"Notes saved for booking #{b.get('id')}."
                     tts = text_to_speech_base64(reply)
                     append_message(sid, "assistant", reply)
@@ -444,10 +464,12 @@ def converse(req: ConverseRequest):
         meta = session.get("metadata", {}) or {}
         needs_extraction = not (meta.get("chief_complaint") and (meta.get("doctor_id") or meta.get("doctor_name")) and meta.get("patient_name"))
         if needs_extraction:
-            llm_resp = extract_entities_via_llm(text)
+            llm_resp = extract_entities_via_llm(text, session=session)
             if llm_resp.get("ok"):
                 ent = llm_resp.get("entities", {})
-                _append_llm_debug({"type": "extract_ok", "input": text, "entities": ent, "raw": llm_resp.get("raw_text")})
+                usage = llm_resp.get("usage") or {}
+                _append_llm_debug({"type": "extract_ok", "input": text, "entities": ent, "raw": llm_resp.get("raw_text"),
+                                   "usage": usage, "cached_ratio": round(cached_ratio(usage), 3)})
                 if ent.get("chief_complaint"):
                     meta["chief_complaint"] = ent.get("chief_complaint")
                 if ent.get("doctor_name"):
@@ -466,7 +488,8 @@ def converse(req: ConverseRequest):
                 session["metadata"] = meta
                 update_session(sid, session)
             else:
-                _append_llm_debug({"type": "extract_fail", "input": text, "error": llm_resp.get("error")})
+                _append_llm_debug({"type": "extract_degraded" if llm_resp.get("degraded") else "extract_fail",
+                                   "input": text, "error": llm_resp.get("error")})
                 doc = detect_doctor_name_in_text(text)
                 if doc:
                     meta["doctor_id"] = doc.get("id")
@@ -683,10 +706,11 @@ def converse(req: ConverseRequest):
             return {"ok": True, "session_id": sid, "reply": reply, "audio_base64": tts.get("audio_base64") if tts.get("ok") else None, "expect": "ask_slot"}
 
         # fallback LLM follow-up if nothing else matched
-        llm = chat_with_llm(text, system_prompt="You are Astra, a friendly receptionist assistant. Ask one concise follow-up question to continue booking.")
+        llm = chat_with_llm(text, task="followup", session=get_session(sid) or session)
         if llm.get("ok") and llm.get("reply"):
             reply = llm.get("reply")
-            _append_llm_debug({"type": "fallback_llm", "input": text, "llm": llm})
+            _append_llm_debug({"type": "fallback_llm", "input": text, "llm": llm,
+                               "cached_ratio": round(cached_ratio(llm.get("usage") or {}), 3)})
         else:
             reply = "Sorry, I didn't understand — could you rephrase?"
         tts = text_to_speech_base64(reply)
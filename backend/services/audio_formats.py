@@ -0,0 +1,103 @@
+# backend/services/audio_formats.py
+"""
+TTS output formats and negotiation. Providers return MP3; other formats are transcoded with
+PyAV (already installed for faster-whisper):
+
+  mp3    as returned by the provider (gTTS ~32 kbps, ElevenLabs ~128 kbps)
+  opus   Ogg/Opus, mono, OPUS_BITRATE; the smallest by far for speech
+  pcm    16-bit mono WAV at PCM_RATE; no decoder needed, largest payload
+
+negotiate() takes an explicit request field first, then audio types from an Accept header
+(q-values honoured), else mp3.
+"""
+
+import io
+import wave
+from typing import Optional
+
+FORMATS = ("mp3", "opus", "pcm")
+MIME = {"mp3": "audio/mpeg", "opus": "audio/ogg", "pcm": "audio/wav"}
+DEFAULT_FORMAT = "mp3"
+OPUS_BITRATE = 16000
+PCM_RATE = 16000
+
+_ALIASES = {
+    "mp3": "mp3", "mpeg": "mp3", "audio/mpeg": "mp3", "audio/mp3": "mp3",
+    "opus": "opus", "ogg": "opus", "audio/ogg": "opus", "audio/opus": "opus",
+    "pcm": "pcm", "wav": "pcm", "audio/wav": "pcm", "audio/x-wav": "pcm", "audio/l16": "pcm",
+}
+
+
+def normalize_format(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    return _ALIASES.get(value.split(";")[0].strip().lower())
+
+
+def negotiate(requested: Optional[str] = None, accept: Optional[str] = None) -> str:
+    fmt = normalize_format(requested)
+    if fmt:
+        return fmt
+    best, best_q = None, 0.0
+    for i, part in enumerate((accept or "").split(",")):
+        media, _, params = part.strip().partition(";")
+        fmt = normalize_format(media)
+        if not fmt:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, val = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        # earlier entries win ties, as listed order is the client's preference
+        if q > best_q:
+            best, best_q = fmt, q
+    return best or DEFAULT_FORMAT
+
+
+def _to_opus(src: bytes) -> bytes:
+    import av  # type: ignore
+    out_buf = io.BytesIO()
+    with av.open(io.BytesIO(src)) as inp, av.open(out_buf, mode="w", format="ogg") as out:
+        stream = out.add_stream("libopus", rate=48000, layout="mono")
+        stream.bit_rate = OPUS_BITRATE
+        # the encoder resamples and re-frames to Opus' fixed frame size itself
+        for frame in inp.decode(audio=0):
+            frame.pts = None
+            for packet in stream.encode(frame):
+                out.mux(packet)
+        for packet in stream.encode(None):
+            out.mux(packet)
+    return out_buf.getvalue()
+
+
+def _to_pcm_wav(src: bytes) -> bytes:
+    import av  # type: ignore
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=PCM_RATE)
+    pcm = bytearray()
+    with av.open(io.BytesIO(src)) as inp:
+        frames = list(inp.decode(audio=0)) + [None]
+        for frame in frames:
+            for out in resampler.resample(frame):
+                pcm += bytes(out.planes[0])[: out.samples * 2]
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(PCM_RATE)
+        w.writeframes(bytes(pcm))
+    return buf.getvalue()
+
+
+def transcode(mp3: bytes, fmt: str) -> bytes:
+    """Provider MP3 -> fmt. Raises on failure; callers fall back to the MP3."""
+    if fmt == "mp3":
+        return mp3
+    if fmt == "opus":
+        return _to_opus(mp3)
+    if fmt == "pcm":
+        return _to_pcm_wav(mp3)
+    raise ValueError(f"unknown audio format {fmt!r}")
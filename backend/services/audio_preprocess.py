@@ -0,0 +1,185 @@
+# backend/services/audio_preprocess.py
+"""
+Audio clean-up before STT, vectorized with NumPy:
+
+  decode            WAV via the stdlib, anything else (webm/opus, ogg, mp3, m4a) via PyAV
+  downmix           mean over channels
+  resample          to 16 kHz (box low-pass + linear interpolation; plenty for speech)
+  trim              drop leading/trailing non-speech using frame energy against an adaptive
+                    noise floor, keeping PAD_S around the detected speech
+  normalize         scale speech RMS to TARGET_DBFS (gain capped), then peak-limit
+
+preprocess() returns None when NumPy/PyAV are unavailable or the audio can't be decoded, so
+callers fall back to sending the original bytes. ASTRA_AUDIO_PREPROCESS=0 disables it.
+"""
+
+import io
+import os
+import wave
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+TARGET_SR = 16000
+FRAME_MS = 30
+PAD_S = 0.2
+TARGET_DBFS = -20.0
+MAX_GAIN_DB = 20.0
+MIN_SPEECH_DBFS = -50.0      # frames quieter than this are never speech
+SPEECH_OVER_FLOOR_DB = 10.0  # ... and speech must stand this far above the noise floor
+
+ENABLED = os.environ.get("ASTRA_AUDIO_PREPROCESS", "1").lower() not in ("0", "false", "no")
+
+
+@dataclass
+class PreparedAudio:
+    samples: Any            # float32 mono at sample_rate, in [-1, 1]
+    sample_rate: int
+    original_s: float
+    processed_s: float
+
+    @property
+    def seconds_saved(self) -> float:
+        return max(0.0, self.original_s - self.processed_s)
+
+    def report(self) -> dict:
+        return {"original_s": round(self.original_s, 3), "processed_s": round(self.processed_s, 3),
+                "seconds_saved": round(self.seconds_saved, 3)}
+
+
+def _decode_wav(data: bytes) -> Tuple[Any, int]:
+    import numpy as np
+    with wave.open(io.BytesIO(data), "rb") as w:
+        sr, channels, width = w.getframerate(), w.getnchannels(), w.getsampwidth()
+        raw = w.readframes(w.getnframes())
+    if width == 1:
+        x = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        x = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        x = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"unsupported WAV sample width {width}")
+    return x.reshape(-1, channels).T, sr
+
+
+def _decode_av(data: bytes) -> Tuple[Any, int]:
+    import av  # type: ignore  (ships with faster-whisper)
+    import numpy as np
+    chunks, sr = [], None
+    with av.open(io.BytesIO(data)) as container:
+        stream = container.streams.audio[0]
+        for frame in container.decode(stream):
+            arr = frame.to_ndarray()
+            if arr.dtype.kind == "i":
+                arr = arr.astype(np.float32) / float(np.iinfo(arr.dtype).max)
+            else:
+                arr = arr.astype(np.float32)
+            channels = len(frame.layout.channels)
+            if frame.format.is_planar:
+                arr = arr.reshape(channels, -1)
+            else:
+                arr = arr.reshape(-1, channels).T
+            chunks.append(arr)
+            sr = frame.sample_rate
+    if not chunks:
+        raise ValueError("no audio frames")
+    return np.concatenate(chunks, axis=1), sr
+
+
+def decode(data: bytes) -> Tuple[Any, int]:
+    """(channels x samples float32 array, sample rate)."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return _decode_wav(data)
+    return _decode_av(data)
+
+
+def to_mono(x):
+    return x.mean(axis=0) if x.ndim == 2 else x
+
+
+def resample(x, sr: int, target: int = TARGET_SR):
+    import numpy as np
+    if sr == target or x.size == 0:
+        return x.astype(np.float32, copy=False)
+    if sr > target:
+        # box filter roughly at the new Nyquist to limit aliasing before decimation
+        width = int(round(sr / target))
+        if width > 1:
+            kernel = np.ones(width, dtype=np.float32) / width
+            x = np.convolve(x, kernel, mode="same")
+    n_out = int(round(x.size * target / sr))
+    positions = np.arange(n_out, dtype=np.float64) * (sr / target)
+    return np.interp(positions, np.arange(x.size), x).astype(np.float32)
+
+
+def _frame_db(x, sr: int):
+    import numpy as np
+    frame = max(1, int(sr * FRAME_MS / 1000))
+    n = x.size // frame
+    if n == 0:
+        return np.zeros(0, dtype=np.float32), frame
+    frames = x[: n * frame].reshape(n, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1) + 1e-12)
+    return 20.0 * np.log10(rms), frame
+
+
+def trim_silence(x, sr: int):
+    """Cut to the first..last speech frame (+ PAD_S); returns (trimmed, speech mask per frame)."""
+    import numpy as np
+    db, frame = _frame_db(x, sr)
+    if db.size == 0:
+        return x, db > 0
+    floor, peak = np.percentile(db, 10), db.max()
+    # with no quiet stretch at all (speech from the first frame to the last) the 10th percentile
+    # is speech itself; never demand more than peak - SPEECH_OVER_FLOOR_DB
+    threshold = min(floor + SPEECH_OVER_FLOOR_DB, peak - SPEECH_OVER_FLOOR_DB)
+    speech = db > max(MIN_SPEECH_DBFS, threshold)
+    idx = np.flatnonzero(speech)
+    if idx.size == 0:
+        return x[:0], speech
+    pad = int(PAD_S * sr)
+    start = max(0, idx[0] * frame - pad)
+    end = min(x.size, (idx[-1] + 1) * frame + pad)
+    return x[start:end], speech[idx[0]: idx[-1] + 1]
+
+
+def normalize_loudness(x, sr: int):
+    import numpy as np
+    if x.size == 0:
+        return x
+    db, frame = _frame_db(x, sr)
+    voiced = db[db > MIN_SPEECH_DBFS]
+    level = float(np.median(voiced)) if voiced.size else float(db.max(initial=-100.0))
+    gain_db = min(MAX_GAIN_DB, TARGET_DBFS - level)
+    y = x * np.float32(10.0 ** (gain_db / 20.0))
+    peak = float(np.abs(y).max())
+    if peak > 0.99:
+        y = y * np.float32(0.99 / peak)
+    return y.astype(np.float32, copy=False)
+
+
+def preprocess(data: bytes) -> Optional[PreparedAudio]:
+    if not ENABLED or not data:
+        return None
+    try:
+        x, sr = decode(data)
+        original_s = x.shape[-1] / float(sr)
+        mono = resample(to_mono(x), sr, TARGET_SR)
+        trimmed, _ = trim_silence(mono, TARGET_SR)
+        out = normalize_loudness(trimmed, TARGET_SR)
+        return PreparedAudio(out, TARGET_SR, original_s, out.size / float(TARGET_SR))
+    except Exception:
+        return None
+
+
+def to_wav_bytes(samples, sample_rate: int = TARGET_SR) -> bytes:
+    """16-bit mono WAV, for providers that want a file upload."""
+    import numpy as np
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2")
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
@@ -1,19 +1,57 @@
+import asyncio
+import base64
+import hashlib
+import hmac
 import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import hashlib
-import secrets
-from datetime import datetime, timedelta
+from typing import Dict, Optional
+from services.shared_state import atomic_write_text, file_lock
+from services.token_store import get_token_store
 
 DATA_DIR = Path(__file__).resolve().parents[2] / "data"
 USERS_FILE = DATA_DIR / "users.json"
 
-# session tokens in-memory (for demo). Not persisted.
-_sessions = {}
+# scrypt: memory-hard, stdlib; ~16 MB and tens of ms per hash at these settings
+SCRYPT_N, SCRYPT_R, SCRYPT_P, SCRYPT_DKLEN = 2 ** 14, 8, 1, 32
+# caps concurrent hashes (CPU and scrypt memory) during login bursts
+KDF_WORKERS = max(2, min(8, os.cpu_count() or 2))
+
+_kdf_pool = ThreadPoolExecutor(max_workers=KDF_WORKERS, thread_name_prefix="kdf")
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii")
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int, dklen: int) -> bytes:
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=256 * 1024 * 1024, dklen=dklen)
 
 def _hash_password(password: str) -> str:
+    """'scrypt$n$r$p$salt$hash' (base64 salt and hash)."""
+    salt = os.urandom(16)
+    dk = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P, SCRYPT_DKLEN)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(dk)}"
+
+def _legacy_hash(password: str) -> str:
     return hashlib.sha256(password.encode("utf-8")).hexdigest()
 
-def _load_users():
+def _verify_password(password: str, stored: str) -> bool:
+    if stored.startswith("scrypt$"):
+        try:
+            _, n, r, p, salt, expected = stored.split("$")
+            expected_raw = base64.b64decode(expected)
+            dk = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p), len(expected_raw))
+        except Exception:
+            return False
+        return hmac.compare_digest(dk, expected_raw)
+    # unsalted sha256 from older users.json; upgraded on successful login
+    return hmac.compare_digest(_legacy_hash(password), stored)
+
+# unknown usernames still pay one full hash, so timing doesn't reveal which users exist
+_DUMMY_HASH = f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(bytes(16))}${_b64(bytes(SCRYPT_DKLEN))}"
+
+def _ensure_users_file():
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     if not USERS_FILE.exists():
         # create default admin user
@@ -25,29 +63,61 @@ def _load_users():
                 }
             ]
         }
-        USERS_FILE.write_text(json.dumps(default, indent=2))
-    data = json.loads(USERS_FILE.read_text())
-    return data.get("users", [])
+        with file_lock(USERS_FILE):
+            if not USERS_FILE.exists():
+                atomic_write_text(USERS_FILE, json.dumps(default, indent=2))
+
+# username -> user record, rebuilt when users.json's mtime changes
+_users: Optional[Dict[str, dict]] = None
+_users_mtime_ns: Optional[int] = None
+_users_lock = threading.Lock()
+
+def _users_by_name() -> Dict[str, dict]:
+    global _users, _users_mtime_ns
+    try:
+        mtime = USERS_FILE.stat().st_mtime_ns
+    except OSError:
+        mtime = None
+    if _users is not None and mtime == _users_mtime_ns:
+        return _users
+    with _users_lock:
+        _ensure_users_file()
+        mtime = USERS_FILE.stat().st_mtime_ns
+        if _users is None or mtime != _users_mtime_ns:
+            users = json.loads(USERS_FILE.read_text()).get("users", [])
+            _users = {u.get("username"): u for u in users if u.get("username")}
+            _users_mtime_ns = mtime
+        return _users
+
+def _upgrade_hash(username: str, password: str):
+    """Rewrite a legacy sha256 entry as scrypt after the user proved the password."""
+    new_hash = _hash_password(password)
+    with file_lock(USERS_FILE):
+        data = json.loads(USERS_FILE.read_text())
+        for u in data.get("users", []):
+            if u.get("username") == username and not str(u.get("password_hash", "")).startswith("scrypt$"):
+                u["password_hash"] = new_hash
+        atomic_write_text(USERS_FILE, json.dumps(data, indent=2))
 
 def authenticate_admin(username: str, password: str) -> bool:
-    users = _load_users()
-    h = _hash_password(password)
-    for u in users:
-        if u.get("username") == username and u.get("password_hash") == h:
-            return True
-    return False
+    """Blocking; runs one KDF. Prefer authenticate_admin_async from async code."""
+    user = _users_by_name().get(username)
+    stored = str(user.get("password_hash") or "") if user else _DUMMY_HASH
+    ok = _verify_password(password, stored) and user is not None
+    if ok and not stored.startswith("scrypt$"):
+        try:
+            _upgrade_hash(username, password)
+        except Exception as e:
+            print("password hash upgrade failed:", e)
+    return ok
+
+async def authenticate_admin_async(username: str, password: str) -> bool:
+    """Runs the hash on the bounded KDF pool so the event loop stays free during login bursts."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_kdf_pool, authenticate_admin, username, password)
 
 def create_session_token(username: str, ttl_minutes: int = 60*24):
-    token = secrets.token_urlsafe(24)
-    expires = datetime.utcnow() + timedelta(minutes=ttl_minutes)
-    _sessions[token] = {"username": username, "expires": expires}
-    return token
+    return get_token_store().issue(username, ttl_minutes * 60)
 
 def validate_token(token: str) -> bool:
-    info = _sessions.get(token)
-    if not info:
-        return False
-    if info["expires"] < datetime.utcnow():
-        del _sessions[token]
-        return False
-    return True
+    return get_token_store().validate(token) is not None
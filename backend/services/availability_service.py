@@ -0,0 +1,249 @@
+# backend/services/availability_service.py
+"""
+Free/busy bitmaps for availability search across all doctors.
+
+Time is cut into 15-minute cells starting at 00:00 IST of the anchor day. Every doctor has one
+Python int used as a bitmap over `horizon_days` of cells: bit i set = a slot starting in cell i
+exists and still has capacity. Date-range and time-of-day filters become precomputed masks, so a
+query is one AND per doctor plus iteration over the set bits.
+
+Bitmaps are built once from the slot engine + bookings, then updated incrementally through
+on_booking_created / on_booking_cancelled.
+"""
+
+import threading
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.slot_engine import AvailabilityEngine, SlotRule, slot_start_key, get_engine
+from services.shared_state import generation
+from services.time_utils import IST, now_ist
+
+CELL_MIN = 15
+CELLS_PER_DAY = 24 * 60 // CELL_MIN
+DEFAULT_HORIZON_DAYS = 60
+
+TIME_OF_DAY = {
+    "morning": (6 * 60, 12 * 60),
+    "afternoon": (12 * 60, 17 * 60),
+    "evening": (17 * 60, 21 * 60),
+}
+
+
+@lru_cache(maxsize=256)
+def _day_mask(minute_from: int, minute_to: int) -> int:
+    """Cells of a single day whose start minute is in [minute_from, minute_to)."""
+    lo = max(0, minute_from // CELL_MIN)
+    hi = min(CELLS_PER_DAY, -(-minute_to // CELL_MIN))
+    if hi <= lo:
+        return 0
+    return ((1 << (hi - lo)) - 1) << lo
+
+
+@lru_cache(maxsize=256)
+def _range_mask(day_from: int, day_to: int, minute_from: int, minute_to: int) -> int:
+    """Repeat the day mask over days [day_from, day_to] (day offsets from the anchor)."""
+    if day_to < day_from:
+        return 0
+    repeat = 0
+    for d in range(day_to - day_from + 1):
+        repeat |= 1 << (d * CELLS_PER_DAY)
+    # day_mask < 2**CELLS_PER_DAY, so the multiplication never carries between days
+    return (_day_mask(minute_from, minute_to) * repeat) << (day_from * CELLS_PER_DAY)
+
+
+class AvailabilityIndex:
+    def __init__(self, engine: AvailabilityEngine, bookings: List[Dict[str, Any]],
+                 anchor: date, horizon_days: int = DEFAULT_HORIZON_DAYS):
+        self.engine = engine
+        self.anchor = anchor
+        self.horizon_days = horizon_days
+        self.free: Dict[Any, int] = {}
+        # (doctor, cell, label) -> active bookings
+        self._used: Dict[Tuple[Any, int, str], int] = {}
+        # doctor -> cell -> rules starting in it (10:00 and 10:10 share a cell), and doctor -> label -> cells
+        self._cell_rules: Dict[Any, Dict[int, List[SlotRule]]] = {}
+        self._label_cells: Dict[Any, Dict[str, List[int]]] = {}
+        self._lock = threading.Lock()
+        # "bookings" generation the snapshot reflects; other workers' writes bump it
+        self.generation = 0
+
+        for doc_id, rules in engine.rules.items():
+            bitmap = 0
+            cells: Dict[int, List[SlotRule]] = {}
+            by_label: Dict[str, List[int]] = {}
+            for day in range(horizon_days):
+                wd = (anchor + timedelta(days=day)).weekday()
+                for r in rules:
+                    if r.weekday == wd:
+                        cell = day * CELLS_PER_DAY + r.minute // CELL_MIN
+                        in_cell = cells.setdefault(cell, [])
+                        # a label listed twice is one slot, not two
+                        if any(o.label == r.label for o in in_cell):
+                            continue
+                        in_cell.append(r)
+                        by_label.setdefault(r.label, []).append(cell)
+                        bitmap |= 1 << cell
+            self.free[doc_id] = bitmap
+            self._cell_rules[doc_id] = cells
+            self._label_cells[doc_id] = by_label
+
+        for b in bookings or []:
+            if b.get("status") != "cancelled":
+                self._apply(b, +1)
+
+    # ---------------- incremental updates ----------------
+    def _slots_for_booking(self, booking: Dict[str, Any]) -> List[Tuple[int, str]]:
+        """(cell, label) of every slot instance the booking occupies."""
+        doc_id = booking.get("doctor_id")
+        start = slot_start_key(booking.get("slot_start"))
+        if start:
+            dt = datetime.fromisoformat(start)
+            day = (dt.date() - self.anchor).days
+            if 0 <= day < self.horizon_days:
+                minute = dt.hour * 60 + dt.minute
+                cell = day * CELLS_PER_DAY + minute // CELL_MIN
+                for r in self._cell_rules.get(doc_id, {}).get(cell, ()):
+                    if r.minute == minute:
+                        return [(cell, r.label)]
+            return []
+        # legacy weekly-label booking occupies the label in every week
+        label = booking.get("requested_slot")
+        return [(cell, label) for cell in self._label_cells.get(doc_id, {}).get(label, [])]
+
+    def _apply(self, booking: Dict[str, Any], delta: int):
+        doc_id = booking.get("doctor_id")
+        rules = self._cell_rules.get(doc_id)
+        if not rules:
+            return
+        for cell, label in self._slots_for_booking(booking):
+            key = (doc_id, cell, label)
+            self._used[key] = max(0, self._used.get(key, 0) + delta)
+            # the cell stays free while any slot starting in it has room
+            if any(self._used.get((doc_id, cell, r.label), 0) < r.capacity for r in rules[cell]):
+                self.free[doc_id] |= 1 << cell
+            else:
+                self.free[doc_id] &= ~(1 << cell)
+
+    def on_booking_created(self, booking: Dict[str, Any]):
+        with self._lock:
+            self._apply(booking, +1)
+
+    def on_booking_cancelled(self, booking: Dict[str, Any]):
+        with self._lock:
+            self._apply(booking, -1)
+
+    # ---------------- queries ----------------
+    def query(self, specialization: Optional[str] = None, date_from: Optional[date] = None,
+              date_to: Optional[date] = None, minute_from: int = 0, minute_to: int = 24 * 60,
+              doctor_id: Any = None, now: Optional[datetime] = None, limit_per_doctor: int = 20) -> List[Dict[str, Any]]:
+        now = (now or now_ist()).astimezone(IST)
+        date_from = max(date_from or now.date(), self.anchor)
+        date_to = date_to or (date_from + timedelta(days=6))
+        day_from = (date_from - self.anchor).days
+        day_to = min((date_to - self.anchor).days, self.horizon_days - 1)
+        mask = _range_mask(day_from, day_to, minute_from, minute_to)
+        # never offer cells that already started
+        now_day = (now.date() - self.anchor).days
+        if now_day >= 0:
+            past = now_day * CELLS_PER_DAY + -(-(now.hour * 60 + now.minute) // CELL_MIN)
+            mask &= ~((1 << past) - 1)
+        if not mask:
+            return []
+
+        spec = (specialization or "").strip().lower()
+        results = []
+        for d in self.engine.doctors:
+            if doctor_id is not None and d.get("id") != doctor_id:
+                continue
+            if spec and not (d.get("specialization") and spec in d.get("specialization").lower()):
+                continue
+            hits = self.free.get(d.get("id"), 0) & mask
+            if not hits:
+                continue
+            slots = []
+            rules = self._cell_rules[d.get("id")]
+            while hits and len(slots) < limit_per_doctor:
+                low = hits & -hits
+                cell = low.bit_length() - 1
+                hits ^= low
+                day = self.anchor + timedelta(days=cell // CELLS_PER_DAY)
+                for r in sorted(rules[cell], key=lambda r: r.minute):
+                    left = r.capacity - self._used.get((d.get("id"), cell, r.label), 0)
+                    if left <= 0 or len(slots) == limit_per_doctor:
+                        continue
+                    start = datetime.combine(day, time(r.minute // 60, r.minute % 60), tzinfo=IST)
+                    slots.append({
+                        "label": r.label,
+                        "start": start.isoformat(),
+                        "end": (start + timedelta(minutes=r.duration_min)).isoformat(),
+                        "capacity_left": left,
+                    })
+            results.append({
+                "doctor": {"id": d.get("id"), "name": d.get("name"), "specialization": d.get("specialization")},
+                "slots": slots,
+            })
+        return results
+
+
+_index: Optional[AvailabilityIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_availability_index() -> AvailabilityIndex:
+    """
+    Shared index; rebuilt when the doctor catalog changes, the IST day rolls over, or
+    another worker wrote bookings.json (its "bookings" generation moved on).
+    """
+    global _index
+    engine = get_engine()
+    today = now_ist().date()
+    gen = generation("bookings")
+    idx = _index
+    if idx is None or idx.engine is not engine or idx.anchor != today or idx.generation != gen:
+        with _index_lock:
+            idx = _index
+            if idx is None or idx.engine is not engine or idx.anchor != today or idx.generation != gen:
+                from services.booking_service import load_bookings
+                idx = AvailabilityIndex(engine, load_bookings(), today)
+                idx.generation = gen
+                _index = idx
+    return idx
+
+
+def _apply(booking: Dict[str, Any], gen: Optional[int], created: bool):
+    idx = _index
+    if idx is None:
+        return
+    # only patch a snapshot that was current right before this write; otherwise the
+    # generation check in get_availability_index() rebuilds it
+    if gen is not None and idx.generation != gen - 1:
+        return
+    if created:
+        idx.on_booking_created(booking)
+    else:
+        idx.on_booking_cancelled(booking)
+    if gen is not None:
+        idx.generation = gen
+
+
+def notify_booking_created(booking: Dict[str, Any], gen: Optional[int] = None):
+    _apply(booking, gen, created=True)
+
+
+def notify_booking_cancelled(booking: Dict[str, Any], gen: Optional[int] = None):
+    _apply(booking, gen, created=False)
+
+
+def parse_minute(value: Optional[str]) -> Optional[int]:
+    """'HH:MM' -> minutes after midnight; None if malformed or out of range."""
+    if not value:
+        return None
+    try:
+        h, m = (int(part) for part in str(value).split(":", 1))
+    except ValueError:
+        return None
+    if not (0 <= h < 24 and 0 <= m < 60):
+        return None
+    return h * 60 + m
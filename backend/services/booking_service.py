@@ -1,23 +1,30 @@
 # backend/services/booking_service.py
 import json
+import bisect
+import threading
+import time
 from pathlib import Path
-from typing import Optional
-from services.email_service import send_confirmation_email
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from services.email_service import deliver_confirmation_email
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
 from services.time_utils import now_ist_iso
+from services.metrics import timed
+from services.doctor_catalog import get_catalog
+from services.availability_service import notify_booking_created, notify_booking_cancelled
+from services.slot_engine import get_engine
+from services.shared_state import atomic_write_text, file_lock, generation, publish
 
 DATA_DIR = Path(__file__).resolve().parents[2] / "data"
 BOOKINGS_FILE = DATA_DIR / "bookings.json"
-DOCTORS_FILE = DATA_DIR / "doctors.json"
 
 def _ensure_files():
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     if not BOOKINGS_FILE.exists():
-        BOOKINGS_FILE.write_text(json.dumps([], indent=2))
-    if not DOCTORS_FILE.exists():
-        DOCTORS_FILE.write_text(json.dumps({"doctors": []}, indent=2))
+        with file_lock(BOOKINGS_FILE):
+            if not BOOKINGS_FILE.exists():
+                atomic_write_text(BOOKINGS_FILE, json.dumps([], indent=2))
 
 def load_bookings():
     _ensure_files()
@@ -26,68 +33,233 @@ def load_bookings():
     except Exception:
         return []
 
-def save_bookings(bookings):
-    BOOKINGS_FILE.write_text(json.dumps(bookings, indent=2))
+def save_bookings(bookings, changed: Optional[List[Dict[str, Any]]] = None) -> int:
+    """
+    Replace bookings.json. Callers doing read-modify-write must hold
+    file_lock(BOOKINGS_FILE) around load + save. Returns the new "bookings" generation.
+    changed: the bookings this write appended or modified; the listing index is patched with
+    just those instead of being rebuilt (None = unknown, drop the index).
+    """
+    with file_lock(BOOKINGS_FILE):
+        before = _bookings_mtime_ns()
+        atomic_write_text(BOOKINGS_FILE, json.dumps(bookings, indent=2))
+        prev, gen = publish("bookings")
+        if changed is None:
+            invalidate_booking_index()
+        else:
+            _index_refresh(changed, before, prev, gen)
+    return gen
 
-def load_doctors():
-    _ensure_files()
+# ---------------- read-side index for listing / lookup ----------------
+INDEX_CHECK_INTERVAL = 1.0
+MAX_PAGE_SIZE = 1000
+
+class BookingIndex:
+    """
+    Read-only snapshot of bookings.json with id / doctor / email indexes.
+    Positions are stable because bookings are only ever appended, so a cursor is
+    simply the next position to read.
+    """
+
+    def __init__(self, bookings: List[Dict[str, Any]], mtime_ns: Optional[int], generation: int = 0):
+        self.bookings: List[Dict[str, Any]] = []
+        self.mtime_ns = mtime_ns
+        self.generation = generation
+        self.pos_by_id: Dict[Any, int] = {}
+        self.by_doctor: Dict[Any, List[int]] = {}
+        self.by_email: Dict[str, List[int]] = {}
+        self.created: List[str] = []
+        # created_at_ist normally grows with position; only then can date ranges bisect
+        self.created_sorted = True
+        for b in bookings:
+            self._append(b)
+
+    def _append(self, b: Dict[str, Any]):
+        pos = len(self.bookings)
+        self.bookings.append(b)
+        self.pos_by_id.setdefault(b.get("id"), pos)
+        self.by_doctor.setdefault(b.get("doctor_id"), []).append(pos)
+        if b.get("patient_email"):
+            self.by_email.setdefault(str(b["patient_email"]).lower(), []).append(pos)
+        created = str(b.get("created_at_ist") or "")
+        if self.created and created < self.created[-1]:
+            self.created_sorted = False
+        self.created.append(created)
+
+    def upsert(self, changed: List[Dict[str, Any]]):
+        """Apply our own write: modified bookings replace theirs (id, doctor, email never change), new ones append."""
+        for b in changed:
+            # a copy, so later changes to the caller's dict (email_sent, ...) stay out of the snapshot
+            b = dict(b)
+            pos = self.pos_by_id.get(b.get("id"))
+            if pos is None:
+                self._append(b)
+            else:
+                self.bookings[pos] = b
+
+    def get(self, booking_id: Any) -> Optional[Dict[str, Any]]:
+        pos = self.pos_by_id.get(booking_id)
+        return self.bookings[pos] if pos is not None else None
+
+    def _candidates(self, doctor_id: Any, patient_email: Optional[str]) -> Optional[List[int]]:
+        lists = []
+        if doctor_id is not None:
+            lists.append(self.by_doctor.get(doctor_id, []))
+        if patient_email:
+            lists.append(self.by_email.get(patient_email.strip().lower(), []))
+        if not lists:
+            return None
+        lists.sort(key=len)
+        if len(lists) == 1:
+            return lists[0]
+        other = set(lists[1])
+        return [p for p in lists[0] if p in other]
+
+    def iter_positions(self, start: int = 0, doctor_id: Any = None, patient_email: Optional[str] = None,
+                       date_from: Optional[str] = None, date_to: Optional[str] = None) -> Iterator[int]:
+        """Positions >= start matching all filters, in booking order. Dates are 'YYYY-MM-DD' (IST)."""
+        # upper bound is exclusive: anything created on date_to sorts before date_to + '\uffff'
+        hi_key = (date_to + "\uffff") if date_to else None
+        cands = self._candidates(doctor_id, patient_email)
+        if cands is None:
+            if self.created_sorted and date_from:
+                start = max(start, bisect.bisect_left(self.created, date_from))
+            positions = range(start, len(self.bookings))
+        else:
+            positions = cands[bisect.bisect_left(cands, start):]
+        for pos in positions:
+            created = self.created[pos]
+            if date_from and created < date_from:
+                continue
+            if hi_key and created > hi_key:
+                if cands is None and self.created_sorted:
+                    return
+                continue
+            yield pos
+
+    def page(self, cursor: Optional[str] = None, limit: int = 100, **filters) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        try:
+            start = max(0, int(cursor)) if cursor else 0
+        except ValueError:
+            raise ValueError("Invalid cursor")
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        items, next_cursor = [], None
+        for pos in self.iter_positions(start, **filters):
+            if len(items) == limit:
+                next_cursor = str(pos)
+                break
+            items.append(self.bookings[pos])
+        return items, next_cursor
+
+_index: Optional[BookingIndex] = None
+_index_checked_at = 0.0
+_index_lock = threading.Lock()
+
+def _bookings_mtime_ns() -> Optional[int]:
     try:
-        return json.loads(DOCTORS_FILE.read_text()).get("doctors", [])
-    except Exception:
-        return []
+        return BOOKINGS_FILE.stat().st_mtime_ns
+    except OSError:
+        return None
+
+def get_booking_index() -> BookingIndex:
+    """
+    Cached index; our own saves patch it in place. Re-read when another worker wrote
+    bookings.json (mtime or "bookings" generation moved; checked at most once per second).
+    """
+    global _index, _index_checked_at
+    idx = _index
+    now = time.monotonic()
+    if idx is not None and now - _index_checked_at < INDEX_CHECK_INTERVAL:
+        return idx
+    with _index_lock:
+        idx = _index
+        if idx is None or _bookings_mtime_ns() != idx.mtime_ns or generation("bookings") != idx.generation:
+            gen = generation("bookings")
+            mtime = _bookings_mtime_ns()
+            idx = BookingIndex(load_bookings(), mtime, gen)
+            _index = idx
+        _index_checked_at = now
+        return idx
+
+def _index_refresh(changed: List[Dict[str, Any]], before: Optional[int], prev_gen: int, gen: int):
+    """Caller holds file_lock(BOOKINGS_FILE) and just wrote `changed`."""
+    global _index
+    with _index_lock:
+        idx = _index
+        if idx is None:
+            return
+        # another worker wrote since the index was built: patching would hide its changes
+        if idx.mtime_ns != before or idx.generation != prev_gen:
+            _index = None
+            return
+        idx.upsert(changed)
+        idx.mtime_ns = _bookings_mtime_ns()
+        idx.generation = gen
+
+def invalidate_booking_index():
+    global _index
+    _index = None
+
+def load_doctors():
+    return get_catalog().doctors
 
 def find_doctor_by_name_or_id(identifier) -> Optional[dict]:
-    docs = load_doctors()
-    # id match
-    try:
-        iid = int(identifier)
-        for d in docs:
-            if d.get("id") == iid:
-                return d
-    except Exception:
-        pass
-    txt = str(identifier).lower()
-    for d in docs:
-        if d.get("name") and txt in d.get("name").lower():
-            return d
-    for d in docs:
-        if d.get("specialization") and txt in d.get("specialization").lower():
-            return d
-    return None
+    # id match, then name contains identifier, then specialization contains identifier
+    from services.entity_matcher import get_matcher
+    return get_matcher().find_by_identifier(identifier)
 
 def create_booking(doctor_id: int, patient_name: str, patient_email: str, requested_slot: str, note: str = "") -> dict:
+    with timed("booking_create"):
+        return _create_booking(doctor_id, patient_name, patient_email, requested_slot, note)
+
+def _create_booking(doctor_id: int, patient_name: str, patient_email: str, requested_slot: str, note: str = "") -> dict:
     _ensure_files()
-    bookings = load_bookings()
-    doctors = load_doctors()
-    doctor = next((d for d in doctors if d.get("id") == doctor_id), None)
+    doctor = get_catalog().by_id.get(doctor_id)
     if not doctor:
         raise ValueError("Doctor not found")
-    # conflict check
-    for b in bookings:
-        if b.get("doctor_id") == doctor_id and b.get("requested_slot") == requested_slot:
+    # conflict check + append must be one step across workers
+    with file_lock(BOOKINGS_FILE):
+        bookings = load_bookings()
+        if not get_engine().label_has_room(doctor_id, requested_slot, bookings):
             raise ValueError("Slot already booked for this doctor")
-        
-
-    # created_at_ist = datetime.now(tz=ZoneInfo("Asia/Kolkata")).isoformat()
-    created_at_ist = now_ist_iso()
-    booking = {
-        "id": (bookings[-1]["id"] + 1) if bookings else 1,
-        "doctor_id": doctor_id,
-        "doctor_name": doctor.get("name"),
-        "patient_name": patient_name,
-        "patient_email": patient_email,
-        "requested_slot": requested_slot,
-        "note": note or "",
-        "created_at_ist": created_at_ist
-    }
-    bookings.append(booking)
-    save_bookings(bookings)
-    # send confirmation email if email_service configured
+
+        # created_at_ist = datetime.now(tz=ZoneInfo("Asia/Kolkata")).isoformat()
+        created_at_ist = now_ist_iso()
+        booking = {
+            "id": (bookings[-1]["id"] + 1) if bookings else 1,
+            "doctor_id": doctor_id,
+            "doctor_name": doctor.get("name"),
+            "patient_name": patient_name,
+            "patient_email": patient_email,
+            "requested_slot": requested_slot,
+            "note": note or "",
+            "created_at_ist": created_at_ist
+        }
+        bookings.append(booking)
+        gen = save_bookings(bookings, changed=[booking])
+    notify_booking_created(booking, gen)
+    # send confirmation email if email_service configured; queued when the turn is out of time
     try:
         subject = f"Appointment Confirmed — {doctor.get('name')}"
         body = f"Hello {patient_name},\n\nYour appointment with {doctor.get('name')} ({doctor.get('specialization')}) is confirmed for {requested_slot}.\n\nRegards,\nClinic"
-        email_sent = send_confirmation_email(patient_email, subject, body)
-        booking["email_sent"] = bool(email_sent)
+        delivery = deliver_confirmation_email(patient_email, subject, body)
+        booking["email_sent"] = bool(delivery["ok"]) and not delivery["queued"]
+        if delivery["queued"]:
+            booking["email_queued"] = True
     except Exception:
         booking["email_sent"] = False
     return booking
+
+def cancel_booking(booking_id: int) -> dict:
+    with file_lock(BOOKINGS_FILE):
+        bookings = load_bookings()
+        booking = next((b for b in bookings if b.get("id") == booking_id), None)
+        if not booking:
+            raise ValueError("Booking not found")
+        if booking.get("status") == "cancelled":
+            return booking
+        booking["status"] = "cancelled"
+        booking["cancelled_at_ist"] = now_ist_iso()
+        gen = save_bookings(bookings, changed=[booking])
+    notify_booking_cancelled(booking, gen)
+    return booking
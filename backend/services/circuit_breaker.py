@@ -0,0 +1,86 @@
+# backend/services/circuit_breaker.py
+"""
+Per-provider circuit breaker with half-open probing and a latency EWMA.
+
+  closed     calls go through; `failure_threshold` consecutive failures open the circuit
+  open       calls are refused for `reset_timeout` seconds
+  half_open  one probe call is let through; success closes the circuit, failure re-opens it
+
+`ewma_s` smooths observed call latency so callers can route around a provider that still
+answers but has become slow.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 ewma_alpha: float = 0.3):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.ewma_alpha = ewma_alpha
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.ewma_s: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if a call may be made now (claims the probe slot when half-open)."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def available(self) -> bool:
+        """Like allow() but without claiming anything; for routing decisions."""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return not (self.state == HALF_OPEN and self._probe_in_flight)
+
+    def record_success(self, latency_s: Optional[float] = None):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+            if latency_s is not None:
+                self._observe(latency_s)
+
+    def record_failure(self, latency_s: Optional[float] = None):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if latency_s is not None:
+                self._observe(latency_s)
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def _observe(self, latency_s: float):
+        if self.ewma_s is None:
+            self.ewma_s = latency_s
+        else:
+            self.ewma_s += self.ewma_alpha * (latency_s - self.ewma_s)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "ewma_ms": round(self.ewma_s * 1000, 1) if self.ewma_s is not None else None,
+            }
@@ -0,0 +1,170 @@
+# backend/services/deadline.py
+"""
+Per-turn time budget, carried through the pipeline in a contextvar.
+
+A voice turn is transcribe, then converse (extraction, maybe an LLM follow-up, maybe a booking
+with its confirmation email, then TTS). Each of those has its own timeout, so a slow LLM, a slow
+TTS call and a slow SMTP send simply added up. The voice routes now run inside turn_deadline(),
+and before an expensive call a stage asks time_for(stage): is the time left at least the
+stage's recent p90 latency (learned from timed() observations; STAGE_DEFAULT_S until
+MIN_SAMPLES calls were seen)? If not, it degrades instead of starting:
+
+  stt          the "fast" profile instead of the one the conversation asked for
+  llm_extract  rule-based extraction instead of the LLM
+  llm_chat     the route's canned follow-up instead of an LLM reply
+  tts          text-only reply, no audio
+  email_send   confirmation handed to the background outbox instead of sent inline
+
+A stage that is always skipped would never refresh its estimate, so after PROBE_AFTER_SKIPS
+skips in a row, or PROBE_INTERVAL_S since it last ran, one call goes through anyway as a probe.
+
+Calls that do start are bounded by what is left (remaining()). A client can send what is left
+of its turn in X-Turn-Budget-Ms (the frontend starts the clock when recording stops, so converse
+gets what transcription left over); otherwise a request gets ASTRA_TURN_BUDGET_S. Outside a turn
+(booking API, scripts) there is no deadline and nothing degrades.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional, Tuple
+
+from services.metrics import register_observer, register_renderer
+
+TURN_BUDGET_S = float(os.environ.get("ASTRA_TURN_BUDGET_S", "10"))
+BUDGET_HEADER = "X-Turn-Budget-Ms"
+
+# what a stage is assumed to need until it has been observed MIN_SAMPLES times
+STAGE_DEFAULT_S = {"stt": 1.5, "llm_extract": 1.5, "llm_chat": 2.0, "tts": 1.0, "email_send": 2.0}
+LATENCY_QUANTILE = 0.9
+MIN_SAMPLES = 10
+WINDOW_SIZE = 128
+PROBE_AFTER_SKIPS = int(os.environ.get("ASTRA_DEADLINE_PROBE_SKIPS", "20"))
+PROBE_INTERVAL_S = float(os.environ.get("ASTRA_DEADLINE_PROBE_INTERVAL_S", "60"))
+
+
+class Deadline:
+    __slots__ = ("budget_s", "expires_at", "degraded")
+
+    def __init__(self, budget_s: float):
+        self.budget_s = budget_s
+        self.expires_at = time.monotonic() + budget_s
+        self.degraded: List[str] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("turn_deadline", default=None)
+
+_latencies: Dict[str, Deque[float]] = {stage: deque(maxlen=WINDOW_SIZE) for stage in STAGE_DEFAULT_S}
+_skips: Dict[str, int] = {}
+_last_run: Dict[str, float] = {}
+DEGRADATIONS: Dict[Tuple[str, str], int] = {}
+TURN_COUNTS = {"turns": 0, "degraded": 0, "over_budget": 0}
+_lock = threading.Lock()
+
+
+def parse_budget_ms(value: Optional[str]) -> Optional[float]:
+    """Seconds from an X-Turn-Budget-Ms value; None if missing or not a number."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value)) / 1000.0
+    except ValueError:
+        return None
+
+
+@contextmanager
+def turn_deadline(budget_s: Optional[float] = None):
+    """Within the block, stages see a deadline of `budget_s` (capped at TURN_BUDGET_S) from now."""
+    deadline = Deadline(TURN_BUDGET_S if budget_s is None else min(budget_s, TURN_BUDGET_S))
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+        with _lock:
+            TURN_COUNTS["turns"] += 1
+            TURN_COUNTS["degraded"] += bool(deadline.degraded)
+            TURN_COUNTS["over_budget"] += deadline.remaining() <= 0
+
+
+def current() -> Optional[Deadline]:
+    return _current.get()
+
+
+def remaining(default: Optional[float] = None) -> Optional[float]:
+    """Seconds left in this turn, or `default` outside one."""
+    deadline = _current.get()
+    return deadline.remaining() if deadline is not None else default
+
+
+def expected_s(stage: str) -> float:
+    with _lock:
+        values = sorted(_latencies.get(stage) or ())
+    if len(values) < MIN_SAMPLES:
+        return STAGE_DEFAULT_S.get(stage, 1.0)
+    return values[min(len(values) - 1, int(LATENCY_QUANTILE * len(values)))]
+
+
+def time_for(stage: str) -> bool:
+    """True outside a turn, if what is left covers the stage's usual (p90) duration, or for a probe."""
+    deadline = _current.get()
+    if deadline is None:
+        return True
+    left = deadline.remaining()
+    fits = left >= expected_s(stage)
+    now = time.monotonic()
+    with _lock:
+        if not fits:
+            _skips[stage] = _skips.get(stage, 0) + 1
+            last = _last_run.setdefault(stage, now)
+            # probe: let one call through so the estimate can recover
+            fits = left > 0 and (_skips[stage] >= PROBE_AFTER_SKIPS or now - last >= PROBE_INTERVAL_S)
+        if fits:
+            _skips[stage] = 0
+            _last_run[stage] = now
+    return fits
+
+
+def degrade(stage: str, fallback: str):
+    """Record that `stage` took `fallback` instead of its normal path."""
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.degraded.append(stage)
+    with _lock:
+        DEGRADATIONS[(stage, fallback)] = DEGRADATIONS.get((stage, fallback), 0) + 1
+
+
+def _observe(stage: str, provider: str, seconds: float):
+    # rule-based answers take no time and would drag the estimate down
+    window = _latencies.get(stage)
+    if window is None or provider == "rules":
+        return
+    with _lock:
+        window.append(seconds)
+
+
+def _render_metrics() -> List[str]:
+    with _lock:
+        degradations = dict(DEGRADATIONS)
+        turns = dict(TURN_COUNTS)
+    lines = ["# HELP astra_degradations_total Stages that fell back because the turn budget was too low.",
+             "# TYPE astra_degradations_total counter"]
+    lines += [f'astra_degradations_total{{stage="{stage}",fallback="{fallback}"}} {n}'
+              for (stage, fallback), n in sorted(degradations.items())]
+    lines += ["# HELP astra_turns_total Requests run under a turn deadline, degraded ones, and ones that overran it.",
+              "# TYPE astra_turns_total counter"]
+    lines += [f'astra_turns_total{{outcome="{k}"}} {v}' for k, v in turns.items()]
+    lines += ["# HELP astra_stage_expected_seconds Time a stage is assumed to need when checking the budget.",
+              "# TYPE astra_stage_expected_seconds gauge"]
+    lines += [f'astra_stage_expected_seconds{{stage="{stage}"}} {expected_s(stage):.6f}' for stage in STAGE_DEFAULT_S]
+    return lines
+
+
+register_observer(_observe)
+register_renderer(_render_metrics)
@@ -0,0 +1,179 @@
+# backend/services/debug_log.py
+"""
+Non-blocking append-only JSONL log writer.
+
+write() only samples and enqueues; a daemon thread batches entries and appends them to the file,
+rotating it by size or age (path -> path.1 -> ... -> path.N). A full queue drops entries
+instead of blocking the request. Entries are serialized in write(), so later changes to the
+caller's dict do not leak into the log.
+
+Workers share the file: append and rotation run under file_lock(path), and the time the current
+file was started is kept next to it in path.opened (mtime only says when it was last appended to).
+
+Environment overrides (for the LLM debug log):
+  LLM_DEBUG_SAMPLE_RATE   fraction of entries kept, default 1.0
+  LLM_DEBUG_MAX_BYTES     rotate after this many bytes, default 5 MB
+  LLM_DEBUG_MAX_AGE_S     rotate after this many seconds, default 86400
+"""
+
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from services.shared_state import atomic_write_text, file_lock
+
+
+class JsonlLogWriter:
+    def __init__(self, path: Path, max_bytes: int = 5 * 1024 * 1024, max_age_s: float = 86400.0,
+                 backups: int = 3, sample_rate: float = 1.0, flush_interval: float = 0.5,
+                 max_queue: int = 10000):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.backups = backups
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_queue)
+        self._opened_path = self.path.with_name(self.path.name + ".opened")
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._flushed = threading.Condition()
+        self._pending = 0
+
+    # ---------------- producer side ----------------
+    def write(self, entry: dict):
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        self._ensure_thread()
+        entry = dict(entry)
+        entry.setdefault("at", datetime.utcnow().isoformat())
+        try:
+            line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        except Exception:
+            self.dropped += 1
+            return
+        try:
+            with self._flushed:
+                self._pending += 1
+            self._queue.put_nowait(line)
+        except queue.Full:
+            with self._flushed:
+                self._pending -= 1
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything queued so far is on disk (tests / shutdown)."""
+        deadline = time.monotonic() + timeout
+        with self._flushed:
+            while self._pending:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self._flushed.wait(left)
+        return True
+
+    def close(self):
+        if self._thread and self._thread.is_alive():
+            self.flush()
+            self._queue.put(None)
+            self._thread.join(timeout=2.0)
+
+    # ---------------- writer thread ----------------
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"jsonl-writer:{self.path.name}", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if first is None:
+                return
+            batch = [first]
+            while len(batch) < 1000:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._write_batch(batch)
+                    return
+                batch.append(item)
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with file_lock(self.path):
+                self._maybe_rotate()
+                if not self.path.exists():
+                    atomic_write_text(self._opened_path, repr(time.time()))
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(batch))
+            self.written += len(batch)
+        except Exception:
+            self.dropped += len(batch)
+        finally:
+            with self._flushed:
+                self._pending -= len(batch)
+                self._flushed.notify_all()
+
+    def _opened_at(self) -> Optional[float]:
+        try:
+            return float(self._opened_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _maybe_rotate(self):
+        """Caller holds file_lock(self.path)."""
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            return
+        opened_at = self._opened_at()
+        if opened_at is None:
+            # a file from before path.opened existed: its age counts from now
+            opened_at = time.time()
+            atomic_write_text(self._opened_path, repr(opened_at))
+        too_big = size >= self.max_bytes
+        too_old = time.time() - opened_at >= self.max_age_s
+        if not (too_big or too_old):
+            return
+        for i in range(self.backups, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i - 1}") if i > 1 else self.path
+            dst = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, dst)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+LLM_DEBUG_PATH = Path(__file__).resolve().parents[1] / "data" / "llm_debug.jsonl"
+
+llm_debug_log = JsonlLogWriter(
+    LLM_DEBUG_PATH,
+    max_bytes=int(_env_float("LLM_DEBUG_MAX_BYTES", 5 * 1024 * 1024)),
+    max_age_s=_env_float("LLM_DEBUG_MAX_AGE_S", 86400.0),
+    sample_rate=_env_float("LLM_DEBUG_SAMPLE_RATE", 1.0),
+)
@@ -0,0 +1,133 @@
+# backend/services/doctor_catalog.py
+"""
+In-memory doctor catalog shared by every service and route.
+
+doctors.json is parsed once and kept with id / name / specialization indexes. The file's mtime
+is re-checked at most every CHECK_INTERVAL seconds, together with the shared "doctors"
+generation that writers in any worker publish, so a lookup is normally a dict access. Each reload bumps `version`, which downstream caches
+(entity matcher, slot engine, HTTP ETags) key on.
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.shared_state import atomic_write_text, file_lock, generation, publish
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+DOCTORS_FILE = DATA_DIR / "doctors.json"
+
+CHECK_INTERVAL = 1.0
+MAX_SERIALIZED_VIEWS = 256
+
+DEFAULT_DOCTORS = {
+    "doctors": [
+        {"id": 1, "name": "Dr. R.K. Gupta", "specialization": "Dermatology", "bio": "Senior dermatologist", "available_slots": ["Wed 10:00", "Fri 16:00"]},
+        {"id": 2, "name": "Dr. Aditi Mehra", "specialization": "Physiotherapy", "bio": "Expert in sports injuries", "available_slots": ["Mon 11:00", "Thu 15:00"]},
+        {"id": 3, "name": "Dr. Rohan Kapoor", "specialization": "Psychology", "bio": "Mental wellness coach", "available_slots": ["Tue 10:00", "Fri 12:00"]},
+        {"id": 4, "name": "Ms. Nisha Bansal", "specialization": "Yoga & Fitness", "bio": "Holistic fitness trainer", "available_slots": ["Mon 9:00", "Wed 14:00"]},
+        {"id": 5, "name": "Dr. Meena Sharma", "specialization": "Cardiology", "bio": "Heart specialist", "available_slots": ["Thu 11:00", "Sat 10:00"]}
+    ]
+}
+
+
+class DoctorCatalog:
+    def __init__(self, doctors: List[Dict[str, Any]], version: int, mtime_ns: Optional[int], generation: int = 0):
+        self.doctors = doctors
+        self.version = version
+        self.mtime_ns = mtime_ns
+        self.generation = generation
+        self.by_id: Dict[Any, Dict[str, Any]] = {}
+        self.by_name: Dict[str, Dict[str, Any]] = {}
+        self.by_specialization: Dict[str, List[Dict[str, Any]]] = {}
+        # response cache: key -> (json bytes, etag); dies with this catalog version
+        self._serialized: Dict[Any, Tuple[bytes, str]] = {}
+        for d in doctors:
+            self.by_id.setdefault(d.get("id"), d)
+            if d.get("name"):
+                self.by_name.setdefault(d["name"].lower(), d)
+            if d.get("specialization"):
+                self.by_specialization.setdefault(d["specialization"].lower(), []).append(d)
+
+    def serialized(self, key: Any, build: Callable[[], Tuple[bytes, str]]) -> Tuple[bytes, str]:
+        """Memoize a serialized view of this catalog version (e.g. one per specialization filter)."""
+        hit = self._serialized.get(key)
+        if hit is None:
+            hit = build()
+            # arbitrary filter strings must not grow the cache without bound
+            if len(self._serialized) < MAX_SERIALIZED_VIEWS:
+                self._serialized[key] = hit
+        return hit
+
+
+_catalog: Optional[DoctorCatalog] = None
+_checked_at = 0.0
+_version = 0
+_lock = threading.Lock()
+
+
+def _ensure_doctors_file():
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    if not DOCTORS_FILE.exists():
+        with file_lock(DOCTORS_FILE):
+            if not DOCTORS_FILE.exists():
+                # create default doctors (editable later)
+                atomic_write_text(DOCTORS_FILE, json.dumps(DEFAULT_DOCTORS, indent=2))
+
+
+def _mtime_ns() -> Optional[int]:
+    try:
+        return DOCTORS_FILE.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _reload() -> DoctorCatalog:
+    global _catalog, _version
+    _ensure_doctors_file()
+    gen = generation("doctors")
+    mtime = _mtime_ns()
+    try:
+        doctors = json.loads(DOCTORS_FILE.read_text()).get("doctors", [])
+    except Exception:
+        doctors = []
+    _version += 1
+    _catalog = DoctorCatalog(doctors, _version, mtime, gen)
+    return _catalog
+
+
+def get_catalog() -> DoctorCatalog:
+    """Current catalog; reloads if doctors.json changed on disk or the catalog was invalidated."""
+    global _checked_at
+    cat = _catalog
+    now = time.monotonic()
+    if cat is not None and now - _checked_at < CHECK_INTERVAL:
+        return cat
+    with _lock:
+        cat = _catalog
+        if cat is None or _mtime_ns() != cat.mtime_ns or generation("doctors") != cat.generation:
+            cat = _reload()
+        _checked_at = now
+        return cat
+
+
+def invalidate_catalog():
+    """Drop the cached catalog; the next get_catalog() re-reads doctors.json."""
+    global _catalog
+    with _lock:
+        _catalog = None
+
+
+def read_doctors_document() -> Dict[str, Any]:
+    """Fresh parse of doctors.json for read-modify-write updates (hold file_lock(DOCTORS_FILE))."""
+    _ensure_doctors_file()
+    return json.loads(DOCTORS_FILE.read_text())
+
+
+def write_doctors_document(data: Dict[str, Any]):
+    with file_lock(DOCTORS_FILE):
+        atomic_write_text(DOCTORS_FILE, json.dumps(data, indent=2))
+        publish("doctors")
+    invalidate_catalog()
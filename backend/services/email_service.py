@@ -1,14 +1,26 @@
 # backend/services/email_service.py
 import smtplib
+import queue
+import threading
 from email.message import EmailMessage
 from email.utils import formataddr
 from pathlib import Path
 import json
 import datetime
 from typing import Union, Dict, Any, Optional
+from services.metrics import register_renderer, timed
+from services.deadline import degrade, remaining, time_for
 
 DATA_DIR = Path(__file__).resolve().parents[2] / "data"
 SMTP_FILE = DATA_DIR / "smtp.json"
+SMTP_TIMEOUT_S = 15
+OUTBOX_MAX = 1000
+
+# confirmations deferred by deliver_confirmation_email(), sent one at a time by a daemon thread
+_outbox: "queue.Queue[tuple]" = queue.Queue(maxsize=OUTBOX_MAX)
+_outbox_thread: Optional[threading.Thread] = None
+_outbox_lock = threading.Lock()
+OUTBOX_COUNTS = {"queued": 0, "sent": 0, "failed": 0}
 
 def load_smtp_config() -> Optional[Dict[str, Any]]:
     if not SMTP_FILE.exists():
@@ -197,22 +209,23 @@ def _build_html(booking: Dict[str, Any], clinic_name: str, clinic_url: Optional[
     return html
 
 def _send_smtp_message(host: str, port: int, username: Optional[str], password: Optional[str],
-                       use_tls: bool, msg: EmailMessage, timeout: int = 15) -> None:
+                       use_tls: bool, msg: EmailMessage, timeout: float = SMTP_TIMEOUT_S) -> None:
     """
     Low-level SMTP sending. Raises exception on failure to bubble up meaningful message.
     """
-    if use_tls:
-        server = smtplib.SMTP(host, port, timeout=timeout)
-        server.ehlo()
-        server.starttls()
-        server.ehlo()
-    else:
-        server = smtplib.SMTP(host, port, timeout=timeout)
-    # login if credentials provided
-    if username and password:
-        server.login(username, password)
-    server.send_message(msg)
-    server.quit()
+    with timed("email_send", "smtp"):
+        if use_tls:
+            server = smtplib.SMTP(host, port, timeout=timeout)
+            server.ehlo()
+            server.starttls()
+            server.ehlo()
+        else:
+            server = smtplib.SMTP(host, port, timeout=timeout)
+        # login if credentials provided
+        if username and password:
+            server.login(username, password)
+        server.send_message(msg)
+        server.quit()
 
 def send_confirmation_email_to_patient(to_email: str, booking: Union[str, Dict[str, Any]],
                                        clinic_name: str = "NovaCare Clinic",
@@ -269,8 +282,10 @@ def send_confirmation_email_to_patient(to_email: str, booking: Union[str, Dict[s
 
         # send
         try:
+            # inside a turn, the socket timeout is what is left of it
+            timeout = max(1.0, min(SMTP_TIMEOUT_S, remaining(SMTP_TIMEOUT_S)))
             _send_smtp_message(host=host, port=port, username=username, password=password,
-                               use_tls=use_tls, msg=msg)
+                               use_tls=use_tls, msg=msg, timeout=timeout)
         except Exception as e:
             err_text = f"SMTP send failed: {e}"
             print(err_text)
@@ -289,3 +304,51 @@ def send_confirmation_email(to_email: str, booking: Union[str, Dict[str, Any]],
     except Exception as e:
         print("send_confirmation_email wrapper error:", e)
         return False
+
+def _outbox_worker():
+    while True:
+        args = _outbox.get()
+        try:
+            ok = send_confirmation_email(*args)
+        except Exception:
+            ok = False
+        OUTBOX_COUNTS["sent" if ok else "failed"] += 1
+        _outbox.task_done()
+
+def queue_confirmation_email(to_email: str, booking: Union[str, Dict[str, Any]],
+                             clinic_name: str = "NovaCare Clinic") -> bool:
+    """Hand the confirmation to the background sender; False if the outbox is full."""
+    global _outbox_thread
+    if _outbox_thread is None:
+        with _outbox_lock:
+            if _outbox_thread is None:
+                _outbox_thread = threading.Thread(target=_outbox_worker, name="email-outbox", daemon=True)
+                _outbox_thread.start()
+    try:
+        _outbox.put_nowait((to_email, booking, clinic_name))
+    except queue.Full:
+        return False
+    OUTBOX_COUNTS["queued"] += 1
+    return True
+
+def deliver_confirmation_email(to_email: str, booking: Union[str, Dict[str, Any]],
+                               clinic_name: str = "NovaCare Clinic") -> Dict[str, Any]:
+    """
+    Send inline when there is time for an SMTP round trip (always, outside a turn deadline);
+    otherwise queue it. Returns {"ok": bool, "queued": bool}.
+    """
+    if not time_for("email_send") and queue_confirmation_email(to_email, booking, clinic_name):
+        degrade("email_send", "queued")
+        return {"ok": True, "queued": True}
+    return {"ok": send_confirmation_email(to_email, booking, clinic_name=clinic_name), "queued": False}
+
+def _render_metrics():
+    lines = ["# HELP astra_email_outbox_total Confirmation emails deferred to the background sender, by outcome.",
+             "# TYPE astra_email_outbox_total counter"]
+    lines += [f'astra_email_outbox_total{{outcome="{k}"}} {v}' for k, v in OUTBOX_COUNTS.items()]
+    lines += ["# HELP astra_email_outbox_pending Deferred confirmation emails not yet sent.",
+              "# TYPE astra_email_outbox_pending gauge",
+              f"astra_email_outbox_pending {_outbox.unfinished_tasks}"]
+    return lines
+
+register_renderer(_render_metrics)
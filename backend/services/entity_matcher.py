@@ -0,0 +1,264 @@
+# backend/services/entity_matcher.py
+"""
+Shared multi-pattern matcher for specialty, symptom and doctor-name detection.
+
+All keyword phrases, symptom terms and doctor names/tokens/specializations are compiled
+into one Aho-Corasick automaton, so a single pass over the utterance finds every entity.
+The automaton is built once and rebuilt only when the doctor catalog changes.
+"""
+
+import bisect
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# phrase -> canonical specialization (checked first, word-bounded)
+SPECIALTY_PHRASES = {
+    "gp": "General Medicine",
+    "general physician": "General Medicine",
+    "general medicine": "General Medicine",
+    "dermatology": "Dermatology",
+    "cardiology": "Cardiology",
+    "ophthalmology": "Ophthalmology",
+    "dentistry": "Dentistry",
+    "skin": "Dermatology",
+    "tooth": "Dentistry",
+}
+
+# specialization -> symptom terms (word-bounded first, then plain substring)
+SYMPTOM_TERMS = {
+    "Dermatology": ["skin", "rash", "itch", "acne", "eczema", "psoriasis", "skin allergy", "rashes"],
+    "Cardiology": ["heart", "chest pain", "palpitation", "palpitations", "shortness of breath", "heart pain"],
+    "Ophthalmology": ["eye", "vision", "blurry", "red eye", "eye pain"],
+    "Dentistry": ["toothache", "tooth", "teeth", "dental", "cavity"],
+    "General Medicine": ["fever", "temperature", "cough", "cold", "headache", "body pain", "pain", "sore", "ill", "sick"]
+}
+
+# payload kinds
+_PHRASE = "phrase"
+_SYMPTOM = "symptom"
+_DOC_NAME = "doctor_name"
+_DOC_TOKEN = "doctor_token"
+_DOC_SPEC = "doctor_specialization"
+
+_SEP = "\x00"
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _boundary(s: str, pos: int) -> bool:
+    """Same semantics as regex \\b at index pos."""
+    before = pos > 0 and _is_word(s[pos - 1])
+    after = pos < len(s) and _is_word(s[pos])
+    return before != after
+
+
+class AhoCorasick:
+    """Minimal Aho-Corasick automaton. Patterns may carry several payloads."""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        self._dict_link: List[int] = [0]
+        self._built = False
+
+    def add(self, pattern: str, payload: Any):
+        if not pattern:
+            return
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._dict_link.append(0)
+            node = nxt
+        self._out[node].append((len(pattern), payload))
+        self._built = False
+
+    def build(self):
+        queue = deque()
+        for nxt in self._goto[0].values():
+            self._fail[nxt] = 0
+            self._dict_link[nxt] = 0
+            queue.append(nxt)
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                fl = self._fail[nxt]
+                self._dict_link[nxt] = fl if self._out[fl] else self._dict_link[fl]
+                queue.append(nxt)
+        self._built = True
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """Yield (start, end, payload) for every pattern occurrence in text."""
+        if not self._built:
+            self.build()
+        goto, fail, out, dict_link = self._goto, self._fail, self._out, self._dict_link
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = node if out[node] else dict_link[node]
+            while hit:
+                end = i + 1
+                for length, payload in out[hit]:
+                    yield end - length, end, payload
+                hit = dict_link[hit]
+
+
+class EntityMatcher:
+    """
+    Resolves specialization and doctor references from free text in one automaton pass.
+    Priorities reproduce the original per-function scan orders.
+    """
+
+    def __init__(self, doctors: List[Dict[str, Any]]):
+        self.doctors = list(doctors or [])
+        self.version = None
+        self.by_id: Dict[Any, Dict[str, Any]] = {}
+        self._ac = AhoCorasick()
+
+        for rank, (phrase, canon) in enumerate(SPECIALTY_PHRASES.items()):
+            self._ac.add(phrase, (_PHRASE, (rank,), canon))
+        for s_idx, (spec, terms) in enumerate(SYMPTOM_TERMS.items()):
+            for t_idx, term in enumerate(terms):
+                self._ac.add(term, (_SYMPTOM, (s_idx, t_idx), spec))
+
+        names, specs = [], []
+        for d_idx, d in enumerate(self.doctors):
+            if d.get("id") is not None:
+                self.by_id.setdefault(d.get("id"), d)
+            name = (d.get("name") or "").lower()
+            spec = (d.get("specialization") or "").lower()
+            names.append(name)
+            specs.append(spec)
+            self._ac.add(name, (_DOC_NAME, (d_idx,), d_idx))
+            for t_idx, tok in enumerate(name.split()):
+                self._ac.add(tok, (_DOC_TOKEN, (d_idx, t_idx), d_idx))
+            self._ac.add(spec, (_DOC_SPEC, (d_idx,), d_idx))
+        self._ac.build()
+
+        # joined haystacks for "identifier is contained in name/specialization" lookups
+        self._names_blob, self._names_offsets = self._join(names)
+        self._specs_blob, self._specs_offsets = self._join(specs)
+        self._last: Optional[Tuple[str, Dict[str, Any]]] = None
+        self._fuzzy = None
+
+    @property
+    def fuzzy(self):
+        """Phonetic/trigram index over the same doctors, built on first use."""
+        if self._fuzzy is None:
+            from services.fuzzy_name_index import FuzzyNameIndex
+            self._fuzzy = FuzzyNameIndex(self.doctors)
+        return self._fuzzy
+
+    @staticmethod
+    def _join(values: List[str]) -> Tuple[str, List[int]]:
+        offsets, pos = [], 0
+        for v in values:
+            offsets.append(pos)
+            pos += len(v) + 1
+        return _SEP.join(values), offsets
+
+    def scan(self, text: str) -> Dict[str, Any]:
+        """
+        Single pass over text. Returns:
+          specialization: canonical specialization (phrase > bounded symptom > symptom substring)
+          doctor: doctor by full name, else by word-bounded name token
+          doctor_loose: doctor by full name, else any name token substring, else specialization substring
+        """
+        if not text:
+            return {"specialization": None, "doctor": None, "doctor_loose": None}
+        s = text.lower()
+        if self._last and self._last[0] == s:
+            return self._last[1]
+
+        best_spec: Optional[Tuple[tuple, str]] = None
+        best_doc: Optional[Tuple[tuple, int]] = None
+        best_loose: Optional[Tuple[tuple, int]] = None
+        for start, end, (kind, rank, value) in self._ac.iter_matches(s):
+            bounded = _boundary(s, start) and _boundary(s, end)
+            if kind == _PHRASE or kind == _SYMPTOM:
+                if kind == _PHRASE:
+                    if not bounded:
+                        continue
+                    key = (0,) + rank
+                else:
+                    key = ((1,) if bounded else (2,)) + rank
+                if best_spec is None or key < best_spec[0]:
+                    best_spec = (key, value)
+                continue
+            if kind == _DOC_NAME:
+                key = (0,) + rank
+                if best_doc is None or key < best_doc[0]:
+                    best_doc = (key, value)
+            elif kind == _DOC_TOKEN:
+                key = (1,) + rank
+                if bounded and (best_doc is None or key < best_doc[0]):
+                    best_doc = (key, value)
+            else:
+                key = (2,) + rank
+            if best_loose is None or key < best_loose[0]:
+                best_loose = (key, value)
+
+        result = {
+            "specialization": best_spec[1] if best_spec else None,
+            "doctor": self.doctors[best_doc[1]] if best_doc else None,
+            "doctor_loose": self.doctors[best_loose[1]] if best_loose else None,
+        }
+        self._last = (s, result)
+        return result
+
+    def _find_containing(self, txt: str, blob: str, offsets: List[int]) -> Optional[Dict[str, Any]]:
+        if _SEP in txt:
+            return None
+        if not txt:
+            # empty identifier is "contained" in the first non-empty value
+            for i, start in enumerate(offsets):
+                end = offsets[i + 1] - 1 if i + 1 < len(offsets) else len(blob)
+                if end > start:
+                    return self.doctors[i]
+            return None
+        pos = blob.find(txt)
+        if pos == -1:
+            return None
+        return self.doctors[bisect.bisect_right(offsets, pos) - 1]
+
+    def find_by_identifier(self, identifier) -> Optional[Dict[str, Any]]:
+        """id match, then first doctor whose name contains it, then whose specialization contains it."""
+        try:
+            doc = self.by_id.get(int(identifier))
+            if doc:
+                return doc
+        except Exception:
+            pass
+        txt = str(identifier).lower()
+        return (self._find_containing(txt, self._names_blob, self._names_offsets)
+                or self._find_containing(txt, self._specs_blob, self._specs_offsets))
+
+
+_matcher: Optional[EntityMatcher] = None
+
+
+def get_matcher() -> EntityMatcher:
+    """Return the shared matcher, rebuilt whenever the doctor catalog version changes."""
+    global _matcher
+    from services.doctor_catalog import get_catalog
+    catalog = get_catalog()
+    if _matcher is None or _matcher.version != catalog.version:
+        m = EntityMatcher(catalog.doctors)
+        m.version = catalog.version
+        _matcher = m
+    return _matcher
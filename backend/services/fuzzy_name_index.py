@@ -0,0 +1,408 @@
+# backend/services/fuzzy_name_index.py
+"""
+Fuzzy doctor-name / specialization lookup for ASR-mangled input ("doctor gupter" -> Dr. R.K. Gupta).
+
+Each name token and specialization word is indexed by its Double Metaphone keys and by
+padded character trigrams. A lookup only edit-distance-checks the tokens that share a
+phonetic key or enough trigrams with the query, so cost does not grow with catalog size.
+
+Fuzzy hits are only trusted in context: a doctor name must be the word right after "dr/doctor"
+(not "doctor, my name is Meera", and not the name the speaker gave for themselves), and a
+specialization needs a specialty cue, a higher score, and every one of its words matched. A
+near-miss of a -logy/-therapy catalog word ("book cardiolgy") is its own cue.
+"""
+
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+VOWELS = set("AEIOUY")
+TITLE_TOKENS = {"dr", "doctor", "doc", "mr", "mrs", "ms", "miss", "prof"}
+TOKEN_RE = re.compile(r"[a-z]+")
+_NAME_PHRASE = r"(?:my name is|i am|i'm|im|this is|call me)\b"
+# fuzzy doctor matches are only trusted for the word that follows a doctor cue, initials skipped;
+# group 1 is set for "doctor, my name is Meera", where that word is the patient's name
+DOCTOR_CUE_RE = re.compile(r"\b(?:dr|doctor|doc)\b[.,]?\s*(" + _NAME_PHRASE + r"\s*)?((?:[a-z]\.?\s+)*)([a-z]+)", re.I)
+# the word after "I'm ..." / "call me ..." anywhere in the utterance
+NAME_PHRASE_RE = re.compile(r"\b" + _NAME_PHRASE + r"\s*([a-z]+)", re.I)
+# the utterance has to be about a specialty before a near-miss word is read as one
+SPECIALTY_CUE_RE = re.compile(
+    r"\b(special\w*|department|dept|consult\w*|clinic|yoga|fitness?|\w{3,}(?:l[aeiou]g(?:y|i|ist)|ther[ae]p\w*))\b", re.I
+)
+
+MIN_TOKEN_LEN = 4
+MIN_SCORE = 0.75
+MIN_SPECIALIZATION_SCORE = 0.85
+
+
+def _at(w: str, i: int, *subs: str) -> bool:
+    if i < 0:
+        return False
+    return any(w.startswith(s, i) for s in subs)
+
+
+def double_metaphone(word: str) -> Tuple[str, str]:
+    """
+    Condensed Double Metaphone (Lawrence Philips). Returns (primary, alternate), each up to 4 chars.
+    Covers the English/Indian-name relevant rules; rare Slavic/Italian/Spanish special cases are folded.
+    """
+    w = re.sub(r"[^A-Z]", "", (word or "").upper())
+    if not w:
+        return "", ""
+    pri, alt = [], []
+
+    def add(p: str, a: Optional[str] = None):
+        pri.append(p)
+        alt.append(p if a is None else a)
+
+    n = len(w)
+    i = 0
+    if _at(w, 0, "GN", "KN", "PN", "WR", "PS"):
+        i = 1
+    if w[0] == "X":
+        add("S")
+        i = 1
+    elif w[0] in VOWELS:
+        add("A")
+        i = 1
+
+    while i < n and len("".join(pri)) < 4:
+        c = w[i]
+        prev = w[i - 1] if i > 0 else ""
+        nxt = w[i + 1] if i + 1 < n else ""
+        if c in VOWELS:
+            i += 1
+        elif c == "B":
+            add("P")
+            i += 2 if nxt == "B" else 1
+        elif c == "C":
+            if _at(w, i, "CH"):
+                if i == 0 and _at(w, 0, "CHARAC", "CHARIS", "CHOR", "CHYM", "CHIA", "CHEM"):
+                    add("K")
+                elif prev == "S":
+                    add("K")
+                else:
+                    add("X", "K")
+                i += 2
+            elif _at(w, i, "CZ"):
+                add("S", "X")
+                i += 2
+            elif _at(w, i, "CC") and i + 2 < n and w[i + 2] in "IEH" and not _at(w, i, "CCHU"):
+                add("KS")
+                i += 3
+            elif _at(w, i, "CK", "CG", "CQ"):
+                add("K")
+                i += 2
+            elif _at(w, i, "CIO", "CIA"):
+                add("S", "X")
+                i += 2
+            elif _at(w, i, "CI", "CE", "CY"):
+                add("S")
+                i += 2
+            else:
+                add("K")
+                i += 2 if nxt in ("C", "K", "Q") else 1
+        elif c == "D":
+            if _at(w, i, "DG") and i + 2 < n and w[i + 2] in "IEY":
+                add("J")
+                i += 3
+            elif _at(w, i, "DG"):
+                add("TK")
+                i += 2
+            else:
+                add("T")
+                i += 2 if nxt in ("T", "D") else 1
+        elif c == "F":
+            add("F")
+            i += 2 if nxt == "F" else 1
+        elif c == "G":
+            if nxt == "H":
+                if i > 0 and prev not in VOWELS:
+                    add("K")
+                elif i == 0:
+                    add("J" if i + 2 < n and w[i + 2] == "I" else "K")
+                elif i > 2 and prev == "U" and w[i - 3] in "CGLRT":
+                    add("F")
+                i += 2
+            elif nxt == "N":
+                add("N", "KN")
+                i += 2
+            elif _at(w, i, "GLI"):
+                add("KL", "L")
+                i += 2
+            elif nxt in ("E", "I", "Y"):
+                if _at(w, 0, "VAN ", "VON ", "SCH") or _at(w, i + 1, "ET"):
+                    add("K")
+                else:
+                    add("J", "K")
+                i += 2
+            else:
+                add("K")
+                i += 2 if nxt == "G" else 1
+        elif c == "H":
+            if (i == 0 or prev in VOWELS) and nxt in VOWELS:
+                add("H")
+                i += 2
+            else:
+                i += 1
+        elif c == "J":
+            if _at(w, i, "JOSE"):
+                add("H")
+            else:
+                add("J", "H" if i == 0 else "J")
+            i += 2 if nxt == "J" else 1
+        elif c == "K":
+            add("K")
+            i += 2 if nxt == "K" else 1
+        elif c == "L":
+            add("L")
+            i += 2 if nxt == "L" else 1
+        elif c == "M":
+            add("M")
+            if _at(w, i - 1, "UMB") and (i + 2 == n or _at(w, i + 2, "ER")):
+                i += 2
+            else:
+                i += 2 if nxt == "M" else 1
+        elif c == "N":
+            add("N")
+            i += 2 if nxt == "N" else 1
+        elif c == "P":
+            if nxt == "H":
+                add("F")
+                i += 2
+            else:
+                add("P")
+                i += 2 if nxt in ("P", "B") else 1
+        elif c == "Q":
+            add("K")
+            i += 2 if nxt == "Q" else 1
+        elif c == "R":
+            add("R")
+            i += 2 if nxt == "R" else 1
+        elif c == "S":
+            if _at(w, i - 1, "ISL", "YSL"):
+                i += 1
+            elif i == 0 and _at(w, 0, "SUGAR"):
+                add("X", "S")
+                i += 1
+            elif nxt == "H":
+                add("X")
+                i += 2
+            elif _at(w, i, "SIO", "SIA"):
+                add("S", "X")
+                i += 3
+            elif _at(w, i, "SCH"):
+                add("SK")
+                i += 3
+            elif _at(w, i, "SCI", "SCE", "SCY"):
+                add("S")
+                i += 3
+            elif _at(w, i, "SC"):
+                add("SK")
+                i += 2
+            elif nxt == "Z":
+                add("S", "X")
+                i += 2
+            else:
+                add("S")
+                i += 2 if nxt == "S" else 1
+        elif c == "T":
+            if _at(w, i, "TION", "TIA", "TCH"):
+                add("X")
+                i += 3
+            elif _at(w, i, "TH", "TTH"):
+                add("0", "T")
+                i += 2
+            else:
+                add("T")
+                i += 2 if nxt in ("T", "D") else 1
+        elif c == "V":
+            add("F")
+            i += 2 if nxt == "V" else 1
+        elif c == "W":
+            if nxt == "R":
+                add("R")
+                i += 2
+            elif i == 0 and nxt in VOWELS:
+                add("A", "F")
+                i += 1
+            elif _at(w, i, "WICZ", "WITZ"):
+                add("TS", "FX")
+                i += 4
+            else:
+                i += 1
+        elif c == "X":
+            add("KS")
+            i += 2 if nxt in ("C", "X") else 1
+        elif c == "Z":
+            if nxt == "H":
+                add("J")
+                i += 2
+            elif i > 0 and nxt in ("O", "I", "A"):
+                add("S", "TS")
+                i += 1
+            else:
+                add("S")
+                i += 2 if nxt == "Z" else 1
+        else:
+            i += 1
+    return "".join(pri)[:4], "".join(alt)[:4]
+
+
+def _trigrams(token: str) -> set:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_levenshtein(a: str, b: str, max_dist: int) -> int:
+    """Edit distance, or max_dist + 1 as soon as it is known to exceed max_dist."""
+    if abs(len(a) - len(b)) > max_dist:
+        return max_dist + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > max_dist:
+            return max_dist + 1
+        prev = cur
+    return min(prev[-1], max_dist + 1)
+
+
+def _phonetic_bonus(q_keys: Tuple[str, str], t_keys: Tuple[str, str]) -> float:
+    qs = {k for k in q_keys if k}
+    ts = {k for k in t_keys if k}
+    if qs & ts:
+        return 0.2
+    for q in qs:
+        for t in ts:
+            if q.startswith(t) or t.startswith(q):
+                return 0.1
+    return 0.0
+
+
+class FuzzyNameIndex:
+    """Precomputed phonetic + trigram index over doctor name tokens and specialization words."""
+
+    def __init__(self, doctors: List[Dict[str, Any]]):
+        self.doctors = list(doctors or [])
+        # token entries: (token, metaphone keys, kind, target)
+        self._tokens: List[Tuple[str, Tuple[str, str], str, Any]] = []
+        self._by_phonetic: Dict[str, List[int]] = defaultdict(list)
+        self._by_trigram: Dict[str, List[int]] = defaultdict(list)
+        # specialization -> indices of all its indexed words
+        self._spec_tokens: Dict[str, List[int]] = defaultdict(list)
+
+        specs_seen = set()
+        for d_idx, d in enumerate(self.doctors):
+            for tok in TOKEN_RE.findall((d.get("name") or "").lower()):
+                self._add(tok, "doctor", d_idx)
+            spec = d.get("specialization")
+            if spec and spec not in specs_seen:
+                specs_seen.add(spec)
+                for tok in dict.fromkeys(TOKEN_RE.findall(spec.lower())):
+                    self._add(tok, "specialization", spec)
+
+    def _add(self, token: str, kind: str, target: Any):
+        if len(token) < MIN_TOKEN_LEN or token in TITLE_TOKENS:
+            return
+        keys = double_metaphone(token)
+        idx = len(self._tokens)
+        self._tokens.append((token, keys, kind, target))
+        if kind == "specialization":
+            self._spec_tokens[target].append(idx)
+        for k in set(keys):
+            if k:
+                self._by_phonetic[k].append(idx)
+        for g in _trigrams(token):
+            self._by_trigram[g].append(idx)
+
+    def _candidates(self, q: str, q_keys: Tuple[str, str]) -> set:
+        cands = set()
+        for k in set(q_keys):
+            if k:
+                cands.update(self._by_phonetic.get(k, ()))
+        grams = _trigrams(q)
+        counts: Dict[int, int] = defaultdict(int)
+        for g in grams:
+            for idx in self._by_trigram.get(g, ()):
+                counts[idx] += 1
+        need = max(1, len(grams) // 3)
+        cands.update(idx for idx, c in counts.items() if c >= need)
+        return cands
+
+    def _scores(self, q: str) -> List[Tuple[int, float]]:
+        """(token index, score) for indexed tokens within edit range of query token q."""
+        if len(q) < MIN_TOKEN_LEN or q in TITLE_TOKENS:
+            return []
+        q_keys = double_metaphone(q)
+        out = []
+        for idx in self._candidates(q, q_keys):
+            token, t_keys, _, _ = self._tokens[idx]
+            max_edits = 1 if len(token) <= 4 else 2
+            dist = bounded_levenshtein(q, token, max_edits)
+            if dist > max_edits:
+                continue
+            score = 1.0 - dist / max(len(q), len(token)) + _phonetic_bonus(q_keys, t_keys)
+            score = round(min(score, 1.0), 3)
+            if score >= MIN_SCORE:
+                out.append((idx, score))
+        return out
+
+    def lookup(self, text: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Ranked fuzzy candidates for the tokens in text.
+        Returns [{"kind": "doctor"|"specialization", "doctor"?: dict, "specialization"?: str,
+                  "score": float, "matched": indexed token, "heard": query token}]
+        """
+        best: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+        for q in TOKEN_RE.findall((text or "").lower()):
+            for idx, score in self._scores(q):
+                token, _, kind, target = self._tokens[idx]
+                key = (kind, target)
+                if key not in best or score > best[key]["score"]:
+                    entry = {"kind": kind, "score": score, "matched": token, "heard": q}
+                    if kind == "doctor":
+                        entry["doctor"] = self.doctors[target]
+                    else:
+                        entry["specialization"] = target
+                    best[key] = entry
+        ranked = sorted(best.values(), key=lambda e: -e["score"])
+        return ranked[:limit]
+
+    def best_doctor(self, text: str, require_cue: bool = True) -> Optional[Dict[str, Any]]:
+        text = text or ""
+        if require_cue:
+            own_names = {m.group(1).lower() for m in NAME_PHRASE_RE.finditer(text)}
+            # only the word right after each cue ("doctor gupter", "dr. r. k. gupter")
+            text = " ".join(m.group(3) for m in DOCTOR_CUE_RE.finditer(text)
+                            if not m.group(1) and m.group(3).lower() not in own_names)
+            if not text:
+                return None
+        for cand in self.lookup(text):
+            if cand["kind"] == "doctor":
+                return cand
+        return None
+
+    def best_specialization(self, text: str, require_cue: bool = True) -> Optional[Dict[str, Any]]:
+        text = text or ""
+        cued = not require_cue or bool(SPECIALTY_CUE_RE.search(text))
+        # best score per indexed specialization word over all heard tokens
+        word_scores: Dict[int, Tuple[float, str]] = {}
+        for q in TOKEN_RE.findall(text.lower()):
+            for idx, score in self._scores(q):
+                if self._tokens[idx][2] == "specialization" and score > word_scores.get(idx, (0.0, ""))[0]:
+                    word_scores[idx] = (score, q)
+        best = None
+        for spec, indices in self._spec_tokens.items():
+            # every word of the specialization has to be heard ("yoga & fitness", not just "fitness")
+            if not all(word_scores.get(i, (0.0, ""))[0] >= MIN_SPECIALIZATION_SCORE for i in indices):
+                continue
+            if not cued and not any(SPECIALTY_CUE_RE.fullmatch(self._tokens[i][0]) for i in indices):
+                continue
+            score = min(word_scores[i][0] for i in indices)
+            if best is None or score > best["score"]:
+                weakest = min(indices, key=lambda i: word_scores[i][0])
+                best = {"kind": "specialization", "specialization": spec, "score": score,
+                        "matched": self._tokens[weakest][0], "heard": word_scores[weakest][1]}
+        return best
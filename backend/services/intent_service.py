@@ -1,41 +1,22 @@
 # backend/services/intent_service.py
 import re
-import json
-from pathlib import Path
 from typing import Dict, Any, List, Optional
-
-DATA_DIR = Path(__file__).resolve().parents[2] / "data"
-DOCTORS_FILE = DATA_DIR / "doctors.json"
+from services.entity_matcher import get_matcher
+from services.slot_engine import parse_slot_label, parse_time_of_day, resolve_relative_date
 
 WEEKDAYS = ["monday","tuesday","wednesday","thursday","friday","saturday","sunday"]
 TIME_RE = re.compile(r'(\b\d{1,2}(:\d{2})?\s?(am|pm)\b)', re.IGNORECASE)
 EMAIL_RE = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
 NAME_RE = re.compile(r"\b(?:my name is|i am|this is|i'm)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)", re.IGNORECASE)
 
-def _load_doctors():
-    if not DOCTORS_FILE.exists():
-        return []
-    data = json.loads(DOCTORS_FILE.read_text())
-    return data.get("doctors", [])
-
 def find_doctor_by_text(text: str) -> Optional[Dict[str, Any]]:
-    text_l = text.lower()
-    docs = _load_doctors()
-    # exact name match first
-    for d in docs:
-        if d["name"].lower() in text_l:
-            return d
-    # try partial name match (last name)
-    for d in docs:
-        parts = d["name"].lower().split()
-        for p in parts:
-            if p and p in text_l:
-                return d
-    # try specialization match
-    for d in docs:
-        if d.get("specialization") and d["specialization"].lower() in text_l:
-            return d
-    return None
+    # full name, then any name token, then specialization (single automaton pass)
+    matcher = get_matcher()
+    doc = matcher.scan(text)["doctor_loose"]
+    if doc:
+        return doc
+    cand = matcher.fuzzy.best_doctor(text)
+    return cand["doctor"] if cand else None
 
 def extract_email(text: str) -> Optional[str]:
     m = EMAIL_RE.search(text)
@@ -69,22 +50,17 @@ def extract_time_and_day(text: str) -> Dict[str, Optional[str]]:
     return {"time": time, "day": day}
 
 def candidate_slots_for_doctor(doctor: Dict[str, Any], extracted_day: Optional[str], extracted_time: Optional[str]) -> List[str]:
-    # From doctor's available_slots, try to pick matching ones
+    # From doctor's available_slots, pick ones matching the day or the time (parsed, not substring)
     slots = doctor.get("available_slots", []) or []
+    day = resolve_relative_date(extracted_day) if extracted_day else None
+    minute = parse_time_of_day(extracted_time) if extracted_time else None
     candidates = []
-    if extracted_day and extracted_day.lower() == "tomorrow":
-        # we can't compute calendar date, so return all slots (UI will show)
-        return slots
-    if extracted_day:
-        # match day token in slot string
-        for s in slots:
-            if extracted_day.lower() in s.lower():
-                candidates.append(s)
-    if extracted_time:
-        for s in slots:
-            if extracted_time.lower() in s.lower():
-                if s not in candidates:
-                    candidates.append(s)
+    for s in slots:
+        parsed = parse_slot_label(s)
+        if not parsed:
+            continue
+        if (day is not None and parsed[0] == day.weekday()) or (minute is not None and parsed[1] == minute):
+            candidates.append(s)
     # fallback to full list
     if not candidates:
         return slots
@@ -2,14 +2,92 @@
 """
 LLM service wrapper using OpenAI v1.x client.
 Extended entity extraction to include 'chief_complaint' to help suggest specializations.
+
+Entity extraction uses Responses API structured output (a strict JSON schema with short keys,
+mapped back to the entity names below), so the reply is parsed once with json.loads and never
+scanned. ASTRA_LLM_EXTRACT_MODE=prose restores the old free-text prompt and tolerant parser,
+for comparison. Token usage and parse failures per stage and mode are exported on /metrics.
+
+Schema extraction and the converse follow-up build their prompts with services.prompt_builder
+(byte-stable instructions first, then a budgeted session context) and send a per-task
+prompt_cache_key, so repeated calls hit OpenAI's prompt cache; the cached-token share and an
+estimated cost are exported next to the token counts.
+
+Under a turn deadline (services.deadline) a call is skipped, with {"ok": False, "degraded": True},
+when the time left is below the stage's usual latency, so the route falls back to its rules;
+calls that do go out make one attempt, timed out at the end of the turn.
 """
 
 import json
+import os
 import re
+import threading
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Dict, Any
+from services.metrics import register_renderer, timed, observe_stage
+from services.prompt_builder import build_input, static_instructions
+from services.deadline import degrade, remaining, time_for
 
 OPENAI_CFG_FILE = Path(__file__).resolve().parents[2] / "data" / "openai.json"
+EXTRACT_MODE = os.environ.get("ASTRA_LLM_EXTRACT_MODE", "schema").lower()
+
+# (stage, mode) -> running totals
+LLM_USAGE: Dict[tuple, Dict[str, int]] = {}
+_usage_lock = threading.Lock()
+_USAGE_FIELDS = ("calls", "input_tokens", "cached_tokens", "output_tokens", "parse_failures")
+# gpt-4o-mini list prices, USD per 1M tokens (cached input is billed at half)
+PRICE_INPUT = 0.15
+PRICE_CACHED_INPUT = 0.075
+PRICE_OUTPUT = 0.60
+
+def usage_cost_usd(usage: Dict[str, int]) -> float:
+    cached = usage.get("cached_tokens", 0)
+    uncached = usage.get("input_tokens", 0) - cached
+    return (uncached * PRICE_INPUT + cached * PRICE_CACHED_INPUT + usage.get("output_tokens", 0) * PRICE_OUTPUT) / 1e6
+
+def cached_ratio(usage: Dict[str, int]) -> float:
+    return usage.get("cached_tokens", 0) / usage["input_tokens"] if usage.get("input_tokens") else 0.0
+
+def _usage_of(resp) -> Dict[str, int]:
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return {}
+    details = getattr(usage, "input_tokens_details", None)
+    return {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "cached_tokens": (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+    }
+
+def _record_usage(stage: str, mode: str, usage: Dict[str, int], parse_failed: bool = False):
+    with _usage_lock:
+        totals = LLM_USAGE.setdefault((stage, mode), dict.fromkeys(_USAGE_FIELDS, 0))
+        totals["calls"] += 1
+        totals["parse_failures"] += int(parse_failed)
+        for k, v in usage.items():
+            totals[k] += v
+
+def _render_metrics():
+    with _usage_lock:
+        snapshot = {k: dict(v) for k, v in LLM_USAGE.items()}
+    lines = []
+    for field in _USAGE_FIELDS:
+        name = f"astra_llm_{field}_total"
+        lines += [f"# HELP {name} LLM {field.replace('_', ' ')} by stage and mode.", f"# TYPE {name} counter"]
+        lines += [f'{name}{{stage="{stage}",mode="{mode}"}} {totals[field]}'
+                  for (stage, mode), totals in sorted(snapshot.items())]
+    lines += ["# HELP astra_llm_cached_token_ratio Share of input tokens served from the prompt cache.",
+              "# TYPE astra_llm_cached_token_ratio gauge"]
+    lines += [f'astra_llm_cached_token_ratio{{stage="{stage}",mode="{mode}"}} {cached_ratio(totals):.4f}'
+              for (stage, mode), totals in sorted(snapshot.items())]
+    lines += ["# HELP astra_llm_cost_usd_total Estimated LLM spend at list prices.",
+              "# TYPE astra_llm_cost_usd_total counter"]
+    lines += [f'astra_llm_cost_usd_total{{stage="{stage}",mode="{mode}"}} {usage_cost_usd(totals):.6f}'
+              for (stage, mode), totals in sorted(snapshot.items())]
+    return lines
+
+register_renderer(_render_metrics)
 
 def _load_openai_key() -> Optional[str]:
     if OPENAI_CFG_FILE.exists():
@@ -20,13 +98,34 @@ def _load_openai_key() -> Optional[str]:
             return None
     return None
 
-def _create_client(api_key: str):
+def openai_configured() -> bool:
+    return bool(_load_openai_key())
+
+@lru_cache(maxsize=4)
+def get_openai_client(api_key: str):
+    """One client (and connection pool) per key, shared by LLM and STT calls."""
     try:
         from openai import OpenAI
     except Exception as e:
         raise RuntimeError("OpenAI library not available: " + str(e))
     return OpenAI(api_key=api_key)
 
+def _create_client(api_key: str):
+    return get_openai_client(api_key)
+
+def _bounded(client):
+    """Under a turn deadline: a single attempt that times out when the turn does."""
+    left = remaining()
+    if left is None:
+        return client
+    return client.with_options(timeout=max(left, 0.1), max_retries=0)
+
+def _over_budget(stage: str) -> Optional[Dict[str, Any]]:
+    if time_for(stage):
+        return None
+    degrade(stage, "rules")
+    return {"ok": False, "error": f"Turn budget too low for {stage}", "degraded": True}
+
 def _safe_extract_json_from_text(text: str) -> Optional[dict]:
     if not text:
         return None
@@ -76,7 +175,43 @@ def _safe_extract_json_from_text(text: str) -> Optional[dict]:
         return kv
     return None
 
-def chat_with_llm(prompt: str, system_prompt: Optional[str] = None) -> Dict[str, Any]:
+def _response_text(resp) -> str:
+    """output_text of a Responses API result, with fallbacks for other shapes."""
+    text_out = ""
+    try:
+        text_out = resp.output_text if hasattr(resp, "output_text") else ""
+    except Exception:
+        text_out = ""
+
+    if not text_out:
+        try:
+            out = getattr(resp, "output", None) or (resp.get("output") if isinstance(resp, dict) else None)
+            if out and isinstance(out, list):
+                parts = []
+                for itm in out:
+                    if isinstance(itm, dict) and "content" in itm and isinstance(itm["content"], list):
+                        for c in itm["content"]:
+                            if isinstance(c, dict) and c.get("type") == "output_text":
+                                parts.append(c.get("text",""))
+                    elif isinstance(itm, str):
+                        parts.append(itm)
+                text_out = " ".join([p for p in parts if p]).strip()
+        except Exception:
+            pass
+
+    if not text_out:
+        try:
+            text_out = resp["choices"][0]["message"]["content"]
+        except Exception:
+            pass
+    return text_out or ""
+
+def chat_with_llm(prompt: str, system_prompt: Optional[str] = None, task: Optional[str] = None,
+                  session: Optional[dict] = None) -> Dict[str, Any]:
+    """
+    Free-text reply. With `task` (see prompt_builder.TASKS) the cache-friendly static
+    instructions and the session's budgeted context are used instead of `system_prompt`.
+    """
     key = _load_openai_key()
     if not key:
         lower = prompt.lower()
@@ -86,65 +221,131 @@ def chat_with_llm(prompt: str, system_prompt: Optional[str] = None) -> Dict[str,
             reply = "Hi! I'm Astra, your clinic assistant."
         else:
             reply = "No cloud LLM configured. Please provide booking details plainly."
+        observe_stage("llm_chat", "rules", 0.0)
         return {"ok": True, "reply": reply}
 
+    skipped = _over_budget("llm_chat")
+    if skipped:
+        return skipped
+
     try:
-        client = _create_client(key)
+        client = _bounded(_create_client(key))
     except Exception as e:
         return {"ok": False, "error": f"Failed to init OpenAI client: {e}"}
 
     try:
         # use Responses API
-        if system_prompt:
-            resp = client.responses.create(
-                model="gpt-4o-mini",
-                instructions=system_prompt,
-                input=[{"role":"user","content":[{"type":"input_text","text":prompt}]}],
-                max_output_tokens=512,
-                temperature=0.2
-            )
-        else:
-            resp = client.responses.create(
-                model="gpt-4o-mini",
-                input=[{"role":"user","content":[{"type":"input_text","text":prompt}]}],
-                max_output_tokens=512,
-                temperature=0.2
-            )
-        text_out = ""
-        try:
-            text_out = resp.output_text if hasattr(resp, "output_text") else ""
-        except Exception:
-            text_out = ""
-
-        if not text_out:
-            try:
-                out = getattr(resp, "output", None) or (resp.get("output") if isinstance(resp, dict) else None)
-                if out and isinstance(out, list):
-                    parts = []
-                    for itm in out:
-                        if isinstance(itm, dict) and "content" in itm and isinstance(itm["content"], list):
-                            for c in itm["content"]:
-                                if isinstance(c, dict) and c.get("type") == "output_text":
-                                    parts.append(c.get("text",""))
-                        elif isinstance(itm, str):
-                            parts.append(itm)
-                    text_out = " ".join([p for p in parts if p]).strip()
-            except Exception:
-                pass
-
-        if not text_out:
-            try:
-                text_out = resp["choices"][0]["message"]["content"]
-            except Exception:
-                pass
+        with timed("llm_chat", "openai"):
+            if task:
+                resp = client.responses.create(
+                    model="gpt-4o-mini",
+                    instructions=static_instructions(task),
+                    input=build_input(prompt, session),
+                    max_output_tokens=512,
+                    temperature=0.2,
+                    extra_body={"prompt_cache_key": f"astra-{task}"},
+                )
+            elif system_prompt:
+                resp = client.responses.create(
+                    model="gpt-4o-mini",
+                    instructions=system_prompt,
+                    input=[{"role":"user","content":[{"type":"input_text","text":prompt}]}],
+                    max_output_tokens=512,
+                    temperature=0.2
+                )
+            else:
+                resp = client.responses.create(
+                    model="gpt-4o-mini",
+                    input=[{"role":"user","content":[{"type":"input_text","text":prompt}]}],
+                    max_output_tokens=512,
+                    temperature=0.2
+                )
+        usage = _usage_of(resp)
+        _record_usage("llm_chat", task or "text", usage)
+        text_out = _response_text(resp)
 
         if not text_out:
             return {"ok": False, "error": "LLM returned empty response"}
-        return {"ok": True, "reply": text_out.strip()}
+        return {"ok": True, "reply": text_out.strip(), "usage": usage}
     except Exception as e:
         return {"ok": False, "error": f"LLM call failed: {e}"}
 
-def extract_entities_via_llm(text: str) -> Dict[str, Any]:
+# short keys keep the model's output small; mapped back to the entity names callers use
+EXTRACT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "intent": {"type": "string", "enum": ["book_appointment", "unknown"]},
+        "doctor": {"type": ["string", "null"]},
+        "name": {"type": ["string", "null"], "description": "patient name"},
+        "email": {"type": ["string", "null"]},
+        "slot": {"type": ["string", "null"], "description": "requested day/time, as said"},
+        "slots": {"type": "array", "items": {"type": "string"}, "description": "other times offered"},
+        "complaint": {"type": ["string", "null"], "description": "symptom or reason for visit"},
+    },
+    "required": ["intent", "doctor", "name", "email", "slot", "slots", "complaint"],
+    "additionalProperties": False,
+}
+SCHEMA_KEYS = {
+    "intent": "intent", "doctor": "doctor_name", "name": "patient_name", "email": "patient_email",
+    "slot": "requested_slot", "slots": "candidate_slots", "complaint": "chief_complaint",
+}
+EXTRACT_MAX_OUTPUT_TOKENS = 200
+
+PROSE_INSTRUCTION = (
+    "You MUST output ONLY one valid JSON object (no extra text). The JSON keys must be: "
+    "\"intent\" (string, 'book_appointment' or 'unknown'), "
+    "\"doctor_name\" (string|null), "
+    "\"patient_name\" (string|null), "
+    "\"patient_email\" (string|null), "
+    "\"requested_slot\" (string|null), "
+    "\"candidate_slots\" (array), "
+    "\"chief_complaint\" (string|null). "
+    "If unsure about any field, use null or empty array. Example: "
+    "{\"intent\":\"book_appointment\",\"doctor_name\":\"Dr. R.K. Gupta\",\"patient_name\":\"Rahul Verma\",\"patient_email\":\"rahul@example.com\",\"requested_slot\":\"Fri 16:00\",\"candidate_slots\":[],\"chief_complaint\":\"skin rash\"}"
+)
+
+def _extract_schema(client, text: str, session: Optional[dict] = None):
+    """(parsed entities with long names or None, raw text, usage)."""
+    with timed("llm_extract", "openai"):
+        resp = client.responses.create(
+            model="gpt-4o-mini",
+            instructions=static_instructions("extract"),
+            input=build_input(text, session),
+            text={"format": {"type": "json_schema", "name": "booking_entities",
+                             "schema": EXTRACT_SCHEMA, "strict": True}},
+            max_output_tokens=EXTRACT_MAX_OUTPUT_TOKENS,
+            temperature=0.0,
+            extra_body={"prompt_cache_key": "astra-extract"},
+        )
+    text_out = _response_text(resp)
+    try:
+        data = json.loads(text_out)
+        parsed = {SCHEMA_KEYS[k]: v for k, v in data.items() if k in SCHEMA_KEYS}
+    except Exception:
+        # truncated (max_output_tokens) or a refusal; strict mode leaves no other way to fail
+        parsed = None
+    return parsed, text_out, _usage_of(resp)
+
+def _extract_prose(client, text: str, session: Optional[dict] = None):
+    # the original prompt, kept as the baseline: no session context
+    with timed("llm_extract", "openai"):
+        resp = client.responses.create(
+            model="gpt-4o-mini",
+            instructions=PROSE_INSTRUCTION,
+            input=[{"role":"user","content":[{"type":"input_text","text": text}]}],
+            max_output_tokens=512,
+            temperature=0.0
+        )
+    text_out = _response_text(resp)
+    parsed = _safe_extract_json_from_text(text_out)
+    if parsed is None:
+        try:
+            parsed = json.loads(text_out)
+        except Exception:
+            parsed = None
+    return parsed, text_out, _usage_of(resp)
+
+def extract_entities_via_llm(text: str, mode: Optional[str] = None, session: Optional[dict] = None) -> Dict[str, Any]:
     """
     Asks LLM to return JSON that includes 'chief_complaint' to help map to specialization.
     Output keys:
@@ -160,73 +361,26 @@ def extract_entities_via_llm(text: str) -> Dict[str, Any]:
     if not key:
         return {"ok": False, "error": "No OpenAI key configured"}
 
+    skipped = _over_budget("llm_extract")
+    if skipped:
+        return skipped
+
     try:
-        client = _create_client(key)
+        client = _bounded(_create_client(key))
     except Exception as e:
         return {"ok": False, "error": f"OpenAI client init failed: {e}"}
 
-    instruction = (
-        "You MUST output ONLY one valid JSON object (no extra text). The JSON keys must be: "
-        "\"intent\" (string, 'book_appointment' or 'unknown'), "
-        "\"doctor_name\" (string|null), "
-        "\"patient_name\" (string|null), "
-        "\"patient_email\" (string|null), "
-        "\"requested_slot\" (string|null), "
-        "\"candidate_slots\" (array), "
-        "\"chief_complaint\" (string|null). "
-        "If unsure about any field, use null or empty array. Example: "
-        "{\"intent\":\"book_appointment\",\"doctor_name\":\"Dr. R.K. Gupta\",\"patient_name\":\"Rahul Verma\",\"patient_email\":\"rahul@example.com\",\"requested_slot\":\"Fri 16:00\",\"candidate_slots\":[],\"chief_complaint\":\"skin rash\"}"
-    )
-
+    mode = mode or EXTRACT_MODE
     try:
-        resp = client.responses.create(
-            model="gpt-4o-mini",
-            instructions=instruction,
-            input=[{"role":"user","content":[{"type":"input_text","text": text}]}],
-            max_output_tokens=512,
-            temperature=0.0
-        )
-
-        text_out = ""
-        try:
-            text_out = resp.output_text if hasattr(resp, "output_text") else ""
-        except Exception:
-            text_out = ""
-
-        if not text_out:
-            try:
-                out = getattr(resp, "output", None) or (resp.get("output") if isinstance(resp, dict) else None)
-                if out and isinstance(out, list):
-                    parts = []
-                    for itm in out:
-                        if isinstance(itm, dict) and "content" in itm and isinstance(itm["content"], list):
-                            for c in itm["content"]:
-                                if isinstance(c, dict) and c.get("type") == "output_text":
-                                    parts.append(c.get("text",""))
-                        elif isinstance(itm, str):
-                            parts.append(itm)
-                    text_out = " ".join([p for p in parts if p]).strip()
-            except Exception:
-                pass
-
-        if not text_out:
-            try:
-                text_out = resp["choices"][0]["message"]["content"]
-            except Exception:
-                pass
+        extract = _extract_prose if mode == "prose" else _extract_schema
+        parsed, text_out, usage = extract(client, text, session)
+        _record_usage("llm_extract", mode, usage, parse_failed=parsed is None)
 
         if not text_out:
-            return {"ok": False, "error": "LLM returned no text for entity extraction"}
-
-        parsed = _safe_extract_json_from_text(text_out)
-        if parsed is None:
-            try:
-                parsed = json.loads(text_out)
-            except Exception:
-                parsed = None
+            return {"ok": False, "error": "LLM returned no text for entity extraction", "usage": usage}
 
         if parsed is None:
-            return {"ok": False, "error": "Failed to parse JSON from LLM output", "raw": text_out}
+            return {"ok": False, "error": "Failed to parse JSON from LLM output", "raw": text_out, "usage": usage}
 
         entities = {
             "intent": parsed.get("intent") if isinstance(parsed.get("intent"), str) else ("book_appointment" if "book" in text.lower() else "unknown"),
@@ -242,6 +396,6 @@ def extract_entities_via_llm(text: str) -> Dict[str, Any]:
                 entities["candidate_slots"] = [s.strip() for s in str(entities["candidate_slots"]).split(",") if s.strip()]
             except Exception:
                 entities["candidate_slots"] = []
-        return {"ok": True, "entities": entities, "raw_text": text_out}
+        return {"ok": True, "entities": entities, "raw_text": text_out, "usage": usage}
     except Exception as e:
         return {"ok": False, "error": f"LLM extraction failed: {e}"}
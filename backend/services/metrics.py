@@ -0,0 +1,145 @@
+# backend/services/metrics.py
+"""
+Per-stage latency instrumentation.
+
+    with timed("tts", "gtts"):
+        ...
+
+records the duration into a (stage, provider) histogram exposed at /metrics in Prometheus text
+format, and into the current request's timing list, which the HTTP middleware turns into a
+`Server-Timing` header for /api/voice/* responses.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# seconds; covers cache hits through slow cloud STT/TTS calls
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# per-request list of (stage, provider, seconds); None outside a request
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, str, float]]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # per-bucket counts, then +Inf count, sum
+                series = [0.0] * (len(self.buckets) + 2)
+                self._series[labels] = series
+            if idx < len(self.buckets):
+                series[idx] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def snapshot(self) -> Dict[Tuple[str, ...], List[float]]:
+        with self._lock:
+            return {k: list(v) for k, v in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.snapshot().items()):
+            base = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.label_names, labels))
+            sep = "," if base else ""
+            cumulative = 0.0
+            for le, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{le}"}} {cumulative:g}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {series[-2]:g}')
+            lines.append(f"{self.name}_count{{{base}}} {series[-2]:g}")
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]:.6f}")
+        return lines
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+STAGE_SECONDS = Histogram(
+    "astra_stage_duration_seconds", "Duration of a pipeline stage by provider.", ("stage", "provider")
+)
+HTTP_SECONDS = Histogram(
+    "astra_http_request_duration_seconds", "HTTP request duration by route.", ("method", "route", "status")
+)
+
+
+def observe_stage(stage: str, provider: Optional[str], seconds: float):
+    provider = provider or "none"
+    STAGE_SECONDS.observe((stage, provider), seconds)
+    for observe in _observers:
+        observe(stage, provider, seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, provider, seconds))
+
+
+@contextmanager
+def timed(stage: str, provider: Optional[str] = None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, provider, time.perf_counter() - start)
+
+
+def begin_request_timings() -> Tuple[List[Tuple[str, str, float]], contextvars.Token]:
+    timings: List[Tuple[str, str, float]] = []
+    return timings, _request_timings.set(timings)
+
+
+def end_request_timings(token: contextvars.Token):
+    _request_timings.reset(token)
+
+
+def server_timing_header(timings: List[Tuple[str, str, float]], total: Optional[float] = None) -> str:
+    """Aggregate repeated stages: 'tts;dur=812.3;desc="gtts", stt;dur=...'."""
+    agg: Dict[str, List] = {}
+    for stage, provider, seconds in timings:
+        entry = agg.setdefault(stage, [0.0, []])
+        entry[0] += seconds
+        if provider not in entry[1]:
+            entry[1].append(provider)
+    parts = [f'{stage};dur={secs * 1000:.1f};desc="{"+".join(provs)}"' for stage, (secs, provs) in agg.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# other modules' gauges/counters, rendered after the histograms
+_renderers: List[Callable[[], List[str]]] = []
+# other modules' listeners for every stage observation, e.g. latency estimates
+_observers: List[Callable[[str, str, float], None]] = []
+
+
+def register_renderer(render: Callable[[], List[str]]):
+    _renderers.append(render)
+
+
+def register_observer(observe: Callable[[str, str, float], None]):
+    _observers.append(observe)
+
+
+def render_prometheus() -> str:
+    lines = STAGE_SECONDS.render() + HTTP_SECONDS.render()
+    for render in _renderers:
+        try:
+            lines += render()
+        except Exception:
+            pass
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,128 @@
+# backend/services/prompt_builder.py
+"""
+Prompt assembly for OpenAI calls, laid out for provider-side prompt caching.
+
+  instructions   static prefix: persona, clinic directory (from the doctor catalog) and the task
+                 text. Built once per (task, catalog version) and reused byte-for-byte, so every
+                 call with the same task shares its leading tokens. Nothing per-call (times,
+                 names, ids) goes here.
+  input[0]       rolling session context under a hard token budget: a one-line summary of what
+                 the session already knows (its metadata), then the most recent turns that still
+                 fit; older turns are folded into the summary count.
+  input[-1]      the user's message.
+
+OpenAI caches prompt prefixes from 1024 tokens up, in 128-token steps. Below that the call
+simply reports no cached tokens; the layout is still what lets caching apply as the directory
+grows. ASTRA_LLM_CONTEXT_TOKENS sets the context budget (0 sends no session context).
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("ASTRA_LLM_CONTEXT_TOKENS", "400"))
+MAX_RECENT_TURNS = 8
+MAX_TURN_CHARS = 400
+
+PERSONA = (
+    "You are Astra, the virtual receptionist of NovaCare Wellness Clinic. You help patients book "
+    "appointments by voice: you find the right doctor for their complaint, agree a day and time, and "
+    "collect the patient's name and email for the confirmation. Replies are read aloud, so keep them "
+    "short, plain and friendly, without lists, markdown or emoji."
+)
+
+TASKS = {
+    "extract": "Task: extract clinic booking details from the patient's latest message. "
+               "Use the conversation context only to resolve references. Use null for anything not stated.",
+    "followup": "Task: reply with one concise follow-up question that moves the booking forward.",
+}
+
+# (field, label) in a fixed order so the summary line is deterministic
+SUMMARY_FIELDS = (
+    ("patient_name", "patient"),
+    ("chief_complaint", "complaint"),
+    ("doctor_name", "doctor"),
+    ("requested_slot", "slot"),
+    ("patient_email", "email"),
+)
+
+_prefixes: Dict[Tuple[str, int], str] = {}
+_prefix_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 bytes per token for English; good enough for budgeting without a tokenizer."""
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+def _directory(doctors: List[Dict[str, Any]]) -> str:
+    lines = ["Clinic directory (name | specialization | about):"]
+    for d in sorted(doctors, key=lambda d: (str(d.get("specialization") or ""), str(d.get("name") or ""))):
+        lines.append(f"- {d.get('name') or ''} | {d.get('specialization') or ''} | {d.get('bio') or ''}".rstrip(" |"))
+    return "\n".join(lines)
+
+
+def static_instructions(task: str) -> str:
+    """Byte-stable instructions for a task; changes only when doctors.json does."""
+    from services.doctor_catalog import get_catalog
+    catalog = get_catalog()
+    key = (task, catalog.version)
+    prefix = _prefixes.get(key)
+    if prefix is None:
+        with _prefix_lock:
+            prefix = _prefixes.get(key)
+            if prefix is None:
+                # the shared part comes first so extract and followup calls share cached tokens
+                prefix = "\n\n".join([PERSONA, _directory(catalog.doctors), TASKS[task]])
+                for old in [k for k in _prefixes if k[0] == task]:
+                    del _prefixes[old]
+                _prefixes[key] = prefix
+    return prefix
+
+
+def session_context(session: Optional[dict], current_text: str = "",
+                    budget: int = CONTEXT_TOKEN_BUDGET) -> Optional[str]:
+    """Summary + most recent turns of `session`, at most `budget` tokens; None if nothing to add."""
+    if not session or budget <= 0:
+        return None
+    meta = session.get("metadata") or {}
+    known = [f"{label}={meta[field]}" for field, label in SUMMARY_FIELDS if meta.get(field)]
+    messages = [m for m in (session.get("messages") or []) if isinstance(m, dict) and m.get("text")]
+    # the route appends the user's message before calling the LLM; it is sent separately
+    if messages and messages[-1].get("role") == "user" and messages[-1].get("text") == current_text:
+        messages = messages[:-1]
+    if not known and not messages:
+        return None
+
+    turns: List[str] = []
+    used = estimate_tokens("Known so far: " + ", ".join(known)) + 16
+    for m in reversed(messages[-MAX_RECENT_TURNS:]):
+        line = f"{'Patient' if m.get('role') == 'user' else 'Astra'}: {m['text'][:MAX_TURN_CHARS]}"
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        turns.append(line)
+        used += cost
+    turns.reverse()
+
+    earlier = len(messages) - len(turns)
+    summary = "Known so far: " + (", ".join(known) if known else "nothing yet")
+    if earlier:
+        summary += f" ({earlier} earlier messages summarized)"
+    text = "\n".join([summary] + (["Recent conversation:"] + turns if turns else []))
+    # hard cap even if the summary alone is over budget
+    max_bytes = budget * 4
+    encoded = text.encode("utf-8")
+    if len(encoded) > max_bytes:
+        text = encoded[:max_bytes].decode("utf-8", "ignore")
+    return text
+
+
+def build_input(user_text: str, session: Optional[dict] = None,
+                budget: int = CONTEXT_TOKEN_BUDGET) -> List[Dict[str, Any]]:
+    items = []
+    context = session_context(session, user_text, budget)
+    if context:
+        items.append({"role": "developer", "content": [{"type": "input_text", "text": context}]})
+    items.append({"role": "user", "content": [{"type": "input_text", "text": user_text}]})
+    return items
@@ -1,9 +1,12 @@
 # backend/services/session_service.py
 import json
+import threading
 from pathlib import Path
 import uuid
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+from services.metrics import timed
+from services.shared_state import atomic_write_text, file_lock
 
 DATA_DIR = Path(__file__).resolve().parents[2] / "data"
 SESSIONS_FILE = DATA_DIR / "sessions.json"
@@ -11,24 +14,33 @@ SESSIONS_FILE = DATA_DIR / "sessions.json"
 def _ensure_file():
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     if not SESSIONS_FILE.exists():
-        SESSIONS_FILE.write_text(json.dumps({}, indent=2))
+        with file_lock(SESSIONS_FILE):
+            if not SESSIONS_FILE.exists():
+                atomic_write_text(SESSIONS_FILE, json.dumps({}, indent=2))
 
 def load_all_sessions():
     _ensure_file()
     try:
-        return json.loads(SESSIONS_FILE.read_text())
+        with timed("session_load"):
+            return json.loads(SESSIONS_FILE.read_text())
     except Exception:
         return {}
 
 def save_all_sessions(data: dict):
     _ensure_file()
-    SESSIONS_FILE.write_text(json.dumps(data, indent=2))
+    with file_lock(SESSIONS_FILE), timed("session_save"):
+        atomic_write_text(SESSIONS_FILE, json.dumps(data, indent=2))
+    _index_refresh(data.values(), replace=True)
 
 def create_session(preferred_id: Optional[str] = None):
     """
     Create a session. If preferred_id is provided and not already used, the session will use that id.
     Returns the created session object (with .id).
     """
+    with file_lock(SESSIONS_FILE):
+        return _create_session(preferred_id)
+
+def _create_session(preferred_id: Optional[str]):
     sessions = load_all_sessions()
     # use preferred id if given and not colliding
     sid = preferred_id if preferred_id else str(uuid.uuid4())
@@ -43,7 +55,7 @@ def create_session(preferred_id: Optional[str] = None):
         "metadata": {},  # extracted fields: doctor_id, doctor_name, patient_name, patient_email, requested_slot
         "state": "collecting"  # collecting | confirming | done
     }
-    save_all_sessions(sessions)
+    _write_sessions(sessions, [sessions[sid]])
     return sessions[sid]
 
 def get_session(session_id: str):
@@ -51,16 +63,119 @@ def get_session(session_id: str):
     return sessions.get(session_id)
 
 def update_session(session_id: str, session_obj: dict):
-    sessions = load_all_sessions()
-    sessions[session_id] = session_obj
-    save_all_sessions(sessions)
+    with file_lock(SESSIONS_FILE):
+        sessions = load_all_sessions()
+        sessions[session_id] = session_obj
+        _write_sessions(sessions, [session_obj])
     return session_obj
 
 def append_message(session_id: str, role: str, text: str):
-    s = get_session(session_id)
-    if not s:
-        # create a new session using the session_id provided (so client's id will be honored)
-        s = create_session(preferred_id=session_id)
-    s.setdefault("messages", []).append({"role": role, "text": text, "at": datetime.utcnow().isoformat()})
-    update_session(session_id, s)
+    with file_lock(SESSIONS_FILE):
+        s = get_session(session_id)
+        if not s:
+            # create a new session using the session_id provided (so client's id will be honored)
+            s = create_session(preferred_id=session_id)
+        s.setdefault("messages", []).append({"role": role, "text": text, "at": datetime.utcnow().isoformat()})
+        update_session(session_id, s)
     return s
+
+# ---------------- summary index for listings ----------------
+SUMMARY_FIELDS = ("id", "state", "created_at", "message_count", "last_activity")
+FULL_FIELDS = ("metadata", "messages", "pending_booking_id")
+MAX_PAGE_SIZE = 500
+
+def _summarize(sess: dict) -> dict:
+    msgs = sess.get("messages") or []
+    last = msgs[-1].get("at") if msgs and isinstance(msgs[-1], dict) else None
+    return {
+        "id": sess.get("id"),
+        "state": sess.get("state"),
+        "created_at": sess.get("created_at"),
+        "message_count": len(msgs),
+        "last_activity": last or sess.get("created_at"),
+    }
+
+class _SessionIndex:
+    """Creation-ordered ids + per-session summaries; full fields are read from the file per page."""
+
+    def __init__(self, sessions: Iterable[dict], mtime_ns: Optional[int]):
+        self.mtime_ns = mtime_ns
+        self.order: List[str] = []
+        self.summaries: Dict[str, dict] = {}
+        self.upsert(sessions)
+
+    def upsert(self, sessions: Iterable[dict]):
+        for sess in sessions:
+            sid = sess.get("id")
+            if sid is None:
+                continue
+            if sid not in self.summaries:
+                self.order.append(sid)
+            self.summaries[sid] = _summarize(sess)
+
+_index: Optional[_SessionIndex] = None
+_index_lock = threading.Lock()
+
+def _sessions_mtime_ns() -> Optional[int]:
+    try:
+        return SESSIONS_FILE.stat().st_mtime_ns
+    except OSError:
+        return None
+
+def _write_sessions(data: dict, changed: List[dict]):
+    """Caller holds file_lock(SESSIONS_FILE) and loaded `data` under it."""
+    _ensure_file()
+    before = _sessions_mtime_ns()
+    with timed("session_save"):
+        atomic_write_text(SESSIONS_FILE, json.dumps(data, indent=2))
+    _index_refresh(changed, before=before)
+
+def _index_refresh(changed: Iterable[dict], replace: bool = False, before: Optional[int] = None):
+    """Keep the summary index in step with our own writes instead of re-reading the file."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            return
+        # another worker wrote since the index was built: patching would hide its changes
+        if replace or (before is not None and _index.mtime_ns != before):
+            _index = None
+            return
+        _index.upsert(changed)
+        _index.mtime_ns = _sessions_mtime_ns()
+
+def _get_index() -> _SessionIndex:
+    global _index
+    with _index_lock:
+        mtime = _sessions_mtime_ns()
+        if _index is None or _index.mtime_ns != mtime:
+            _index = _SessionIndex(load_all_sessions().values(), mtime)
+        return _index
+
+def list_sessions_page(cursor: Optional[str] = None, limit: int = 50,
+                       fields: Optional[List[str]] = None) -> Tuple[List[dict], Optional[str], int]:
+    """
+    One page of sessions in creation order, served from the summary index.
+    fields: subset of SUMMARY_FIELDS + FULL_FIELDS; defaults to the summary projection.
+    Returns (items, next_cursor, total).
+    """
+    try:
+        start = max(0, int(cursor)) if cursor else 0
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    fields = list(fields or SUMMARY_FIELDS)
+    unknown = [f for f in fields if f not in SUMMARY_FIELDS and f not in FULL_FIELDS]
+    if unknown:
+        raise ValueError("Unknown fields: " + ", ".join(unknown))
+    idx = _get_index()
+    ids = idx.order[start:start + limit]
+    # only a page that asks for messages/metadata pays for reading the sessions themselves
+    full = load_all_sessions() if any(f in FULL_FIELDS for f in fields) else {}
+    items = []
+    for sid in ids:
+        summary = idx.summaries[sid]
+        sess = full.get(sid) or {}
+        items.append({f: (summary[f] if f in summary else sess.get(f)) for f in fields})
+    end = start + len(ids)
+    next_cursor = str(end) if end < len(idx.order) else None
+    return items, next_cursor, len(idx.order)
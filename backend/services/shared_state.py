@@ -0,0 +1,143 @@
+# backend/services/shared_state.py
+"""
+Primitives that keep the JSON data files safe when several uvicorn workers share them.
+
+  file_lock(path)          exclusive lock across threads *and* processes (flock on "<path>.lock")
+  atomic_write_text(p, s)  write to a temp file and rename, so readers never see a partial file
+  publish(topic)           bump a shared generation counter ("bookings", "doctors", ...)
+  generation(topic)        read it; per-process caches compare it to decide when to rebuild
+
+Multi-worker mode (ASTRA_MULTI_WORKER=1, or WEB_CONCURRENCY > 1) additionally moves admin
+tokens out of process memory (see auth_service):
+
+    ASTRA_MULTI_WORKER=1 uvicorn main:app --workers 4
+"""
+
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Tuple
+
+try:
+    import fcntl  # POSIX
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+BUS_DIR = DATA_DIR / ".cache_bus"
+
+
+def _env_workers() -> int:
+    try:
+        return int(os.environ.get("WEB_CONCURRENCY", "1"))
+    except ValueError:
+        return 1
+
+
+MULTI_WORKER = os.environ.get("ASTRA_MULTI_WORKER", "").lower() in ("1", "true", "yes") or _env_workers() > 1
+
+_locks: Dict[str, threading.RLock] = {}
+_locks_guard = threading.Lock()
+_held = threading.local()
+
+
+def _thread_lock(key: str) -> threading.RLock:
+    lock = _locks.get(key)
+    if lock is None:
+        with _locks_guard:
+            lock = _locks.setdefault(key, threading.RLock())
+    return lock
+
+
+def _os_lock(fd: int):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+
+def _os_unlock(fd: int):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: Path):
+    """
+    Exclusive lock for read-modify-write of `path`. Re-entrant within a thread, so a locked
+    section may call helpers that lock the same file again.
+    """
+    key = str(Path(path).resolve())
+    depth: Dict[str, int] = getattr(_held, "depth", None) or {}
+    _held.depth = depth
+    if depth.get(key):
+        depth[key] += 1
+        try:
+            yield
+        finally:
+            depth[key] -= 1
+        return
+
+    tlock = _thread_lock(key)
+    with tlock:
+        lock_path = Path(key + ".lock")
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            _os_lock(fd)
+            depth[key] = 1
+            try:
+                yield
+            finally:
+                depth[key] = 0
+                _os_unlock(fd)
+        finally:
+            os.close(fd)
+
+
+def atomic_write_text(path: Path, text: str, encoding: str = "utf-8"):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding=encoding) as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+# ---------------- cache-invalidation channel ----------------
+def _bus_file(topic: str) -> Path:
+    return BUS_DIR / topic
+
+
+def generation(topic: str) -> int:
+    """Current generation of `topic`; 0 until something publishes it."""
+    try:
+        return int(_bus_file(topic).read_text() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def publish(topic: str) -> Tuple[int, int]:
+    """Announce that `topic` changed. Returns (previous, new) generation."""
+    path = _bus_file(topic)
+    with file_lock(path):
+        prev = generation(topic)
+        atomic_write_text(path, str(prev + 1))
+    return prev, prev + 1
@@ -0,0 +1,298 @@
+# backend/services/slot_engine.py
+"""
+Structured availability engine.
+
+Doctors keep their availability as weekly labels ("Wed 10:00") in `available_slots`; these are
+parsed once into weekly rules (weekday, start minute, duration, capacity). Rules expand into
+concrete dated slot instances in clinic (IST) time, and a per-specialization week-minute index
+answers "next free slot for X after T" with a bisect instead of scanning every doctor.
+
+Optional per-doctor fields:
+  slot_duration_min (default 30), slot_capacity (default 1)
+
+Booking semantics: a booking with a `slot_start` ISO timestamp occupies that single instance;
+a legacy booking with only `requested_slot` occupies that weekly label in every week.
+"""
+
+import bisect
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.time_utils import IST, now_ist
+
+DEFAULT_DURATION_MIN = 30
+DEFAULT_CAPACITY = 1
+
+DAY_LABELS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+WEEKDAY_INDEX = {
+    "mon": 0, "monday": 0,
+    "tue": 1, "tues": 1, "tuesday": 1,
+    "wed": 2, "wednesday": 2,
+    "thu": 3, "thur": 3, "thurs": 3, "thursday": 3,
+    "fri": 4, "friday": 4,
+    "sat": 5, "saturday": 5,
+    "sun": 6, "sunday": 6,
+}
+
+_LABEL_RE = re.compile(r'^\s*([A-Za-z]+)\.?\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\s*$', re.I)
+_WEEKDAY_RE = re.compile(r'\b(?:(this|next|coming)\s+)?(' + "|".join(sorted(WEEKDAY_INDEX, key=len, reverse=True)) + r')\b', re.I)
+_IN_DAYS_RE = re.compile(r'\bin\s+(\d{1,2}|a|one|two|three|four|five|six|seven)\s+days?\b', re.I)
+_TIME_RE = re.compile(r'\b(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?(?=\W|$)', re.I)
+_WORD_NUMS = {"a": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7}
+
+
+@dataclass(frozen=True)
+class SlotRule:
+    doctor_id: Any
+    weekday: int        # 0 = Monday
+    minute: int         # minutes after midnight
+    duration_min: int
+    capacity: int
+    label: str          # original available_slots string
+
+    @property
+    def week_minute(self) -> int:
+        return self.weekday * 1440 + self.minute
+
+
+@dataclass(frozen=True)
+class SlotInstance:
+    doctor_id: Any
+    label: str
+    start: datetime
+    end: datetime
+    capacity: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "doctor_id": self.doctor_id,
+            "label": self.label,
+            "start": self.start.isoformat(),
+            "end": self.end.isoformat(),
+            "capacity": self.capacity,
+        }
+
+
+# ---------------- parsing ----------------
+@lru_cache(maxsize=4096)
+def parse_slot_label(label: str) -> Optional[Tuple[int, int]]:
+    """'Wed 10:00' / 'Fri 4pm' -> (weekday, minute). None if not a weekly label."""
+    m = _LABEL_RE.match(label or "")
+    if not m:
+        return None
+    wd = WEEKDAY_INDEX.get(m.group(1).lower())
+    if wd is None:
+        return None
+    h, mins = int(m.group(2)), int(m.group(3) or 0)
+    ampm = (m.group(4) or "").lower()
+    if ampm == "pm" and h != 12:
+        h += 12
+    if ampm == "am" and h == 12:
+        h = 0
+    if h > 23 or mins > 59:
+        return None
+    return wd, h * 60 + mins
+
+
+def format_slot_label(weekday: int, minute: int) -> str:
+    return f"{DAY_LABELS[weekday]} {minute // 60:02d}:{minute % 60:02d}"
+
+
+def parse_time_of_day(text: str) -> Optional[int]:
+    """First clock time mentioned in text ('3pm', '3:30 pm', '15:00') -> minutes after midnight."""
+    for m in _TIME_RE.finditer(text or ""):
+        h, mins = int(m.group(1)), int(m.group(2) or 0)
+        ampm = (m.group(3) or "").lower().replace(".", "")
+        if not ampm and m.group(2) is None:
+            # bare numbers ("in 3 days", "booking 12") are not times
+            continue
+        if ampm == "pm" and h != 12:
+            h += 12
+        if ampm == "am" and h == 12:
+            h = 0
+        if h <= 23 and mins <= 59:
+            return h * 60 + mins
+    return None
+
+
+def resolve_relative_date(text: str, now: Optional[datetime] = None) -> Optional[date]:
+    """
+    Resolve a spoken day reference against the clinic's IST clock.
+    today / tonight, tomorrow, day after tomorrow, in N days,
+    '<weekday>' / 'this <weekday>' -> next occurrence on or after today,
+    'next <weekday>' -> next occurrence strictly after today.
+    """
+    if not text:
+        return None
+    now = now or now_ist()
+    today = now.astimezone(IST).date() if now.tzinfo else now.date()
+    t = text.lower()
+    if "day after tomorrow" in t:
+        return today + timedelta(days=2)
+    if re.search(r'\b(tomorrow|tomorow|tommorow|tmrw)\b', t):
+        return today + timedelta(days=1)
+    if re.search(r'\b(today|tonight)\b', t):
+        return today
+    m = _IN_DAYS_RE.search(t)
+    if m:
+        n = m.group(1)
+        return today + timedelta(days=int(n) if n.isdigit() else _WORD_NUMS[n])
+    m = _WEEKDAY_RE.search(t)
+    if m:
+        wd = WEEKDAY_INDEX[m.group(2).lower()]
+        delta = (wd - today.weekday()) % 7
+        if m.group(1) and m.group(1).lower() == "next" and delta == 0:
+            delta = 7
+        return today + timedelta(days=delta)
+    return None
+
+
+@lru_cache(maxsize=1024)
+def _rules_for(doctor_id: Any, slots: Tuple[str, ...], duration: int, capacity: int) -> Tuple[SlotRule, ...]:
+    rules = []
+    for label in slots:
+        parsed = parse_slot_label(label) if isinstance(label, str) else None
+        if parsed:
+            rules.append(SlotRule(doctor_id, parsed[0], parsed[1], duration, capacity, label))
+    return tuple(sorted(rules, key=lambda r: r.week_minute))
+
+
+def rules_for_doctor(doctor: Dict[str, Any]) -> Tuple[SlotRule, ...]:
+    slots = tuple(s for s in (doctor.get("available_slots") or []) if isinstance(s, str))
+    return _rules_for(
+        doctor.get("id"), slots,
+        int(doctor.get("slot_duration_min") or DEFAULT_DURATION_MIN),
+        int(doctor.get("slot_capacity") or DEFAULT_CAPACITY),
+    )
+
+
+def _instance(rule: SlotRule, day: date) -> SlotInstance:
+    start = datetime.combine(day, time(rule.minute // 60, rule.minute % 60), tzinfo=IST)
+    return SlotInstance(rule.doctor_id, rule.label, start, start + timedelta(minutes=rule.duration_min), rule.capacity)
+
+
+def slot_start_key(value: Any) -> Optional[str]:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=IST)
+    return dt.astimezone(IST).isoformat()
+
+
+def booking_counts(bookings: Iterable[Dict[str, Any]]) -> Tuple[Dict[Tuple[Any, str], int], Dict[Tuple[Any, str], int]]:
+    """(per-weekly-label counts for legacy bookings, per-instance counts for dated bookings)."""
+    by_label: Dict[Tuple[Any, str], int] = {}
+    by_start: Dict[Tuple[Any, str], int] = {}
+    for b in bookings or []:
+        if b.get("status") == "cancelled":
+            continue
+        start = slot_start_key(b.get("slot_start"))
+        if start:
+            key = (b.get("doctor_id"), start)
+            by_start[key] = by_start.get(key, 0) + 1
+        elif b.get("requested_slot"):
+            key = (b.get("doctor_id"), b.get("requested_slot"))
+            by_label[key] = by_label.get(key, 0) + 1
+    return by_label, by_start
+
+
+# ---------------- engine ----------------
+class AvailabilityEngine:
+    def __init__(self, doctors: List[Dict[str, Any]], version: Any = None):
+        self.version = version
+        self.doctors = list(doctors or [])
+        self.doctors_by_id = {d.get("id"): d for d in self.doctors}
+        self.rules: Dict[Any, Tuple[SlotRule, ...]] = {d.get("id"): rules_for_doctor(d) for d in self.doctors}
+        # specialization (lowercased, "" = any) -> rules sorted by minute of week
+        self._index: Dict[str, List[SlotRule]] = {"": []}
+        for d in self.doctors:
+            spec = (d.get("specialization") or "").strip().lower()
+            for r in self.rules[d.get("id")]:
+                self._index.setdefault(spec, []).append(r)
+                self._index[""].append(r)
+        self._index_keys: Dict[str, List[int]] = {}
+        for spec, rules in self._index.items():
+            rules.sort(key=lambda r: r.week_minute)
+            self._index_keys[spec] = [r.week_minute for r in rules]
+
+    def instances(self, doctor_id: Any, start: datetime, end: datetime) -> List[SlotInstance]:
+        """Concrete slot instances for a doctor with start in [start, end)."""
+        out = []
+        rules = self.rules.get(doctor_id, ())
+        day = start.astimezone(IST).date()
+        last = end.astimezone(IST).date()
+        while day <= last:
+            for r in rules:
+                if r.weekday == day.weekday():
+                    inst = _instance(r, day)
+                    if start <= inst.start < end:
+                        out.append(inst)
+            day += timedelta(days=1)
+        return out
+
+    def capacity(self, doctor_id: Any, label: str) -> int:
+        """How many bookings the doctor's weekly slot `label` takes (DEFAULT_CAPACITY if unlisted)."""
+        for r in self.rules.get(doctor_id, ()):
+            if r.label == label:
+                return r.capacity
+        return DEFAULT_CAPACITY
+
+    def label_has_room(self, doctor_id: Any, label: str, bookings: Iterable[Dict[str, Any]]) -> bool:
+        """Whether active bookings of (doctor_id, label) are still below that slot's capacity."""
+        used = sum(1 for b in bookings or []
+                   if b.get("status") != "cancelled" and b.get("doctor_id") == doctor_id
+                   and b.get("requested_slot") == label)
+        return used < self.capacity(doctor_id, label)
+
+    def is_free(self, inst: SlotInstance, counts) -> bool:
+        by_label, by_start = counts
+        used = by_label.get((inst.doctor_id, inst.label), 0) + by_start.get((inst.doctor_id, inst.start.isoformat()), 0)
+        return used < inst.capacity
+
+    def next_free_slot(self, specialization: Optional[str], after: Optional[datetime] = None,
+                       bookings: Optional[List[Dict[str, Any]]] = None, horizon_days: int = 28) -> Optional[SlotInstance]:
+        """Earliest free slot instance (any doctor of the specialization) starting at or after `after`."""
+        spec = (specialization or "").strip().lower()
+        rules = self._index.get(spec)
+        if not rules:
+            return None
+        keys = self._index_keys[spec]
+        after = (after or now_ist()).astimezone(IST)
+        counts = booking_counts(bookings or [])
+        base = after.weekday() * 1440 + after.hour * 60 + after.minute
+        week_start = datetime.combine(after.date() - timedelta(days=after.weekday()), time(0), tzinfo=IST)
+        pos = bisect.bisect_left(keys, base)
+        limit = after + timedelta(days=horizon_days)
+        week = 0
+        while True:
+            for r in rules[pos:]:
+                start = week_start + timedelta(days=7 * week, minutes=r.week_minute)
+                if start > limit:
+                    return None
+                if start < after:
+                    continue
+                inst = SlotInstance(r.doctor_id, r.label, start, start + timedelta(minutes=r.duration_min), r.capacity)
+                if self.is_free(inst, counts):
+                    return inst
+            week += 1
+            pos = 0
+
+
+_engine: Optional[AvailabilityEngine] = None
+
+
+def get_engine() -> AvailabilityEngine:
+    """Shared engine, rebuilt whenever the doctor catalog version changes."""
+    global _engine
+    from services.doctor_catalog import get_catalog
+    catalog = get_catalog()
+    if _engine is None or _engine.version != catalog.version:
+        _engine = AvailabilityEngine(catalog.doctors, version=catalog.version)
+    return _engine
@@ -0,0 +1,177 @@
+# backend/services/startup.py
+"""
+Startup policy: what to warm in the background after the server is already answering, and
+what to leave for first use.
+
+ASTRA_PRELOAD selects components ("auto" by default, or "all", "none", or a comma list):
+
+  indexes   doctor catalog, entity matcher, slot engine, availability bitmaps     (auto: yes)
+  openai    import the SDK and build the shared client                            (auto: if openai.json has a key)
+  http      import requests for ElevenLabs                                        (auto: if ElevenLabs is configured)
+  gtts      import gTTS                                                           (auto: if ElevenLabs is not configured)
+  whisper   load the local faster-whisper models (slow, several hundred MB each)  (auto: only if there is no OpenAI key)
+
+Preloading runs on one daemon thread, started from the app lifespan, so it never delays the
+first healthy response. /health reports per-component progress.
+
+ASTRA_STARTUP_PROFILE=1 records how long each module took to import (cumulative, like
+`python -X importtime`) and prints the slowest at startup.
+"""
+
+import builtins
+import importlib
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+COMPONENTS = ("indexes", "openai", "http", "gtts", "whisper")
+
+_status: Dict[str, Dict[str, object]] = {}
+_status_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_started_at = time.monotonic()
+
+
+# ---------------- import-time profile ----------------
+PROFILE_IMPORTS = os.environ.get("ASTRA_STARTUP_PROFILE", "").lower() in ("1", "true", "yes")
+_import_times: Dict[str, float] = {}
+_real_import = builtins.__import__
+
+
+def _timed_import(key: str, load: Callable[[], object]):
+    t0 = time.perf_counter()
+    module = load()
+    _import_times.setdefault(key, time.perf_counter() - t0)
+    return module
+
+
+def _profiling_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level:
+        return _real_import(name, globals, locals, fromlist, level)
+    if name not in sys.modules:
+        _timed_import(name, lambda: _real_import(name, globals, locals, (), 0))
+    # `from routes import auth` loads submodules without going through __import__ again
+    pkg = sys.modules.get(name)
+    if fromlist and hasattr(pkg, "__path__"):
+        for item in fromlist:
+            full = f"{name}.{item}"
+            if item != "*" and full not in sys.modules and not hasattr(pkg, item):
+                try:
+                    _timed_import(full, lambda: importlib.import_module(full))
+                except ImportError:
+                    pass
+    return _real_import(name, globals, locals, fromlist, level)
+
+
+def enable_import_profile():
+    """Install the import timer; main.py calls this before importing routers when profiling."""
+    builtins.__import__ = _profiling_import
+
+
+def import_profile_report(top: int = 20) -> List[Tuple[str, float]]:
+    builtins.__import__ = _real_import
+    return sorted(_import_times.items(), key=lambda kv: kv[1], reverse=True)[:top]
+
+
+# ---------------- background preload ----------------
+def _warm_indexes():
+    from services.doctor_catalog import get_catalog
+    from services.entity_matcher import get_matcher
+    from services.slot_engine import get_engine
+    from services.availability_service import get_availability_index
+    get_catalog()
+    get_matcher()
+    get_engine()
+    get_availability_index()
+
+
+def _warm_openai():
+    from services.llm_service import _load_openai_key, get_openai_client
+    get_openai_client(_load_openai_key())
+
+
+def _warm_http():
+    import requests  # noqa: F401
+
+
+def _warm_gtts():
+    import gtts  # noqa: F401
+
+
+def _warm_whisper():
+    from services.transcribe_service import PROFILES, get_whisper_model
+    for size in sorted({p.model_size for p in PROFILES.values()}):
+        get_whisper_model(size)
+
+
+_WARMERS: Dict[str, Callable[[], None]] = {
+    "indexes": _warm_indexes,
+    "openai": _warm_openai,
+    "http": _warm_http,
+    "gtts": _warm_gtts,
+    "whisper": _warm_whisper,
+}
+
+
+def planned_components() -> List[str]:
+    raw = (os.environ.get("ASTRA_PRELOAD") or "auto").strip().lower()
+    if raw == "none":
+        return []
+    if raw == "all":
+        return list(COMPONENTS)
+    if raw != "auto":
+        return [c.strip() for c in raw.split(",") if c.strip() in _WARMERS]
+
+    from services.llm_service import openai_configured
+    from services.tts_service import elevenlabs_configured
+    has_openai = openai_configured()
+    has_eleven = elevenlabs_configured()
+    plan = ["indexes"]
+    if has_openai:
+        plan.append("openai")
+    plan.append("http" if has_eleven else "gtts")
+    if not has_openai:
+        plan.append("whisper")  # local STT is the primary path; keep it last, it is the slowest
+    return plan
+
+
+def _set(name: str, **fields):
+    with _status_lock:
+        _status.setdefault(name, {}).update(fields)
+
+
+def _run(components: List[str]):
+    for name in components:
+        _set(name, state="running")
+        t0 = time.perf_counter()
+        try:
+            _WARMERS[name]()
+            _set(name, state="done", ms=round((time.perf_counter() - t0) * 1000, 1))
+        except Exception as e:
+            _set(name, state="failed", ms=round((time.perf_counter() - t0) * 1000, 1), error=str(e))
+
+
+def start_preload() -> List[str]:
+    """Start the background preload once; returns the planned components."""
+    global _thread
+    if _thread is not None:
+        return [k for k, v in _status.items() if v.get("state") != "deferred"]
+    components = planned_components()
+    for name in COMPONENTS:
+        _set(name, state="pending" if name in components else "deferred")
+    _thread = threading.Thread(target=_run, args=(components,), name="preload", daemon=True)
+    _thread.start()
+    return components
+
+
+def preload_status() -> Dict[str, object]:
+    with _status_lock:
+        components = {k: dict(v) for k, v in _status.items()}
+    busy = any(v.get("state") in ("pending", "running") for v in components.values())
+    return {
+        "uptime_s": round(time.monotonic() - _started_at, 3),
+        "preload_complete": not busy,
+        "components": components,
+    }
@@ -0,0 +1,193 @@
+# backend/services/stt_cache.py
+"""
+Transcription result cache keyed by a hash of the uploaded audio bytes (plus the decoding
+profile), so client retries and re-submitted blobs do not re-run Whisper or re-bill OpenAI.
+
+  bounded   LRU over at most MAX_ENTRIES results and MAX_BYTES of estimated memory
+  TTL       entries expire TTL_S after they were stored (checked on read, swept on write)
+  in-flight identical uploads that arrive while the first is still being transcribed wait for
+            that result instead of starting their own decode, for at most COALESCE_WAIT_S
+            (then they decode on their own) or until the turn runs out (then they give up with
+            an error rather than start a second decode of the same audio)
+
+Only successful results are cached. The cache is per process; under several workers a retry
+may still land on a worker that has not seen the audio. ASTRA_STT_CACHE=0 disables it.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from services.deadline import degrade, remaining
+from services.metrics import register_renderer
+
+ENABLED = os.environ.get("ASTRA_STT_CACHE", "1").lower() not in ("0", "false", "no")
+TTL_S = float(os.environ.get("ASTRA_STT_CACHE_TTL_S", "600"))
+MAX_ENTRIES = 2048
+MAX_BYTES = 4 * 1024 * 1024
+ENTRY_OVERHEAD = 256  # dict, key and bookkeeping per entry, roughly
+COALESCE_WAIT_S = float(os.environ.get("ASTRA_STT_COALESCE_WAIT_S", "30"))
+
+
+def audio_key(data: bytes, variant: str = "") -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest() + (f":{variant}" if variant else "")
+
+
+def _entry_size(key: str, result: dict) -> int:
+    return ENTRY_OVERHEAD + len(key) + sum(len(str(v)) for v in result.values())
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class TranscriptCache:
+    def __init__(self, ttl_s: float = TTL_S, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, int, dict]]" = OrderedDict()  # key -> (expires, size, result)
+        self._bytes = 0
+        self._inflight: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "wait_timeouts": 0, "evicted": 0, "expired": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _lookup(self, key: str, now: float) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            self._drop(key)
+            self.stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def _store(self, key: str, result: dict, now: float):
+        size = _entry_size(key, result)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (now + self.ttl_s, size, result)
+        self._bytes += size
+        # LRU order: expired entries near the front go first anyway
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            expired = self._entries[oldest][0] <= now
+            self._drop(oldest)
+            self.stats["expired" if expired else "evicted"] += 1
+
+    def peek(self, key: str) -> Optional[dict]:
+        """Cached result, without computing or waiting for an in-flight decode."""
+        with self._lock:
+            cached = self._lookup(key, time.monotonic())
+            if cached is not None:
+                self.stats["hits"] += 1
+            return cached
+
+    def get_or_compute(self, key: str, compute: Callable[[], dict]) -> Tuple[dict, str]:
+        """(result, how): how is "hit", "coalesced", "miss" or "timeout"."""
+        with self._lock:
+            cached = self._lookup(key, time.monotonic())
+            if cached is not None:
+                self.stats["hits"] += 1
+                return cached, "hit"
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            left = remaining()
+            if not flight.done.wait(COALESCE_WAIT_S if left is None else min(COALESCE_WAIT_S, left)):
+                with self._lock:
+                    self.stats["wait_timeouts"] += 1
+                if left is not None and left < COALESCE_WAIT_S:
+                    # the turn is over; a second decode of the same audio would only add load
+                    degrade("stt", "in_flight")
+                    return {"ok": False, "error": "Transcription still in progress; the turn ran out of time."}, "timeout"
+                # the first decode looks stuck: don't wait on it any longer
+                return compute(), "miss"
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, "coalesced"
+
+        try:
+            result = compute()
+            flight.result = result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if flight.error is None and flight.result and flight.result.get("ok"):
+                    self._store(key, flight.result, time.monotonic())
+            flight.done.set()
+        return result, "miss"
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries), "bytes": self._bytes,
+                    "in_flight": len(self._inflight)}
+
+
+_cache = TranscriptCache()
+
+
+def cached_transcription(data: bytes, variant: str, compute: Callable[[], dict]) -> dict:
+    """compute() once per distinct (audio, variant); hits come back marked "cached": true."""
+    if not ENABLED:
+        return compute()
+    result, how = _cache.get_or_compute(audio_key(data, variant), compute)
+    if how in ("miss", "timeout"):
+        return result
+    return {**result, "cached": True}
+
+
+def peek_transcription(data: bytes, variant: str) -> Optional[dict]:
+    """The cached result for (audio, variant), marked "cached": true; None on a miss."""
+    if not ENABLED:
+        return None
+    result = _cache.peek(audio_key(data, variant))
+    return {**result, "cached": True} if result is not None else None
+
+
+def _render_metrics():
+    snap = _cache.snapshot()
+    lines = ["# HELP astra_stt_cache_requests_total Transcription cache lookups by outcome.",
+             "# TYPE astra_stt_cache_requests_total counter"]
+    lines += [f'astra_stt_cache_requests_total{{outcome="{k}"}} {snap[k]}' for k in ("hits", "misses", "coalesced")]
+    lines += ["# HELP astra_stt_cache_wait_timeouts_total Coalesced uploads that stopped waiting and decoded on their own.",
+              "# TYPE astra_stt_cache_wait_timeouts_total counter",
+              f'astra_stt_cache_wait_timeouts_total {snap["wait_timeouts"]}']
+    lines += ["# HELP astra_stt_cache_removed_total Cached transcriptions dropped (LRU eviction or TTL).",
+              "# TYPE astra_stt_cache_removed_total counter"]
+    lines += [f'astra_stt_cache_removed_total{{reason="{k}"}} {snap[k]}' for k in ("evicted", "expired")]
+    lines += ["# HELP astra_stt_cache_entries Cached transcriptions and their estimated size.",
+              "# TYPE astra_stt_cache_entries gauge",
+              f'astra_stt_cache_entries{{unit="entries"}} {snap["entries"]}',
+              f'astra_stt_cache_entries{{unit="bytes"}} {snap["bytes"]}']
+    return lines
+
+
+register_renderer(_render_metrics)
@@ -8,17 +8,23 @@ except Exception:
     ZoneInfo = None
     _HAS_ZONEINFO = False
 
-def now_ist_iso():
-    """
-    Return ISO timestamp string for current time in IST (Asia/Kolkata).
-    Tries ZoneInfo("Asia/Kolkata") first; if not available, falls back to fixed +5:30 offset.
-    """
+def _ist_tz():
     if _HAS_ZONEINFO and ZoneInfo is not None:
         try:
-            ist = datetime.now(tz=ZoneInfo("Asia/Kolkata"))
-            return ist.isoformat()
+            return ZoneInfo("Asia/Kolkata")
         except Exception:
             pass
-    # fallback using fixed offset +05:30
-    ist = datetime.now(timezone(timedelta(hours=5, minutes=30)))
-    return ist.isoformat()
+    return timezone(timedelta(hours=5, minutes=30))
+
+IST = _ist_tz()
+
+def now_ist() -> datetime:
+    """Current clinic time as an aware datetime in IST."""
+    return datetime.now(tz=IST)
+
+def now_ist_iso():
+    """
+    Return ISO timestamp string for current time in IST (Asia/Kolkata).
+    Uses ZoneInfo("Asia/Kolkata") when available, else a fixed +5:30 offset.
+    """
+    return now_ist().isoformat()
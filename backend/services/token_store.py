@@ -0,0 +1,192 @@
+# backend/services/token_store.py
+"""
+Admin session token stores. ASTRA_TOKEN_STORE picks one:
+
+  memory  (default)  dict + expiry min-heap. Every issue/validate pops tokens whose expiry has
+                     passed off the heap top, so cleanup is amortized O(1) per token and never
+                     scans. Capped at MAX_TOKENS (soonest-expiring evicted first).
+  sqlite             same contract in data/auth_tokens.sqlite3: survives restarts and is shared
+                     by all workers (the default in multi-worker mode).
+  signed             stateless "<payload>.<hmac>" tokens; validation is a signature check with
+                     no lookup at all. Cannot be revoked before expiry. The key comes from
+                     ASTRA_TOKEN_SECRET or is generated once into data/token_secret.
+"""
+
+import base64
+import hashlib
+import heapq
+import hmac
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from services.shared_state import MULTI_WORKER, atomic_write_text, file_lock
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+TOKENS_DB = DATA_DIR / "auth_tokens.sqlite3"
+SECRET_FILE = DATA_DIR / "token_secret"
+
+MAX_TOKENS = 100_000
+SWEEP_INTERVAL = 60.0  # sqlite: seconds between expiry DELETEs
+
+
+class MemoryTokenStore:
+    def __init__(self, max_tokens: int = MAX_TOKENS):
+        self.max_tokens = max_tokens
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def _sweep(self, now: float):
+        heap, tokens = self._heap, self._tokens
+        while heap and heap[0][0] <= now:
+            expires, token = heapq.heappop(heap)
+            entry = tokens.get(token)
+            if entry is not None and entry[1] == expires:
+                del tokens[token]
+
+    def issue(self, username: str, ttl_s: float) -> str:
+        token = secrets.token_urlsafe(24)
+        now = time.time()
+        expires = now + ttl_s
+        with self._lock:
+            self._sweep(now)
+            while len(self._tokens) >= self.max_tokens and self._heap:
+                _, victim = heapq.heappop(self._heap)
+                self._tokens.pop(victim, None)
+            self._tokens[token] = (username, expires)
+            heapq.heappush(self._heap, (expires, token))
+        return token
+
+    def validate(self, token: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            entry = self._tokens.get(token)
+        if entry is None or entry[1] <= now:
+            return None
+        return entry[0]
+
+
+class SqliteTokenStore:
+    def __init__(self, path: Path = None, max_tokens: int = MAX_TOKENS):
+        self.path = Path(path or TOKENS_DB)
+        self.max_tokens = max_tokens
+        self._local = threading.local()
+        self._swept_at = 0.0
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS tokens (token TEXT PRIMARY KEY, username TEXT NOT NULL, expires REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS tokens_expires ON tokens (expires)")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        return self._db().execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+
+    def _sweep(self, db: sqlite3.Connection, now: float):
+        if now - self._swept_at < SWEEP_INTERVAL:
+            return
+        self._swept_at = now
+        db.execute("DELETE FROM tokens WHERE expires <= ?", (now,))
+        excess = len(self) - self.max_tokens
+        if excess > 0:
+            db.execute("DELETE FROM tokens WHERE token IN (SELECT token FROM tokens ORDER BY expires LIMIT ?)", (excess,))
+
+    def issue(self, username: str, ttl_s: float) -> str:
+        token = secrets.token_urlsafe(24)
+        now = time.time()
+        db = self._db()
+        self._sweep(db, now)
+        db.execute("INSERT INTO tokens (token, username, expires) VALUES (?, ?, ?)", (token, username, now + ttl_s))
+        return token
+
+    def validate(self, token: str) -> Optional[str]:
+        row = self._db().execute("SELECT username, expires FROM tokens WHERE token = ?", (token,)).fetchone()
+        if not row or row[1] <= time.time():
+            return None
+        return row[0]
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class SignedTokenStore:
+    """Tokens carry "username|expires" and an HMAC-SHA256 of it; nothing is stored."""
+
+    def __init__(self, secret: bytes):
+        self._secret = secret
+
+    def __len__(self) -> int:
+        return 0
+
+    def _sign(self, payload: bytes) -> bytes:
+        return hmac.new(self._secret, payload, hashlib.sha256).digest()
+
+    def issue(self, username: str, ttl_s: float) -> str:
+        payload = f"{username}|{int(time.time() + ttl_s)}".encode("utf-8")
+        return f"{_b64(payload)}.{_b64(self._sign(payload))}"
+
+    def validate(self, token: str) -> Optional[str]:
+        try:
+            p64, s64 = token.split(".", 1)
+            payload = _unb64(p64)
+            if not hmac.compare_digest(_unb64(s64), self._sign(payload)):
+                return None
+            username, expires = payload.decode("utf-8").rsplit("|", 1)
+            if int(expires) <= time.time():
+                return None
+            return username
+        except Exception:
+            return None
+
+
+def _load_secret() -> bytes:
+    env = os.environ.get("ASTRA_TOKEN_SECRET")
+    if env:
+        return env.encode("utf-8")
+    if not SECRET_FILE.exists():
+        # every worker (and the next restart) must sign with the same key
+        with file_lock(SECRET_FILE):
+            if not SECRET_FILE.exists():
+                atomic_write_text(SECRET_FILE, secrets.token_hex(32))
+    return SECRET_FILE.read_text().strip().encode("utf-8")
+
+
+def _make_store():
+    kind = (os.environ.get("ASTRA_TOKEN_STORE") or ("sqlite" if MULTI_WORKER else "memory")).lower()
+    if kind == "signed":
+        return SignedTokenStore(_load_secret())
+    if kind == "sqlite":
+        return SqliteTokenStore(TOKENS_DB)
+    return MemoryTokenStore()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_token_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _make_store()
+    return _store
@@ -4,12 +4,44 @@ Transcription service with explicit, helpful error messages when OpenAI client i
 If OpenAI client (v1.x) is installed, uses the new client.
 If not installed and faster-whisper is available, uses local transcription as fallback.
 If neither is possible, returns a clear error instructing how to fix it.
+
+Before either path, uploads go through services.audio_preprocess (mono, 16 kHz, silence
+trimmed, loudness normalized). The local model takes the samples directly, without a temp
+file; OpenAI gets a trimmed WAV only when trimming saved at least OPENAI_MIN_SAVED_S (else the
+smaller compressed original is sent). Results carry an "audio" report with the seconds saved.
+
+Local transcriptions of up to one Whisper window (30 s) go through a micro-batcher: utterances
+arriving within ASTRA_STT_BATCH_WAIT_MS of each other (up to ASTRA_STT_BATCH_SIZE) are encoded
+and decoded as one batch on the shared model, and each waiting request gets its own text back.
+ASTRA_STT_BATCH_SIZE=1 disables batching.
+
+Decoding cost follows a named profile (PROFILES): model size, beam width, language pinning and
+VAD filtering. The caller picks one explicitly, or it follows what the conversation expects
+next (EXPECT_PROFILES): a yes/no confirmation gets greedy decoding on a small model, a free-form
+complaint gets the full beam search.
+
+Identical uploads (same bytes, same profile) are answered from services.stt_cache, and
+simultaneous duplicates share one transcription.
+
+Under a turn deadline (services.deadline) with less time left than transcription usually takes,
+the request drops to DEGRADED_PROFILE unless the requested profile's result is already cached,
+and an OpenAI call makes one attempt bounded by the time left.
 """
 
 import io
+import os
+import queue
 import tempfile
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Dict, Optional
 import json
+from services.metrics import register_renderer, timed
+from services.audio_preprocess import TARGET_SR, preprocess, to_wav_bytes
+from services.stt_cache import cached_transcription, peek_transcription
+from services.deadline import degrade, remaining, time_for
 
 OPENAI_CFG_FILE = Path(__file__).resolve().parents[2] / "data" / "openai.json"
 
@@ -30,7 +62,285 @@ def _openai_client_available():
     except Exception:
         return False
 
-def transcribe_audio_bytes(file_bytes: bytes, filename_hint: str = "audio.webm"):
+# a WAV upload is ~8x the size of the browser's opus; only worth it when it cuts billed audio
+OPENAI_MIN_SAVED_S = 1.0
+
+AUDIO_TOTALS = {"requests": 0, "original_seconds": 0.0, "seconds_saved": 0.0}
+_totals_lock = threading.Lock()
+
+def _render_metrics():
+    with _totals_lock:
+        totals = dict(AUDIO_TOTALS)
+    stats = _batcher.snapshot()
+    return [
+        "# HELP astra_stt_batches_total Batched local inferences and the utterances they carried.",
+        "# TYPE astra_stt_batches_total counter",
+        f'astra_stt_batches_total{{unit="batches"}} {stats["batches"]}',
+        f'astra_stt_batches_total{{unit="utterances"}} {stats["utterances"]}',
+        "# HELP astra_stt_batch_retries_total Batched utterances redone unbatched after failing the quality checks.",
+        "# TYPE astra_stt_batch_retries_total counter",
+        f'astra_stt_batch_retries_total {stats["retried"]}',
+        "# HELP astra_stt_audio_seconds_total Seconds of uploaded audio before preprocessing.",
+        "# TYPE astra_stt_audio_seconds_total counter",
+        f"astra_stt_audio_seconds_total {totals['original_seconds']:.3f}",
+        "# HELP astra_stt_audio_seconds_saved_total Seconds of audio trimmed before transcription.",
+        "# TYPE astra_stt_audio_seconds_saved_total counter",
+        f"astra_stt_audio_seconds_saved_total {totals['seconds_saved']:.3f}",
+    ]
+
+register_renderer(_render_metrics)
+
+def prepare_audio(file_bytes: bytes):
+    """Preprocessed audio (or None to use the raw upload), recorded in the totals."""
+    with timed("audio_preprocess", "numpy"):
+        prepared = preprocess(file_bytes)
+    if prepared is not None:
+        with _totals_lock:
+            AUDIO_TOTALS["requests"] += 1
+            AUDIO_TOTALS["original_seconds"] += prepared.original_s
+            AUDIO_TOTALS["seconds_saved"] += prepared.seconds_saved
+    return prepared
+
+WHISPER_MODEL_SIZE = "small"
+_whisper_models: Dict[str, object] = {}
+_whisper_lock = threading.Lock()
+
+def get_whisper_model(size: Optional[str] = None):
+    """Local faster-whisper model per size, loaded once (seconds and up to ~1 GB) and then reused."""
+    size = size or WHISPER_MODEL_SIZE
+    model = _whisper_models.get(size)
+    if model is None:
+        with _whisper_lock:
+            model = _whisper_models.get(size)
+            if model is None:
+                from faster_whisper import WhisperModel  # type: ignore
+                model = WhisperModel(size, device="cpu", compute_type="int8")
+                _whisper_models[size] = model
+    return model
+
+# ---------------- decoding profiles ----------------
+# language pinned by the fast profile; auto-detect costs an extra decoder pass per clip
+PINNED_LANGUAGE = os.environ.get("ASTRA_STT_LANGUAGE", "en")
+
+@dataclass(frozen=True)
+class TranscriptionProfile:
+    name: str
+    model_size: str
+    beam_size: int                  # 1 = greedy
+    language: Optional[str] = None  # None = detect per clip
+    vad_filter: bool = False        # Silero VAD inside faster-whisper (drops pauses mid-utterance)
+
+PROFILES: Dict[str, TranscriptionProfile] = {
+    "fast": TranscriptionProfile("fast", "base", beam_size=1, language=PINNED_LANGUAGE),
+    "balanced": TranscriptionProfile("balanced", WHISPER_MODEL_SIZE, beam_size=3),
+    "accurate": TranscriptionProfile("accurate", WHISPER_MODEL_SIZE, beam_size=5, vad_filter=True),
+}
+DEFAULT_PROFILE = "balanced"
+# what a request falls back to when the turn deadline is too close for its own profile
+DEGRADED_PROFILE = "fast"
+
+# converse's `expect` -> profile for the answer to that question
+EXPECT_PROFILES = {
+    "confirm": "fast",
+    "ask_email": "fast",
+    "ask_name": "balanced",
+    "ask_slot": "balanced",
+    "ask_doctor": "balanced",
+    "ask_specialty": "balanced",
+    "ask_patient_info": "balanced",
+    "ask_complaint": "accurate",
+    "ask_notes": "accurate",
+    "collecting": "accurate",
+}
+
+def select_profile(profile: Optional[str] = None, expect: Optional[str] = None) -> TranscriptionProfile:
+    """Explicit profile name first, then the conversation's expectation, then the default."""
+    if profile and profile in PROFILES:
+        return PROFILES[profile]
+    return PROFILES[EXPECT_PROFILES.get(expect or "", DEFAULT_PROFILE)]
+
+# ---------------- micro-batching (local model) ----------------
+BATCH_MAX_SIZE = int(os.environ.get("ASTRA_STT_BATCH_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("ASTRA_STT_BATCH_WAIT_MS", "15"))
+BATCH_MAX_AUDIO_S = 30.0    # one encoder window; longer audio uses the regular segmented decode
+BATCH_RESULT_TIMEOUT_S = 120.0
+NO_SPEECH_THRESHOLD = 0.6   # faster-whisper's defaults for dropping a silent window
+LOGPROB_THRESHOLD = -1.0    # ... and for retrying a decode at a higher temperature
+COMPRESSION_RATIO_THRESHOLD = 2.4
+
+def _decode_batch(model, batch, beam_size: int, language=None):
+    """
+    One encoder pass and one generate() call for several <=30 s clips; returns their texts.
+
+    The batch decodes at temperature 0 only. A clip that fails faster-whisper's quality checks
+    (repetitive text or low average log-probability, and not silence) comes back as None so the
+    caller can redo it with model.transcribe() and its temperature fallback.
+    """
+    import numpy as np
+    from faster_whisper.audio import pad_or_trim  # type: ignore
+    from faster_whisper.tokenizer import Tokenizer  # type: ignore
+    from faster_whisper.transcribe import get_compression_ratio, get_suppressed_tokens  # type: ignore
+
+    features = np.stack([pad_or_trim(model.feature_extractor(samples)[..., :-1]) for samples in batch])
+    encoder_output = model.encode(features)
+    multilingual = model.model.is_multilingual
+    tokenizer = Tokenizer(model.hf_tokenizer, multilingual, task="transcribe", language=language or "en")
+    prompt = model.get_prompt(tokenizer, [], without_timestamps=True)
+    prompts = [list(prompt) for _ in batch]
+    if multilingual and language is None:
+        # per-clip language detection, swapped into each prompt (as BatchedInferencePipeline does)
+        lang_index = prompt.index(tokenizer.language)
+        for p, langs in zip(prompts, model.model.detect_language(encoder_output)):
+            p[lang_index] = tokenizer.tokenizer.token_to_id(langs[0][0])
+    results = model.model.generate(
+        encoder_output, prompts,
+        beam_size=beam_size,
+        max_length=model.max_length,
+        suppress_blank=True,
+        suppress_tokens=get_suppressed_tokens(tokenizer, [-1]),
+        return_scores=True,
+        return_no_speech_prob=True,
+    )
+    texts = []
+    for r in results:
+        tokens = r.sequences_ids[0]
+        avg_logprob = r.scores[0] * len(tokens) / (len(tokens) + 1)
+        text = tokenizer.decode(tokens).strip()
+        if r.no_speech_prob > NO_SPEECH_THRESHOLD and avg_logprob < LOGPROB_THRESHOLD:
+            texts.append("")
+        elif avg_logprob < LOGPROB_THRESHOLD or get_compression_ratio(text) > COMPRESSION_RATIO_THRESHOLD:
+            texts.append(None)
+        else:
+            texts.append(text)
+    return texts
+
+class _Utterance:
+    __slots__ = ("samples", "model_size", "beam_size", "language", "done", "text", "error")
+
+    def __init__(self, samples, model_size: str, beam_size: int, language):
+        self.samples = samples
+        self.model_size = model_size
+        self.beam_size = beam_size
+        self.language = language
+        self.done = threading.Event()
+        self.text = None
+        self.error = None
+
+class WhisperBatcher:
+    """
+    Collects utterances for up to `max_wait_ms` after the first one (or until `max_batch`), then
+    runs them as one batch on a single worker thread. While a batch runs, new arrivals queue up
+    and form the next one, so batches grow with load and a lone request waits at most max_wait_ms.
+    Utterances only share a batch when they use the same model size, beam width and language.
+    """
+
+    def __init__(self, max_batch: int = BATCH_MAX_SIZE, max_wait_ms: float = BATCH_MAX_WAIT_MS,
+                 model_getter=get_whisper_model):
+        self.max_batch = max(1, max_batch)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self._model_getter = model_getter
+        self._queue: "queue.Queue[_Utterance]" = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "utterances": 0, "largest": 0, "retried": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch > 1
+
+    def submit(self, samples, beam_size: int = 5, language=None, model_size: Optional[str] = None) -> Optional[str]:
+        """Block until this utterance's batch has been decoded; returns its text, None if it needs a retry."""
+        self._ensure_worker()
+        u = _Utterance(samples, model_size or WHISPER_MODEL_SIZE, beam_size, language)
+        self._queue.put(u)
+        if not u.done.wait(BATCH_RESULT_TIMEOUT_S):
+            raise TimeoutError("batched transcription timed out")
+        if u.error is not None:
+            raise u.error
+        return u.text
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="stt-batcher", daemon=True)
+                    self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            groups = {}
+            for u in self._collect():
+                groups.setdefault((u.model_size, u.beam_size, u.language), []).append(u)
+            for (model_size, beam_size, language), group in groups.items():
+                self._run(group, model_size, beam_size, language)
+
+    def _run(self, group, model_size: str, beam_size: int, language):
+        try:
+            texts = _decode_batch(self._model_getter(model_size), [u.samples for u in group], beam_size, language)
+            for u, text in zip(group, texts):
+                u.text = text
+        except Exception as e:
+            for u in group:
+                u.error = e
+        finally:
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["utterances"] += len(group)
+                self._stats["largest"] = max(self._stats["largest"], len(group))
+                self._stats["retried"] += sum(1 for u in group if u.error is None and u.text is None)
+            for u in group:
+                u.done.set()
+
+_batcher = WhisperBatcher()
+
+def transcribe_samples(samples, profile: TranscriptionProfile) -> str:
+    """Local transcription of preprocessed 16 kHz mono audio with the given profile."""
+    provider = f"faster_whisper:{profile.name}"
+    # in-model VAD needs the segmented decode; short clips without it can share a batch
+    if _batcher.enabled and not profile.vad_filter and samples.size / TARGET_SR <= BATCH_MAX_AUDIO_S:
+        with timed("stt", provider + ":batched"):
+            text = _batcher.submit(samples, beam_size=profile.beam_size, language=profile.language,
+                                   model_size=profile.model_size)
+        if text is not None:
+            return text
+        # failed the quality checks at temperature 0: redo it with the temperature fallback
+    model = get_whisper_model(profile.model_size)
+    with timed("stt", provider):
+        segments, info = model.transcribe(samples, beam_size=profile.beam_size, language=profile.language,
+                                          vad_filter=profile.vad_filter)
+        # segments is a lazy generator; decoding happens while iterating
+        return " ".join(segment.text for segment in segments).strip()
+
+def transcribe_audio_bytes(file_bytes: bytes, filename_hint: str = "audio.webm",
+                           profile: Optional[TranscriptionProfile] = None):
+    """Transcribe an upload, reusing the result for byte-identical retries (see stt_cache)."""
+    profile = profile or PROFILES[DEFAULT_PROFILE]
+    if profile.name != DEGRADED_PROFILE and not time_for("stt"):
+        # a retry already decoded with the requested profile costs nothing
+        cached = peek_transcription(file_bytes, profile.name)
+        if cached is not None:
+            return cached
+        degrade("stt", DEGRADED_PROFILE)
+        profile = PROFILES[DEGRADED_PROFILE]
+    return cached_transcription(file_bytes, profile.name,
+                                lambda: _transcribe_uncached(file_bytes, filename_hint, profile))
+
+def _transcribe_uncached(file_bytes: bytes, filename_hint: str, profile: TranscriptionProfile):
     """
     Strategy:
       1. If OpenAI key present and new client importable -> call new client audio transcription.
@@ -38,15 +348,31 @@ def transcribe_audio_bytes(file_bytes: bytes, filename_hint: str = "audio.webm")
       3. Else return instructive error.
     Returns: {"ok": True, "text": "..."} or {"ok": False, "error": "..."}
     """
+    prepared = prepare_audio(file_bytes)
+    report = prepared.report() if prepared is not None else None
+    if prepared is not None and prepared.processed_s == 0:
+        # nothing above the noise floor: skip the model entirely
+        return {"ok": True, "text": "", "audio": report, "profile": profile.name}
+
     key = _load_openai_key()
     if key and _openai_client_available():
         try:
-            from openai import OpenAI  # type: ignore
-            client = OpenAI(api_key=key)
-            audio_file = io.BytesIO(file_bytes)
-            audio_file.name = filename_hint
+            from services.llm_service import get_openai_client
+            client = get_openai_client(key)
+            if prepared is not None and prepared.seconds_saved >= OPENAI_MIN_SAVED_S:
+                audio_file = io.BytesIO(to_wav_bytes(prepared.samples, prepared.sample_rate))
+                audio_file.name = Path(filename_hint).stem + ".wav"
+            else:
+                audio_file = io.BytesIO(file_bytes)
+                audio_file.name = filename_hint
             # Use the new client's audio transcription interface
-            resp = client.audio.transcriptions.create(model="whisper-1", file=audio_file)
+            # the hosted model has no beam/size knobs; a pinned language still skips detection
+            kwargs = {"language": profile.language} if profile.language else {}
+            left = remaining()
+            if left is not None:
+                client = client.with_options(timeout=max(left, 0.1), max_retries=0)
+            with timed("stt", "openai"):
+                resp = client.audio.transcriptions.create(model="whisper-1", file=audio_file, **kwargs)
             # the exact shape may vary; try common access patterns
             text = ""
             try:
@@ -59,24 +385,28 @@ def transcribe_audio_bytes(file_bytes: bytes, filename_hint: str = "audio.webm")
                     text = getattr(resp, "output_text", None) or str(resp)
                 except Exception:
                     text = str(resp)
-            return {"ok": True, "text": text}
+            return {"ok": True, "text": text, "audio": report, "profile": profile.name}
         except Exception as e:
             # error when using new client
             return {"ok": False, "error": f"OpenAI transcription attempt failed: {e}. If you're using an older openai package, upgrade it with: pip install --upgrade 'openai>=1.0.0'."}
 
     # fallback: try faster-whisper (local)
     try:
-        from faster_whisper import WhisperModel  # type: ignore
-        import tempfile
-        model_size = "small"
-        model = WhisperModel(model_size, device="cpu", compute_type="int8")
+        if prepared is not None:
+            # faster-whisper accepts 16 kHz float32 mono directly
+            text = transcribe_samples(prepared.samples, profile)
+            return {"ok": True, "text": text, "audio": report, "profile": profile.name}
+        model = get_whisper_model(profile.model_size)
         with tempfile.NamedTemporaryFile(delete=False, suffix=Path(filename_hint).suffix) as tf:
             tf.write(file_bytes)
             tmp_path = tf.name
-        segments, info = model.transcribe(tmp_path, beam_size=5)
-        text_parts = [segment.text for segment in segments]
+        with timed("stt", f"faster_whisper:{profile.name}"):
+            segments, info = model.transcribe(tmp_path, beam_size=profile.beam_size, language=profile.language,
+                                              vad_filter=profile.vad_filter)
+            # segments is a lazy generator; decoding happens while iterating
+            text_parts = [segment.text for segment in segments]
         text = " ".join(text_parts).strip()
-        return {"ok": True, "text": text}
+        return {"ok": True, "text": text, "audio": report, "profile": profile.name}
     except Exception as e_local:
         # final helpful instruction
         msg = (
@@ -1,30 +1,154 @@
 # backend/services/tts_service.py
 """
-TTS service. Prefer ElevenLabs if data/elevenlabs.json exists with {api_key, voice_id}.
+TTS service. Prefer ElevenLabs if data/elevenlabs.json exists with {api_key, voice_id}
+(optional "base_url" to point at a proxy or a local stub, "timeout_s" for the read timeout).
 Fallback to gTTS otherwise.
-Returns base64-encoded mp3 audio.
+Returns base64-encoded audio: mp3 as the providers produce it, or opus/pcm when the turn asked
+for it (see services.audio_formats and audio_format_scope()).
+
+Each provider sits behind a circuit breaker: after repeated failures it is skipped outright
+(no timeout paid) until a half-open probe succeeds. Among healthy providers, one whose recent
+latency is above SLOW_PROVIDER_S is tried after the others. ElevenLabs calls reuse one pooled
+keep-alive requests.Session, and elevenlabs.json is only re-read when its mtime changes.
+
+Hedging: if the first provider has not answered after its own recent p90 latency (clamped to
+HEDGE_MIN_S..HEDGE_MAX_S), the next provider is started in parallel and the first success
+wins. The loser cannot be interrupted mid-request; its result is discarded (its breaker and
+latency window still learn from it). The whole call is bounded by a per-turn budget
+(ASTRA_TTS_BUDGET_S); ASTRA_TTS_HEDGE=0 turns hedging off and keeps plain fallback.
+
+Synthesized audio is kept in a byte-bounded LRU keyed by the voice that actually produced it
+(provider and voice id), language and text, and every transcoded variant is stored in the same
+entry next to the source MP3, so a repeated phrase in an already-produced format costs neither a
+provider call nor a transcode. Lookups use the preferred provider's voice; fallback-voice audio is
+only served while that provider's circuit is open, so replies do not switch voices once it recovers.
+
+Under a turn deadline (services.deadline) the synthesis budget is what is left of the turn, and a
+cache miss with less time left than TTS usually takes is answered text-only ({"ok": False,
+"degraded": True}) instead of starting a provider call that would overrun.
 """
 
 import io
 import base64
+import contextvars
 import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from services.metrics import register_renderer, timed
+from services.circuit_breaker import CircuitBreaker
+from services.audio_formats import DEFAULT_FORMAT, FORMATS, MIME, transcode
+from services.deadline import degrade, remaining, time_for
 
 DATA_DIR = Path(__file__).resolve().parents[2] / "data"
 ELEVEN_FILE = DATA_DIR / "elevenlabs.json"
+ELEVEN_API_BASE = "https://api.elevenlabs.io"
+ELEVEN_CONNECT_TIMEOUT_S = 3.05
+ELEVEN_READ_TIMEOUT_S = 15.0
+# gTTS waits forever by default; a hung call would pin a _pool thread (a losing hedge is not cancelled)
+GTTS_CONNECT_TIMEOUT_S = 3.05
+GTTS_READ_TIMEOUT_S = 10.0
 
-def _load_eleven_cfg():
-    if ELEVEN_FILE.exists():
-        try:
-            return json.loads(ELEVEN_FILE.read_text())
-        except Exception:
+# a provider averaging slower than this is demoted behind faster healthy ones
+SLOW_PROVIDER_S = 4.0
+
+BREAKERS: Dict[str, CircuitBreaker] = {
+    "elevenlabs": CircuitBreaker("elevenlabs", failure_threshold=3, reset_timeout=30.0),
+    "gtts": CircuitBreaker("gtts", failure_threshold=3, reset_timeout=30.0),
+}
+
+HEDGE_ENABLED = os.environ.get("ASTRA_TTS_HEDGE", "1").lower() not in ("0", "false", "no")
+HEDGE_QUANTILE = 0.9
+HEDGE_MIN_S = 0.3
+HEDGE_MAX_S = 3.0
+HEDGE_DEFAULT_S = 1.5      # until a provider has HEDGE_MIN_SAMPLES successful calls
+HEDGE_MIN_SAMPLES = 20
+TURN_BUDGET_S = float(os.environ.get("ASTRA_TTS_BUDGET_S", "8"))
+AUDIO_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+
+class LatencyWindow:
+    """Latencies of the last `size` successful calls, for quantiles."""
+
+    def __init__(self, size: int = 256):
+        self._values = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._values.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            values = sorted(self._values)
+        if not values:
             return None
-    return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+WINDOWS: Dict[str, LatencyWindow] = {name: LatencyWindow() for name in BREAKERS}
+HEDGE_COUNTS = {"fired": 0, "won": 0, "budget_exceeded": 0}
+PAYLOAD_COUNTS = {fmt: {"responses": 0, "bytes": 0} for fmt in FORMATS}
+
+# (voice, lang, text) -> {format: audio bytes}; "mp3" is the provider's source audio
+_audio_cache: "OrderedDict[Tuple[str, str, str], Dict[str, bytes]]" = OrderedDict()
+_audio_cache_bytes = 0
+_audio_cache_lock = threading.Lock()
+
+# per-turn output format and what was actually delivered (set by the converse route)
+_turn_audio: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("tts_turn_audio", default=None)
+
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tts")
+_cfg_cache: Tuple[Optional[int], Optional[dict]] = (None, None)
+_http = None
+_http_lock = threading.Lock()
+
+def _load_eleven_cfg():
+    global _cfg_cache
+    try:
+        mtime = ELEVEN_FILE.stat().st_mtime_ns
+    except OSError:
+        return None
+    cached_mtime, cfg = _cfg_cache
+    if cached_mtime == mtime:
+        return cfg
+    try:
+        cfg = json.loads(ELEVEN_FILE.read_text())
+    except Exception:
+        cfg = None
+    _cfg_cache = (mtime, cfg)
+    return cfg
 
 def _eleven_available():
     cfg = _load_eleven_cfg()
     return cfg and cfg.get("api_key") and cfg.get("voice_id")
 
+def elevenlabs_configured() -> bool:
+    return bool(_eleven_available())
+
+def _http_session():
+    """Shared keep-alive session; saves a TCP+TLS handshake on every turn."""
+    global _http
+    if _http is None:
+        with _http_lock:
+            if _http is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http = session
+    return _http
+
 def _eleven_tts(text: str) -> dict:
     """
     Call ElevenLabs TTS API. Returns {"ok": True, "audio_base64": "..."} or {"ok": False, "error": "..."}
@@ -34,9 +158,9 @@ def _eleven_tts(text: str) -> dict:
         return {"ok": False, "error": "No elevenlabs config"}
     api_key = cfg.get("api_key")
     voice_id = cfg.get("voice_id")
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+    base = (cfg.get("base_url") or ELEVEN_API_BASE).rstrip("/")
+    url = f"{base}/v1/text-to-speech/{voice_id}"
     try:
-        import requests
         headers = {
             "xi-api-key": api_key,
             "Content-Type": "application/json"
@@ -48,7 +172,9 @@ def _eleven_tts(text: str) -> dict:
                 "similarity_boost": 0.75
             }
         }
-        resp = requests.post(url, headers=headers, json=payload, timeout=30)
+        timeout = (ELEVEN_CONNECT_TIMEOUT_S, float(cfg.get("timeout_s") or ELEVEN_READ_TIMEOUT_S))
+        with timed("tts", "elevenlabs"):
+            resp = _http_session().post(url, headers=headers, json=payload, timeout=timeout)
         if resp.status_code != 200:
             return {"ok": False, "error": f"ElevenLabs TTS failed: {resp.status_code} {resp.text}"}
         audio_bytes = resp.content
@@ -61,19 +187,223 @@ def _gtts_tts(text: str, lang: str = "en") -> dict:
     try:
         from gtts import gTTS
         mp3_fp = io.BytesIO()
-        tts = gTTS(text=text, lang=lang, slow=False)
-        tts.write_to_fp(mp3_fp)
+        with timed("tts", "gtts"):
+            tts = gTTS(text=text, lang=lang, slow=False,
+                       timeout=(GTTS_CONNECT_TIMEOUT_S, GTTS_READ_TIMEOUT_S))
+            tts.write_to_fp(mp3_fp)
         mp3_fp.seek(0)
         audio_b64 = base64.b64encode(mp3_fp.read()).decode("utf-8")
         return {"ok": True, "audio_base64": audio_b64}
     except Exception as e:
         return {"ok": False, "error": f"gTTS failed: {e}"}
 
-def text_to_speech_base64(text: str, lang: str = "en") -> dict:
-    # prefer ElevenLabs if configured
+def _providers(lang: str) -> List[Tuple[str, Callable[[str], dict]]]:
+    """Configured providers in preference order (ElevenLabs first when configured)."""
+    providers = []
     if _eleven_available():
-        r = _eleven_tts(text)
-        if r.get("ok"):
+        providers.append(("elevenlabs", _eleven_tts))
+    providers.append(("gtts", lambda text: _gtts_tts(text, lang=lang)))
+    return providers
+
+def _route(providers: List[Tuple[str, Callable[[str], dict]]]) -> List[Tuple[str, Callable[[str], dict]]]:
+    """Healthy-and-fast first, then healthy-but-slow; open circuits are left out entirely."""
+    def slow(name: str) -> bool:
+        ewma = BREAKERS[name].ewma_s
+        return ewma is not None and ewma > SLOW_PROVIDER_S
+    usable = [p for p in providers if BREAKERS[p[0]].available()]
+    return sorted(usable, key=lambda p: slow(p[0]))  # stable: keeps preference order within a tier
+
+def _call_provider(name: str, fn: Callable[[str], dict], text: str) -> Optional[dict]:
+    """None if the breaker refused the call; otherwise the provider's result (breaker updated)."""
+    breaker = BREAKERS[name]
+    if not breaker.allow():
+        return None
+    start = time.perf_counter()
+    try:
+        r = fn(text)
+    except Exception as e:
+        r = {"ok": False, "error": f"{name} failed: {e}"}
+    elapsed = time.perf_counter() - start
+    if r.get("ok"):
+        breaker.record_success(elapsed)
+        WINDOWS[name].add(elapsed)
+    else:
+        breaker.record_failure(elapsed)
+    return r
+
+def hedge_delay(name: str) -> float:
+    window = WINDOWS[name]
+    q = window.quantile(HEDGE_QUANTILE) if len(window) >= HEDGE_MIN_SAMPLES else None
+    return min(HEDGE_MAX_S, max(HEDGE_MIN_S, q if q is not None else HEDGE_DEFAULT_S))
+
+def tts_provider_status() -> Dict[str, dict]:
+    status = {}
+    for name, b in BREAKERS.items():
+        snap = b.snapshot()
+        for q in (0.5, 0.9, 0.99):
+            v = WINDOWS[name].quantile(q)
+            snap[f"p{int(q * 100)}_ms"] = round(v * 1000, 1) if v is not None else None
+        snap["hedge_delay_ms"] = round(hedge_delay(name) * 1000, 1)
+        status[name] = snap
+    return status
+
+def _render_metrics() -> List[str]:
+    lines = ["# HELP astra_tts_latency_seconds Recent successful TTS latency quantiles per provider.",
+             "# TYPE astra_tts_latency_seconds gauge"]
+    for name, window in WINDOWS.items():
+        for q in (0.5, 0.9, 0.99):
+            v = window.quantile(q)
+            if v is not None:
+                lines.append(f'astra_tts_latency_seconds{{provider="{name}",quantile="{q}"}} {v:.6f}')
+    lines += ["# HELP astra_tts_hedge_delay_seconds Current hedge delay when this provider is primary.",
+              "# TYPE astra_tts_hedge_delay_seconds gauge"]
+    lines += [f'astra_tts_hedge_delay_seconds{{provider="{name}"}} {hedge_delay(name):.6f}' for name in WINDOWS]
+    lines += ["# HELP astra_tts_hedges_total Hedged TTS requests (fired, won by the hedge, budget exceeded).",
+              "# TYPE astra_tts_hedges_total counter"]
+    lines += [f'astra_tts_hedges_total{{outcome="{k}"}} {v}' for k, v in HEDGE_COUNTS.items()]
+    lines += ["# HELP astra_tts_payload_bytes_total Base64 audio bytes returned to clients, by format.",
+              "# TYPE astra_tts_payload_bytes_total counter"]
+    lines += [f'astra_tts_payload_bytes_total{{format="{k}"}} {v["bytes"]}' for k, v in PAYLOAD_COUNTS.items()]
+    lines += ["# HELP astra_tts_responses_total TTS responses returned to clients, by format.",
+              "# TYPE astra_tts_responses_total counter"]
+    lines += [f'astra_tts_responses_total{{format="{k}"}} {v["responses"]}' for k, v in PAYLOAD_COUNTS.items()]
+    return lines
+
+register_renderer(_render_metrics)
+
+@contextmanager
+def audio_format_scope(fmt: str):
+    """Within the block, TTS calls default to `fmt`; the yielded dict reports what was delivered."""
+    state = {"format": fmt, "delivered": None, "bytes": 0}
+    token = _turn_audio.set(state)
+    try:
+        yield state
+    finally:
+        _turn_audio.reset(token)
+
+def _voice_key(provider: str, lang: str) -> str:
+    if provider == "elevenlabs":
+        return f"elevenlabs:{(_load_eleven_cfg() or {}).get('voice_id')}"
+    return f"gtts:{lang}"
+
+def _cached_variants(lang: str, text: str) -> Optional[Tuple[tuple, Dict[str, bytes]]]:
+    """Cached audio in the preferred voice; another provider's only while the preferred one is down."""
+    names = [name for name, _ in _providers(lang)]
+    if not BREAKERS[names[0]].available():
+        names = names[1:] + names[:1]
+    else:
+        names = names[:1]
+    for name in names:
+        variants = _cache_get((_voice_key(name, lang), lang, text))
+        if variants is not None and "mp3" in variants:
+            return (_voice_key(name, lang), lang, text), variants
+    return None
+
+def _cache_get(key) -> Optional[Dict[str, bytes]]:
+    with _audio_cache_lock:
+        variants = _audio_cache.get(key)
+        if variants is not None:
+            _audio_cache.move_to_end(key)
+        return variants
+
+def _cache_put(key, fmt: str, audio: bytes):
+    global _audio_cache_bytes
+    with _audio_cache_lock:
+        variants = _audio_cache.setdefault(key, {})
+        _audio_cache_bytes += len(audio) - len(variants.get(fmt, b""))
+        variants[fmt] = audio
+        _audio_cache.move_to_end(key)
+        while _audio_cache_bytes > AUDIO_CACHE_MAX_BYTES and len(_audio_cache) > 1:
+            _, dropped = _audio_cache.popitem(last=False)
+            _audio_cache_bytes -= sum(len(v) for v in dropped.values())
+
+def _variant(key, variants: Dict[str, bytes], fmt: str) -> Tuple[str, bytes]:
+    """(format, audio) for the wanted format, transcoding once; falls back to the MP3 source."""
+    audio = variants.get(fmt)
+    if audio is not None:
+        return fmt, audio
+    try:
+        with timed("tts_transcode", fmt):
+            audio = transcode(variants["mp3"], fmt)
+    except Exception:
+        return "mp3", variants["mp3"]
+    _cache_put(key, fmt, audio)
+    return fmt, audio
+
+def text_to_speech_base64(text: str, lang: str = "en", budget_s: Optional[float] = None,
+                          fmt: Optional[str] = None) -> dict:
+    turn = _turn_audio.get()
+    fmt = fmt or (turn or {}).get("format") or DEFAULT_FORMAT
+    hit = _cached_variants(lang, text)
+    if hit is not None:
+        key, variants = hit
+    else:
+        if not time_for("tts"):
+            degrade("tts", "text_only")
+            return {"ok": False, "error": "Turn budget too low for speech", "degraded": True}
+        if budget_s is None:
+            budget_s = min(TURN_BUDGET_S, remaining(TURN_BUDGET_S))
+        r = _synthesize(text, lang, budget_s)
+        if not r.get("ok"):
             return r
-        # otherwise fall back to gTTS
-    return _gtts_tts(text, lang=lang)
+        source = base64.b64decode(r["audio_base64"])
+        # keyed by the voice that spoke it, which after a fallback or hedge is not the preferred one
+        key = (_voice_key(r["provider"], lang), lang, text)
+        _cache_put(key, "mp3", source)
+        variants = {"mp3": source}
+    fmt, audio = _variant(key, variants, fmt)
+    audio_b64 = base64.b64encode(audio).decode("utf-8")
+    counts = PAYLOAD_COUNTS[fmt]
+    counts["responses"] += 1
+    counts["bytes"] += len(audio_b64)
+    if turn is not None:
+        turn["delivered"] = fmt
+        turn["bytes"] += len(audio_b64)
+    return {"ok": True, "audio_base64": audio_b64, "format": fmt, "mime": MIME[fmt]}
+
+def _synthesize(text: str, lang: str, budget_s: Optional[float]) -> dict:
+    # prefer ElevenLabs if configured; skip any provider whose circuit is open
+    queue = _route(_providers(lang))
+    deadline = time.monotonic() + (budget_s if budget_s is not None else TURN_BUDGET_S)
+    last_error = "No TTS provider available (all circuits open)"
+    pending: Dict = {}
+    primary = queue[0][0] if queue else None
+    hedged = False
+
+    def launch():
+        name, fn = queue.pop(0)
+        # own context copy per thread so stage timings still reach this request's Server-Timing
+        ctx = contextvars.copy_context()
+        pending[_pool.submit(ctx.run, _call_provider, name, fn, text)] = name
+
+    if queue:
+        launch()
+    while pending:
+        time_left = deadline - time.monotonic()
+        if time_left <= 0:
+            HEDGE_COUNTS["budget_exceeded"] += 1
+            return {"ok": False, "error": f"TTS exceeded its {budget_s or TURN_BUDGET_S:.1f}s budget"}
+        can_hedge = HEDGE_ENABLED and queue and not hedged
+        timeout = min(time_left, hedge_delay(primary)) if can_hedge else time_left
+        done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            if can_hedge:
+                hedged = True
+                HEDGE_COUNTS["fired"] += 1
+                launch()
+            continue
+        for fut in done:
+            name = pending.pop(fut)
+            r = fut.result()
+            if r and r.get("ok"):
+                if hedged and name != primary:
+                    HEDGE_COUNTS["won"] += 1
+                for other in pending:
+                    other.cancel()  # only stops calls that have not started yet
+                return {**r, "provider": name}
+            if r:
+                last_error = r.get("error") or last_error
+        # nothing in flight succeeded: plain fallback to the next provider
+        if not pending and queue:
+            launch()
+    return {"ok": False, "error": last_error}
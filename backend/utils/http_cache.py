@@ -0,0 +1,33 @@
+# backend/utils/http_cache.py
+# helpers for version-stamped, pre-serialized JSON responses with ETag / If-None-Match
+import hashlib
+import json
+from typing import Any, Tuple
+from fastapi import Request
+from fastapi.responses import Response
+
+DEFAULT_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
+def serialize_json(content: Any) -> Tuple[bytes, str]:
+    """Serialize like JSONResponse and return (body, strong ETag)."""
+    body = json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+    return body, '"' + hashlib.sha1(body).hexdigest() + '"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison (RFC 7232 3.2)
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+def cached_json_response(request: Request, body: bytes, etag: str, cache_control: str = DEFAULT_CACHE_CONTROL) -> Response:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    inm = request.headers.get("if-none-match")
+    if inm and etag_matches(inm, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
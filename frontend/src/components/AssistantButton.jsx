@@ -5,6 +5,24 @@ import "./AssistantButton.css"; // ensure you have styles, user provided earlier
 
 const API_BASE = "http://localhost:8000/api";
 
+// Opus replies are several times smaller than MP3; ask for them when the browser can play them
+const AUDIO_FORMAT = (() => {
+  try {
+    return new Audio().canPlayType('audio/ogg; codecs="opus"') ? "opus" : "mp3";
+  } catch (e) {
+    return "mp3";
+  }
+})();
+
+// One voice turn (transcribe + converse, including TTS) shares this budget; the backend
+// degrades (text-only reply, rule-based extraction) rather than overrun it.
+const TURN_BUDGET_MS = 10000;
+
+function budgetHeader(turnStart) {
+  const left = Math.max(0, Math.round(TURN_BUDGET_MS - (performance.now() - turnStart)));
+  return { "X-Turn-Budget-Ms": String(left) };
+}
+
 function new_uuid() {
   return Math.random().toString(36).slice(2, 10);
 }
@@ -185,11 +203,14 @@ export default function AssistantButton() {
   }
 
   async function handleAudioBlob(blob) {
+    const turnStart = performance.now();
     appendMessage("user", "[voice message]");
     const fd = new FormData();
     fd.append("file", blob, "speech.webm");
+    // lets the backend pick a cheaper decode for short expected answers (e.g. yes/no)
+    if (sessionId) fd.append("session_id", sessionId);
     try {
-      const r = await axios.post(`${API_BASE}/voice/transcribe`, fd, { headers: { 'Content-Type': 'multipart/form-data' }, timeout: 120000 });
+      const r = await axios.post(`${API_BASE}/voice/transcribe`, fd, { headers: { 'Content-Type': 'multipart/form-data', ...budgetHeader(turnStart) }, timeout: 120000 });
       if (r.data && (r.data.ok || r.data.text || r.data.transcript)) {
         const text = (r.data.text || r.data.transcript || "").trim();
         appendMessage("bot", `Transcription: "${text}"`);
@@ -197,7 +218,7 @@ export default function AssistantButton() {
           appendMessage("bot", "I couldn't hear that clearly — please hold and speak again.");
           return;
         }
-        await sendConverse(text);
+        await sendConverse(text, turnStart);
       } else {
         appendMessage("bot", "Transcription failed: " + (r.data && r.data.error ? r.data.error : "unknown"));
       }
@@ -208,14 +229,15 @@ export default function AssistantButton() {
   }
 
   // Conversation
-  async function sendConverse(text) {
+  async function sendConverse(text, turnStart = null) {
     try {
       appendMessage("user", text);
       setThinking(true);
       appendMessage("bot", ""); // placeholder
       setSuggestion(null);
 
-      const res = await axios.post(`${API_BASE}/voice/converse`, { session_id: sessionId, text }, { timeout: 120000 });
+      const res = await axios.post(`${API_BASE}/voice/converse`, { session_id: sessionId, text, audio_format: AUDIO_FORMAT },
+        { headers: turnStart !== null ? budgetHeader(turnStart) : {}, timeout: 120000 });
       setThinking(false);
 
       if (res.data && res.data.session_id) {
@@ -240,7 +262,8 @@ export default function AssistantButton() {
 
       if (res.data && res.data.audio_base64) {
         try {
-          const audio = new Audio("data:audio/mp3;base64," + res.data.audio_base64);
+          const mime = res.data.audio_mime || "audio/mpeg";
+          const audio = new Audio(`data:${mime};base64,` + res.data.audio_base64);
           audio.play().catch(() => {});
         } catch (e) {
           console.warn("audio play failed", e);